@@ -62,6 +62,7 @@ class FastLoadASR:
         # 运行时变量
         self.running = False
         self.audio_queue = queue.Queue()
+        self.audio_idle = threading.Event()  # 处理线程已处理完送入的全部音频
         self.complete_transcript = "" # 每次识别会话（start->stop)的完整记录
         self.current_sentence_transcript = "" # 当前正在形成的句子
         self.raw_transcript = ""
@@ -147,6 +148,16 @@ class FastLoadASR:
         # 将音频数据放入队列
         self.audio_queue.put(indata.copy())
 
+    def feed_audio(self, samples):
+        """
+        送入一段音频（start(capture=False)时代替录音设备，例如处理音频文件）
+
+        参数:
+            samples: 16kHz单声道float32采样
+        """
+        self.audio_idle.clear()
+        self.audio_queue.put(np.asarray(samples, dtype=np.float32))
+
     def process_audio_thread(self):
         """音频处理线程"""
         vad_buffer = np.array([], dtype=np.float32)
@@ -234,6 +245,8 @@ class FastLoadASR:
                         # If not using VAD, this effectively restarts the segment timer.
 
                 if not audio_chunk_processed_this_loop:
+                    if self.audio_queue.empty():
+                        self.audio_idle.set()
                     time.sleep(0.01) # Sleep if no audio was processed in this loop iteration
             except queue.Empty:
                 if self.running: # Only sleep if running and queue is empty
@@ -351,11 +364,19 @@ class FastLoadASR:
         except Exception as e:
             print(f"\nASR处理错误: {e}")
 
-    def start(self):
-        """开始录音和识别"""
+    def start(self, capture=True):
+        """
+        开始录音和识别
+
+        参数:
+            capture: 是否从录音设备采集音频，False时通过feed_audio()送入音频
+
+        返回:
+            是否启动成功
+        """
         if not self.ensure_asr_model_loaded():
             print("ASR模型未加载，无法启动。")
-            return
+            return False
         
         # 按需加载VAD和PUNC模型 (如果应用在启动时没有预加载)
         if self.use_vad and not self.vad_model:
@@ -385,6 +406,8 @@ class FastLoadASR:
         self.process_audio_thread_instance = threading.Thread(target=self.process_audio_thread)
         self.process_audio_thread_instance.daemon = True
         self.process_audio_thread_instance.start()
+        if not capture:
+            return True
 
         # 启动音频录制
         try:
@@ -401,7 +424,8 @@ class FastLoadASR:
             self.running = False # 无法启动则停止运行
             if hasattr(self, 'process_audio_thread_instance') and self.process_audio_thread_instance.is_alive():
                 self.process_audio_thread_instance.join() # 等待线程结束
-            return
+            return False
+        return True
 
     def stop(self):
         """停止录音和识别"""
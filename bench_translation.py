@@ -0,0 +1,708 @@
+# bench_translation.py - 翻译模块性能基准测试
+import base64
+import contextlib
+import io
+import json
+import queue
+import os
+import random
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import urllib.request
+
+import bulk_translation
+import local_translation
+import translation_module
+from translation_module import (TranslationModule, TranslationBatcher, IncrementalTranslator, TranslationMemory,
+                                detect_language, percentile)
+from fake_translation_server import FakeServerConfig, start_server, build_success_response, build_error_response
+from pipeline_engine import PipelineEngine, PipelineConfig, EVENT_TRANSLATION
+
+# 基准测试使用的伪密钥（不会发起真实请求）
+BENCH_APP_ID = "bench_app"
+BENCH_API_SECRET = "bench_secret_0123456789abcdef"
+BENCH_API_KEY = "bench_key_0123456789abcdef"
+
+
+def _report(name, number, elapsed):
+    """打印单项测试结果"""
+    per_call_us = elapsed / number * 1e6
+    print(f"{name:<32}{number:>10} 次  {per_call_us:>10.2f} us/次")
+    return per_call_us
+
+
+def _run_sequential(translator, count):
+    """顺序翻译count条不重复文本，返回(延迟列表, 失败次数)"""
+    latencies = []
+    failures = 0
+    for i in range(count):
+        start = time.perf_counter()
+        result = translator.translate(f"第{i}句测试文本", "cn", "en", use_cache=False)
+        latencies.append(time.perf_counter() - start)
+        if result is None:
+            failures += 1
+    return latencies, failures
+
+
+def _make_bench_translator(url, **options):
+    """创建指向模拟服务、不做速率限制的翻译实例"""
+    translator = TranslationModule(BENCH_APP_ID, BENCH_API_SECRET, BENCH_API_KEY, url=url, **options)
+    translator.request_interval = 0
+    return translator
+
+
+def bench_request_preparation(number=20000):
+    """请求准备开销：签名URL（有/无缓存）+ 请求体 + 请求头"""
+    print("\n=== 请求准备开销 ===")
+    translator = TranslationModule(BENCH_APP_ID, BENCH_API_SECRET, BENCH_API_KEY)
+    url = translator.url
+    text = "今天的会议主要讨论下一季度的产品规划。"
+
+    uncached = _report(
+        "签名URL (每次重新计算)", number,
+        timeit.timeit(lambda: translator._sign_auth_url(url, "POST", int(time.time())), number=number))
+    cached = _report(
+        "签名URL (按秒缓存)", number,
+        timeit.timeit(lambda: translator.assemble_auth_url(url, "POST"), number=number))
+    _report(
+        "请求体", number,
+        timeit.timeit(lambda: translator._prepare_request_body(text, "cn", "en", True), number=number))
+    _report(
+        "请求头", number,
+        timeit.timeit(translator._prepare_headers, number=number))
+
+    print(f"签名URL缓存加速比: {uncached / cached:.1f}x")
+
+
+def bench_retry_hedge(count=300):
+    """在注入延迟和错误的模拟服务上比较：无重试 / 重试 / 重试+对冲"""
+    print("\n=== 重试与对冲请求对尾延迟的影响 ===")
+    config = FakeServerConfig(latency=0.02, slow_rate=0.03, slow_latency=1.5, error_rate=0.05)
+    server, url = start_server(config=config)
+    print(f"模拟服务: 正常延迟 {config.latency * 1000:.0f}ms, "
+          f"{config.slow_rate:.0%} 慢请求 {config.slow_latency * 1000:.0f}ms, {config.error_rate:.0%} 错误")
+
+    variants = [
+        ("无重试", dict(max_retries=0)),
+        ("重试", dict(max_retries=2, retry_backoff=0.02)),
+        ("重试+对冲", dict(max_retries=2, retry_backoff=0.02, hedge=True)),
+    ]
+    print(f"{'配置':<12}{'p50(ms)':>10}{'p99(ms)':>10}{'失败':>8}")
+    try:
+        for name, options in variants:
+            translator = _make_bench_translator(url, timeout=3.0, breaker_threshold=50, **options)
+            # 预热，积累足够的延迟样本用于估计p95
+            _run_sequential(translator, 30)
+            latencies, failures = _run_sequential(translator, count)
+            print(f"{name:<12}{percentile(latencies, 50) * 1000:>10.1f}"
+                  f"{percentile(latencies, 99) * 1000:>10.1f}{failures:>8}")
+    finally:
+        server.shutdown()
+
+
+def _short_finals(count, seed=7):
+    """生成流式ASR风格的短句（2~5个字）及其到达间隔"""
+    rng = random.Random(seed)
+    alphabet = "我们今天讨论产品计划市场销售团队目标客户问题方案时间"
+    finals = ["".join(rng.choice(alphabet) for _ in range(rng.randint(2, 5))) + f"{i}" for i in range(count)]
+    gaps = [rng.uniform(0.05, 0.25) for _ in range(count)]
+    return finals, gaps
+
+
+def bench_micro_batching(count=120):
+    """短句逐句翻译 vs 微批处理：API请求次数与句子从到达到出结果的延迟"""
+    print("\n=== 短句微批处理 ===")
+    server, url = start_server(config=FakeServerConfig(latency=0.15))
+    finals, gaps = _short_finals(count)
+
+    # 逐句翻译：与原translation_worker一样由单线程顺序处理
+    translator = _make_bench_translator(url)
+    arrivals = queue.Queue()
+    direct_latencies = []
+
+    def direct_worker():
+        for _ in range(count):
+            text, arrived = arrivals.get()
+            translator.translate(text, "cn", "en")
+            direct_latencies.append(time.perf_counter() - arrived)
+
+    worker = threading.Thread(target=direct_worker)
+    worker.start()
+    for text, gap in zip(finals, gaps):
+        time.sleep(gap)
+        arrivals.put((text, time.perf_counter()))
+    worker.join()
+
+    # 微批处理
+    translator = _make_bench_translator(url)
+    batcher = TranslationBatcher(translator, max_chars=60, max_delay=0.3)
+    batched_latencies = []
+    futures = []
+    for text, gap in zip(finals, gaps):
+        time.sleep(gap)
+        arrived = time.perf_counter()
+        future = batcher.submit(text, "cn", "en")
+        future.add_done_callback(lambda f, a=arrived: batched_latencies.append(time.perf_counter() - a))
+        futures.append(future)
+    for future in futures:
+        future.result()
+    batcher.close()
+    server.shutdown()
+
+    stats = batcher.get_stats()
+    print(f"{'模式':<10}{'请求数':>8}{'平均延迟(ms)':>14}{'p95(ms)':>10}")
+    print(f"{'逐句':<10}{count:>8}{sum(direct_latencies) / count * 1000:>14.1f}"
+          f"{percentile(direct_latencies, 95) * 1000:>10.1f}")
+    print(f"{'微批':<10}{stats['requests']:>8}{sum(batched_latencies) / count * 1000:>14.1f}"
+          f"{percentile(batched_latencies, 95) * 1000:>10.1f}")
+    print(f"API请求减少: {1 - stats['requests'] / count:.0%}")
+
+
+def bench_incremental(sentences=10):
+    """中间结果增量翻译：首个译文出现时间比等待句末翻译提前多少，以及每句API请求数"""
+    print("\n=== 中间结果增量翻译 ===")
+    server, url = start_server(config=FakeServerConfig(latency=0.15))
+    rng = random.Random(11)
+    alphabet = "我们今天讨论产品计划市场销售团队目标客户问题方案时间"
+    interval = 0.12  # ASR中间结果的输出间隔
+
+    translator = _make_bench_translator(url)
+    first_seen = {}
+
+    def on_provisional(sentence_id, prefix, translation):
+        first_seen.setdefault(sentence_id, time.perf_counter())
+
+    incremental = IncrementalTranslator(translator, on_provisional, min_interval=0.5, max_requests_per_sentence=3)
+    leads = []
+    final_requests = 0
+    for sentence_id in range(sentences):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(15, 25)))
+        start = time.perf_counter()
+        length = 0
+        while length < len(text):
+            length = min(len(text), length + rng.randint(1, 2))
+            incremental.update(text[:length], sentence_id, "cn", "en")
+            time.sleep(interval)
+        # 句子结束：最终译文在句末之后才开始请求
+        translator.translate(text, "cn", "en")
+        final_requests += 1
+        final_seen = time.perf_counter()
+        if sentence_id in first_seen:
+            leads.append((final_seen - first_seen[sentence_id], final_seen - start))
+    incremental.close()
+    server.shutdown()
+
+    stats = incremental.get_stats()
+    print(f"句子数: {sentences}, 出现临时译文的句子: {len(leads)}")
+    if leads:
+        mean_lead = sum(lead for lead, _ in leads) / len(leads)
+        mean_duration = sum(duration for _, duration in leads) / len(leads)
+        print(f"首个译文平均提前: {mean_lead * 1000:.0f} ms（句子平均时长 {mean_duration * 1000:.0f} ms）")
+    print(f"每句API请求: 临时 {stats['requests'] / sentences:.1f} + 最终 {final_requests / sentences:.1f}"
+          f"，临时译文缓存命中 {stats['cache_hits']} 次")
+
+
+def bench_fanout(sentences=20):
+    """同一句话翻译成多种语言：并发扇出 vs 逐语言顺序调用的总耗时"""
+    print("\n=== 多目标语言并发扇出 ===")
+    server, url = start_server(config=FakeServerConfig(latency=0.1))
+    texts = [f"第{i}句需要同时翻译成多种语言的文本" for i in range(sentences)]
+
+    print(f"{'语言数':<8}{'顺序(ms/句)':>14}{'并发(ms/句)':>14}{'加速比':>8}")
+    try:
+        for to_langs in (["en", "ja"], ["en", "ja", "es"], ["en", "ja", "es", "th", "vi", "id"]):
+            translator = _make_bench_translator(url)
+            start = time.perf_counter()
+            for text in texts:
+                for to_lang in to_langs:
+                    translator.translate(text, "cn", to_lang)
+            sequential = (time.perf_counter() - start) / sentences
+
+            translator = _make_bench_translator(url)
+            start = time.perf_counter()
+            for text in texts:
+                translator.translate_multi(text, "cn", to_langs)
+            fanout = (time.perf_counter() - start) / sentences
+
+            print(f"{len(to_langs):<8}{sequential * 1000:>14.1f}{fanout * 1000:>14.1f}{sequential / fanout:>8.1f}x")
+    finally:
+        server.shutdown()
+
+
+def _scripted_speech_corpus(count, seed=3):
+    """
+    模拟一场重复性很强的脚本化演讲的ASR输出：少量固定句子反复出现，
+    约一半带有一个字的识别差异（替换、删除或插入）
+    """
+    rng = random.Random(seed)
+    subjects = ["我们", "公司", "团队", "各位来宾", "本季度"]
+    verbs = ["重点介绍", "简单回顾", "详细说明", "再次强调", "一起讨论"]
+    objects = ["新产品的核心功能", "市场推广的整体方案", "客户服务的改进计划", "下一阶段的工作重点"]
+    scripts = [f"{s}{v}{o}" for s in subjects for v in verbs for o in objects]
+    noise = "的了是在和有就也这那个们"
+    corpus = []
+    for _ in range(count):
+        text = rng.choice(scripts[:30]) if rng.random() < 0.8 else rng.choice(scripts)
+        if rng.random() < 0.5:
+            pos = rng.randrange(len(text))
+            op = rng.choice(("sub", "del", "ins"))
+            if op == "sub":
+                text = text[:pos] + rng.choice(noise) + text[pos + 1:]
+            elif op == "del":
+                text = text[:pos] + text[pos + 1:]
+            else:
+                text = text[:pos] + rng.choice(noise) + text[pos:]
+        corpus.append(text)
+    return corpus
+
+
+def bench_translation_memory(count=2000):
+    """翻译记忆模糊匹配：API调用次数、命中率与查找延迟"""
+    print("\n=== 翻译记忆（n-gram模糊匹配） ===")
+    corpus = _scripted_speech_corpus(count)
+    print(f"语料: {count} 句, 不同句子 {len(set(corpus))} 个")
+
+    print(f"{'配置':<16}{'API调用':>8}{'记忆命中率':>12}")
+    for name, memory in (("仅精确缓存", None),
+                         ("记忆 阈值0.85", TranslationMemory(threshold=0.85)),
+                         ("记忆 阈值0.75", TranslationMemory(threshold=0.75))):
+        server, url = start_server(config=FakeServerConfig(latency=0))
+        translator = _make_bench_translator(url, translation_memory=memory)
+        for text in corpus:
+            translator.translate(text, "cn", "en")
+        api_calls = server.stats.snapshot()["requests"]
+        server.shutdown()
+        hit_rate = f"{memory.hits / memory.lookups:.0%}" if memory and memory.lookups else "-"
+        print(f"{name:<16}{api_calls:>8}{hit_rate:>12}")
+
+    # 查找延迟：记忆库装满后测量
+    memory = TranslationMemory(capacity=2000)
+    rng = random.Random(5)
+    alphabet = "我们今天讨论产品计划市场销售团队目标客户问题方案时间的了是在和有就也"
+    for i in range(memory.capacity):
+        memory.add("".join(rng.choice(alphabet) for _ in range(rng.randint(8, 30))), "cn", "en", f"t{i}")
+    latencies = []
+    for text in corpus[:1000]:
+        start = time.perf_counter()
+        memory.lookup(text, "cn", "en")
+        latencies.append(time.perf_counter() - start)
+    print(f"查找延迟（{len(memory)} 条记录）: p50 {percentile(latencies, 50) * 1e6:.0f} us, "
+          f"p99 {percentile(latencies, 99) * 1e6:.0f} us")
+
+
+def _recorded_responses(count, seed=13):
+    """构造一批ITS响应正文（约5%为错误响应），模拟录制的线上响应"""
+    rng = random.Random(seed)
+    corpus = _scripted_speech_corpus(count)
+    responses = []
+    for text in corpus:
+        if rng.random() < 0.05:
+            payload = build_error_response(10163, "engine error")
+        else:
+            payload = build_success_response(text * rng.randint(1, 4), "cn", rng.choice(["en", "ja", "es"]))
+        responses.append(json.dumps(payload).encode("utf-8"))
+    return responses
+
+
+class _RecordedResponse:
+    """只包含正文的响应对象"""
+
+    def __init__(self, content):
+        self.content = content
+
+
+def _legacy_parse_response(response):
+    """优化前的解析逻辑（两次解码 + 裸except），作为对照"""
+    try:
+        result = json.loads(response.content.decode())
+        if 'payload' in result and 'result' in result['payload'] and 'text' in result['payload']['result']:
+            translated_text = base64.b64decode(result['payload']['result']['text']).decode()
+            try:
+                json_result = json.loads(translated_text)
+                if 'trans_result' in json_result and 'dst' in json_result['trans_result']:
+                    return json_result['trans_result']['dst']
+                elif 'dst' in json_result:
+                    return json_result['dst']
+                else:
+                    return translated_text
+            except:
+                return translated_text
+        else:
+            print(f"翻译API错误: {result}")
+            return None
+    except Exception as e:
+        print(f"解析响应出错: {str(e)}")
+        return None
+
+
+def bench_response_parsing(count=5000, rounds=10):
+    """响应解析的CPU开销：旧解析逻辑 vs 新解析逻辑（标准json / 当前加速库）"""
+    print("\n=== 响应解析CPU开销 ===")
+    responses = [_RecordedResponse(content) for content in _recorded_responses(count)]
+
+    def measure(parse):
+        best = None
+        for _ in range(rounds):
+            start = time.process_time()
+            for response in responses:
+                parse(response)
+            elapsed = time.process_time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best / count * 1e6
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = measure(_legacy_parse_response)
+
+    def stdlib_loads(content):
+        # 与translation_module在没有加速库时的回退实现一致
+        if isinstance(content, (bytes, bytearray)):
+            content = content.decode("utf-8")
+        return json.loads(content)
+
+    fast_loads = translation_module.json_loads
+    translation_module.json_loads = stdlib_loads
+    try:
+        stdlib = measure(lambda r: translation_module.parse_its_response(r.content))
+    finally:
+        translation_module.json_loads = fast_loads
+    fast = measure(lambda r: translation_module.parse_its_response(r.content))
+
+    print(f"{'旧解析 (json)':<24}{legacy:>8.2f} us/响应")
+    print(f"{'新解析 (json)':<24}{stdlib:>8.2f} us/响应")
+    print(f"{'新解析 (' + translation_module.JSON_BACKEND + ')':<24}{fast:>8.2f} us/响应")
+    print(f"加速比: {legacy / fast:.2f}x")
+
+
+def _legacy_detect_language(text):
+    """优化前的逐字符语言检测，作为对照"""
+    char_counts = {'cn': 0, 'en': 0, 'ja': 0, 'es': 0, 'other': 0}
+    for char in text:
+        if '\u4e00' <= char <= '\u9fff':
+            char_counts['cn'] += 1
+        elif ('a' <= char.lower() <= 'z') or char in "''":
+            char_counts['en'] += 1
+        elif '\u3040' <= char <= '\u30ff':
+            char_counts['ja'] += 1
+        elif char in 'áéíóúüñ¿¡':
+            char_counts['es'] += 1
+        elif char.isalpha():
+            char_counts['other'] += 1
+    if char_counts['ja'] > 0:
+        return 'ja'
+    elif char_counts['cn'] > char_counts['en'] and char_counts['cn'] > char_counts['other']:
+        return 'cn'
+    elif char_counts['es'] > 0 and char_counts['en'] > 0:
+        return 'es'
+    elif char_counts['en'] > 0:
+        return 'en'
+    return 'en'
+
+
+# 语言检测准确率样本：(文本, 期望的语言代码)
+LANGUAGE_SAMPLES = [
+    ("今天的会议主要讨论下一季度的产品规划。", "cn"),
+    ("请大家先看一下屏幕上的数据，我们的用户增长很快。", "cn"),
+    ("我们用iPhone和Android两个平台测试了新功能，效果都很好。", "cn"),
+    ("The meeting will focus on the product roadmap for next quarter.", "en"),
+    ("Please take a look at the data on the screen.", "en"),
+    ("It's a great pleasure to welcome you all to this conference.", "en"),
+    ("今日の会議では来期の製品計画について話し合います。", "ja"),
+    ("こんにちは、よろしくお願いします。", "ja"),
+    ("¿Dónde está la sala de conferencias?", "es"),
+    ("La reunión se centrará en la planificación del producto.", "es"),
+    ("el equipo de ventas presenta los resultados del mes", "es"),
+    ("Saya tidak bisa datang ke kantor hari ini karena sakit.", "id"),
+    ("Rapat ini akan membahas rencana produk untuk kuartal depan dan target penjualan.", "id"),
+    ("Terima kasih atas kehadiran anda di acara yang sangat penting ini.", "id"),
+    ("Cuộc họp sẽ tập trung vào kế hoạch sản phẩm cho quý tới.", "vi"),
+    ("Xin chào, rất vui được gặp các bạn.", "vi"),
+    ("Tôi không biết nói tiếng Anh.", "vi"),
+    ("การประชุมนี้จะเน้นเรื่องแผนผลิตภัณฑ์สำหรับไตรมาสหน้า", "th"),
+    ("สวัสดีครับ ยินดีต้อนรับทุกท่าน", "th"),
+    ("ขอบคุณมากครับ", "th"),
+]
+
+
+def bench_detect_language(repeat=200, rounds=5):
+    """
+    语言检测：长混合文本上的速度对比，以及带标注样本的准确率
+
+    返回:
+        标注样本全部判对时为True；有误判时为False，命令行以非零状态退出
+    """
+    print("\n=== 语言检测 ===")
+    misclassified = [(text, lang, detect_language(text)) for text, lang in LANGUAGE_SAMPLES]
+    misclassified = [item for item in misclassified if item[1] != item[2]]
+    correct_new = len(LANGUAGE_SAMPLES) - len(misclassified)
+    correct_old = sum(_legacy_detect_language(text) == lang for text, lang in LANGUAGE_SAMPLES)
+    print(f"准确率: 新 {correct_new}/{len(LANGUAGE_SAMPLES)}, 旧 {correct_old}/{len(LANGUAGE_SAMPLES)}")
+    for text, lang, detected in misclassified:
+        print(f"  误判: {text[:30]} 期望 {lang} 实际 {detected}")
+
+    # 长文本：所有样本拼接后重复，模拟整篇文档
+    documents = {
+        "中文为主": "".join(text for text, lang in LANGUAGE_SAMPLES if lang == "cn") * repeat,
+        "英文为主": " ".join(text for text, lang in LANGUAGE_SAMPLES if lang == "en") * repeat,
+        "混合文字(无假名)": " ".join(text for text, lang in LANGUAGE_SAMPLES if lang != "ja") * repeat,
+    }
+    print(f"{'文本':<14}{'长度':>10}{'旧(ms)':>10}{'新(ms)':>10}{'加速比':>8}")
+    for name, document in documents.items():
+        old = min(timeit.repeat(lambda: _legacy_detect_language(document), number=1, repeat=rounds))
+        new = min(timeit.repeat(lambda: detect_language(document), number=1, repeat=rounds))
+        print(f"{name:<14}{len(document):>10}{old * 1000:>10.2f}{new * 1000:>10.2f}{old / new:>8.1f}x")
+    return not misclassified
+
+
+def _make_self_signed_cert(directory):
+    """用openssl生成127.0.0.1的自签名证书，返回(证书路径, 私钥路径)"""
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", keyfile, "-out", certfile, "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return certfile, keyfile
+
+
+def bench_connection_warmup(trials=5, connect_latency=0.1, keepalive_expiry=1.0):
+    """本地TLS模拟服务上的首个请求延迟：冷启动 / 预热 / 空闲过期后 / 保活"""
+    print("\n=== 连接预热与保活 ===")
+    with tempfile.TemporaryDirectory() as directory:
+        certfile, keyfile = _make_self_signed_cert(directory)
+        config = FakeServerConfig(latency=0.02, connect_latency=connect_latency)
+        server, url = start_server(config=config, certfile=certfile, keyfile=keyfile)
+        if translation_module.use_httpx:
+            verify = ssl.create_default_context(cafile=certfile)
+        else:
+            verify = certfile
+        print(f"HTTP库: {translation_module.HTTP_BACKEND}, 服务延迟 {config.latency * 1000:.0f} ms, "
+              f"新连接额外延迟 {connect_latency * 1000:.0f} ms, 空闲连接保持 {keepalive_expiry:.1f} s")
+
+        def timed_translate(translator, index):
+            start = time.perf_counter()
+            translator.translate(f"预热测试{index}", "cn", "en", use_cache=False)
+            return time.perf_counter() - start
+
+        results = {"冷启动首个请求": [], "预热后首个请求": [], "空闲过期后(无保活)": [], "空闲过期后(保活)": []}
+        try:
+            for i in range(trials):
+                translator = _make_bench_translator(url, verify=verify, keepalive_expiry=keepalive_expiry)
+                results["冷启动首个请求"].append(timed_translate(translator, i))
+                time.sleep(keepalive_expiry * 1.5)
+                results["空闲过期后(无保活)"].append(timed_translate(translator, i))
+                translator.close()
+
+                translator = _make_bench_translator(url, verify=verify, keepalive_expiry=keepalive_expiry,
+                                                    keep_warm=True)
+                while translator._last_activity == 0:
+                    time.sleep(0.01)
+                results["预热后首个请求"].append(timed_translate(translator, i))
+                time.sleep(keepalive_expiry * 1.5)
+                results["空闲过期后(保活)"].append(timed_translate(translator, i))
+                translator.close()
+        finally:
+            server.shutdown()
+
+    for name, latencies in results.items():
+        print(f"{name:<20}{sum(latencies) / len(latencies) * 1000:>10.1f} ms")
+
+
+def bench_backends(count=64, batch_size=16):
+    """在线ITS后端（本地模拟服务）与本地CTranslate2后端的延迟与吞吐量对比"""
+    print("\n=== 翻译后端对比 ===")
+    texts, _ = _short_finals(count)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    def measure(backend):
+        latencies = []
+        for text in texts[:batch_size]:
+            start = time.perf_counter()
+            backend.translate(text, "cn", "en", use_cache=False)
+            latencies.append(time.perf_counter() - start)
+        backend.clear_cache()
+        start = time.perf_counter()
+        for batch in batches:
+            backend.batch_translate(batch, "cn", "en")
+        elapsed = time.perf_counter() - start
+        caps = backend.capabilities()
+        print(f"{caps['name']:<14}{'离线' if caps['offline'] else '在线':<6}"
+              f"单句p50 {percentile(latencies, 50) * 1000:>8.1f} ms   批量吞吐 {count / elapsed:>8.1f} 句/s")
+
+    server, url = start_server(config=FakeServerConfig(latency=0.05))
+    translator = _make_bench_translator(url)
+    try:
+        measure(translator)
+    finally:
+        translator.close()
+        server.shutdown()
+
+    # 本地模型目录通过环境变量指定，例如 BENCH_LOCAL_MODEL=models/opus-mt-zh-en-ct2
+    model_dir = os.environ.get("BENCH_LOCAL_MODEL")
+    if not local_translation.local_translation_available or not model_dir:
+        print("跳过本地后端: 需要安装 ctranslate2/transformers 并设置 BENCH_LOCAL_MODEL")
+        return
+    backend = local_translation.LocalTranslationBackend({("cn", "en"): model_dir}, max_batch_size=batch_size)
+    measure(backend)
+
+
+def bench_metrics(number=200000, count=200):
+    """指标采集开销（缓存命中路径）以及注入故障后的快照与Prometheus导出"""
+    print("\n=== 翻译指标 ===")
+    translator = TranslationModule(BENCH_APP_ID, BENCH_API_SECRET, BENCH_API_KEY)
+    translator.cache.put(translator.cache_key("你好", "cn", "en", True), "hello")
+    elapsed = timeit.timeit(lambda: translator.translate("你好", "cn", "en"), number=number)
+    _report("translate（缓存命中，含指标）", number, elapsed)
+    elapsed = timeit.timeit(lambda: translator.metrics.observe("hit", "cn", "en", 0.0), number=number)
+    _report("metrics.observe", number, elapsed)
+    translator.close()
+
+    config = FakeServerConfig(latency=0.01, latency_dist="exponential", error_rate=0.05, api_error_rate=0.03)
+    server, url = start_server(config=config)
+    translator = _make_bench_translator(url, retry_backoff=0.01)
+    exporter = translation_module.start_metrics_server(translator.metrics, port=0)
+    try:
+        texts = [f"第{i % (count // 2)}句测试文本" for i in range(count)]
+        for target in ("en", "ja"):
+            for text in texts:
+                translator.translate(text, "cn", target)
+        snapshot = translator.get_metrics()
+        print(f"计数: {snapshot['counters']}")
+        print(f"API错误率: {snapshot['error_rate']:.1%}, 进行中: {snapshot['in_flight']}")
+        for cache_result, pairs in snapshot["latency"].items():
+            for pair, stats in pairs.items():
+                print(f"  {cache_result:<6}{pair:<8}{stats['count']:>6} 次  p50 {stats['p50_ms']:>8.3f} ms  "
+                      f"p99 {stats['p99_ms']:>8.3f} ms")
+        scrape_url = f"http://127.0.0.1:{exporter.server_address[1]}/metrics"
+        with urllib.request.urlopen(scrape_url) as response:
+            lines = response.read().decode("utf-8").splitlines()
+        print(f"Prometheus导出 {scrape_url}: {len(lines)} 行")
+    finally:
+        exporter.shutdown()
+        translator.close()
+        server.shutdown()
+
+
+def bench_bulk_job(paragraphs=60, latency=0.2):
+    """大文档批量翻译：顺序 vs 并行（保持默认请求间隔），以及中断后从检查点续传"""
+    print("\n=== 批量文档翻译 ===")
+    rng = random.Random(5)
+    sentences = _scripted_speech_corpus(200)
+    items = ["。".join(rng.choice(sentences) for _ in range(rng.randint(5, 60))) + "。" for _ in range(paragraphs)]
+    total_chars = sum(len(item) for item in items)
+    server, url = start_server(config=FakeServerConfig(latency=latency, latency_dist="exponential"))
+    print(f"文档 {len(items)} 段, {total_chars} 字符, 服务平均延迟 {latency * 1000:.0f} ms, 请求间隔 50 ms")
+
+    def run_job(workers, checkpoint_path=None, stop_after=None):
+        translator = TranslationModule(BENCH_APP_ID, BENCH_API_SECRET, BENCH_API_KEY, url=url)
+        job = bulk_translation.BulkTranslationJob(translator, items, "cn", "en", max_chars=1000,
+                                                  workers=workers, checkpoint_path=checkpoint_path)
+        if stop_after:
+            threading.Timer(stop_after, job.stop).start()
+        requests_before = server.stats.snapshot()["requests"]
+        translations = job.run()
+        translator.close()
+        return job, translations, server.stats.snapshot()["requests"] - requests_before
+
+    try:
+        print(f"{'方式':<16}{'请求块':>8}{'请求数':>8}{'耗时(s)':>10}{'字符/s':>10}")
+        for workers in (1, 8):
+            job, translations, requests = run_job(workers)
+            assert translations is not None and len(translations) == len(items)
+            print(f"{f'{workers}路并行':<16}{len(job.chunks):>8}{requests:>8}"
+                  f"{job.stats['elapsed']:>10.2f}{job.throughput():>10.0f}")
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint_path = os.path.join(directory, "job.checkpoint.jsonl")
+            job, translations, requests = run_job(8, checkpoint_path, stop_after=0.5)
+            print(f"{'中断(0.5s)':<16}{job.stats['translated']:>8}{requests:>8}{job.stats['elapsed']:>10.2f}")
+            job, translations, requests = run_job(8, checkpoint_path)
+            assert translations is not None
+            print(f"{'续传':<16}{job.stats['translated']:>8}{requests:>8}{job.stats['elapsed']:>10.2f}"
+                  f"{job.throughput():>10.0f}   (从检查点恢复 {job.stats['resumed']} 块)")
+    finally:
+        server.shutdown()
+
+
+def bench_parallel_reorder(count=40, timeout=1.5):
+    """
+    API延迟抖动下的端到端延迟：单路顺序翻译 vs 多路并发翻译 + 重排缓冲（可选超时跳过）
+
+    延迟为句子识别完成到译文按顺序输出的时间，包括排在慢请求后面的等待。
+    """
+    print("\n=== 并发翻译与重排缓冲 ===")
+    config = FakeServerConfig(latency=0.15, latency_dist="lognormal", slow_rate=0.1, slow_latency=3.0)
+    server, url = start_server(config=config)
+    rng = random.Random(17)
+    alphabet = "我们今天讨论产品计划市场销售团队目标客户问题方案时间"
+    sentences = ["".join(rng.choice(alphabet) for _ in range(rng.randint(8, 20))) + f"{i}。" for i in range(count)]
+    gaps = [rng.uniform(0.15, 0.35) for _ in range(count)]
+    print(f"{count}句, 到达间隔 0.15~0.35 s, 服务延迟中位数 150 ms (lognormal), 10%的请求 3 s")
+
+    def run(workers, translation_timeout):
+        random.seed(23)
+        translator = _make_bench_translator(url)
+        engine = PipelineEngine(translator, PipelineConfig(tts_enabled=False, use_batcher=False,
+                                                           translation_workers=workers,
+                                                           translation_timeout=translation_timeout))
+        outputs = []
+        engine.add_listener(lambda event: outputs.append(event) if event.kind == EVENT_TRANSLATION else None)
+        engine.start()
+        for text, gap in zip(sentences, gaps):
+            time.sleep(gap)
+            engine.submit_asr(text, text, True)
+        engine.stop(drain=True)
+        engine.close()
+        seqs = [event.data["sentence"].seq for event in outputs]
+        assert seqs == sorted(seqs) and len(seqs) == count, "译文没有按识别顺序输出"
+        latencies = [event.time - event.data["sentence"].created for event in outputs]
+        return latencies, engine.get_stats()["translation"]["skipped"]
+
+    print(f"{'方式':<20}{'平均(ms)':>10}{'p95(ms)':>10}{'最大(ms)':>10}{'跳过':>6}")
+    try:
+        for label, workers, translation_timeout in (("单路顺序", 1, None), ("4路并发", 4, None),
+                                                    (f"4路并发+超时{timeout:g}s", 4, timeout)):
+            latencies, skipped = run(workers, translation_timeout)
+            print(f"{label:<20}{sum(latencies) / len(latencies) * 1000:>10.0f}"
+                  f"{percentile(latencies, 95) * 1000:>10.0f}{max(latencies) * 1000:>10.0f}{skipped:>6}")
+    finally:
+        server.shutdown()
+
+
+BENCHMARKS = {
+    "prepare": bench_request_preparation,
+    "retry": bench_retry_hedge,
+    "batch": bench_micro_batching,
+    "incremental": bench_incremental,
+    "fanout": bench_fanout,
+    "memory": bench_translation_memory,
+    "parse": bench_response_parsing,
+    "detect": bench_detect_language,
+    "warmup": bench_connection_warmup,
+    "backends": bench_backends,
+    "metrics": bench_metrics,
+    "bulk": bench_bulk_job,
+    "reorder": bench_parallel_reorder,
+}
+
+
+if __name__ == "__main__":
+    # 用法: python bench_translation.py [测试名 ...]，不带参数时运行全部测试
+    # 带正确性检查的测试返回False时，全部运行完后以非零状态退出
+    names = sys.argv[1:] or list(BENCHMARKS)
+    failed = []
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知的测试: {name}，可选: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        if BENCHMARKS[name]() is False:
+            failed.append(name)
+    if failed:
+        print(f"\n未通过检查: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,578 @@
+# bench_tts.py - 语音合成与播放环节的基准测试（不访问微软TTS服务，不需要声卡）
+import array
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+import fake_edge_tts
+import tts_audio
+import tts_backlog
+import tts_cache
+import tts_voices
+from tts_audio import SAMPLE_RATE, SAMPLE_WIDTH, AudioEngine
+
+
+def _report(name, number, elapsed):
+    """打印单项测试结果"""
+    per_call_us = elapsed / number * 1e6
+    print(f"{name:<32}{number:>10} 次  {per_call_us:>10.2f} us/次")
+    return per_call_us
+
+
+class _PcmPassthrough:
+    """模拟数据块本身就是PCM时使用的解码器"""
+
+    def decode(self, data):
+        return data
+
+    def flush(self):
+        return b""
+
+
+async def _simulated_stream(duration, ttfb=0.25, speed=4.0, chunk_duration=0.1):
+    """
+    按edge-tts的节奏产生数据块：首包延迟ttfb秒，之后以实时速度的speed倍陆续到达
+
+    数据内容为静音PCM，只用于测量时序。
+    """
+    chunk_bytes = int(SAMPLE_RATE * chunk_duration) * SAMPLE_WIDTH
+    await asyncio.sleep(ttfb)
+    for i in range(int(duration / chunk_duration)):
+        if i:
+            await asyncio.sleep(chunk_duration / speed)
+        yield {"type": "WordBoundary", "offset": i, "duration": 0, "text": ""}
+        yield {"type": "audio", "data": bytes(chunk_bytes)}
+
+
+async def _play_whole(chunks, engine):
+    """原来的方式：收齐全部音频后再开始播放，返回(开始出声耗时, AudioClip)"""
+    start = time.perf_counter()
+    audio_chunks = []
+    async for chunk in chunks:
+        if chunk["type"] == "audio":
+            audio_chunks.append(chunk["data"])
+    clip = engine.play(b"".join(audio_chunks))
+    await clip.wait_async()
+    return clip.first_sound_time - start, clip
+
+
+def bench_audio_concat(chunks=500, chunk_bytes=720):
+    """收集音频数据：bytes反复拼接 vs 列表+join（约60秒48kbps MP3）"""
+    print("\n=== 音频数据拼接 ===")
+    data = [bytes(chunk_bytes)] * chunks
+
+    def concat():
+        audio_data = bytes()
+        for chunk in data:
+            audio_data += chunk
+        return audio_data
+
+    _report("bytes +=", 20, timeit.timeit(concat, number=20))
+    _report("list + b''.join", 20, timeit.timeit(lambda: b"".join(list(data)), number=20))
+
+
+def bench_time_to_first_sound(durations=(2, 5, 10), ttfb=0.25, speed=4.0):
+    """首次出声时间：整段合成后播放 vs 流式播放（空输出，按实时速度消费）"""
+    print("\n=== 首次出声时间 ===")
+    print(f"模拟服务: 首包 {ttfb * 1000:.0f} ms, 合成速度 {speed:.0f}x 实时（数据块为PCM，不含MP3解码耗时）")
+    engine = AudioEngine(null_sink=True, prebuffer=0.2)
+    decoder = _PcmPassthrough()
+
+    async def run():
+        print(f"{'语音时长(s)':<12}{'整段播放(ms)':>14}{'流式播放(ms)':>14}{'断流次数':>10}")
+        for duration in durations:
+            whole, _ = await _play_whole(_simulated_stream(duration, ttfb, speed), engine)
+            stats = await tts_audio.play_stream(_simulated_stream(duration, ttfb, speed), engine, decoder)
+            print(f"{duration:<12}{whole * 1000:>14.0f}{stats['first_sound'] * 1000:>14.0f}"
+                  f"{stats['clip'].underruns:>10}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        engine.close()
+
+
+def _synthetic_voice_list(locales=140, per_locale=3):
+    """生成与edge-tts格式相同的音色列表"""
+    voices = []
+    for i in range(locales):
+        locale = f"x{i // 26:x}-{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}"
+        for j in range(per_locale):
+            voices.append({"Name": f"Microsoft Server Speech Text to Speech Voice ({locale}, Voice{j}Neural)",
+                           "ShortName": f"{locale}-Voice{j}Neural", "Gender": "Female" if j % 2 else "Male",
+                           "Locale": locale, "FriendlyName": f"Voice{j} Online (Natural)"})
+    return voices + [{"ShortName": "zh-CN-XiaoxiaoNeural", "Locale": "zh-CN", "Gender": "Female"}]
+
+
+def bench_voice_catalog(fetch_latency=0.4, lookups=20):
+    """音色目录：每次查询都拉取 vs 内存/磁盘缓存（切换目标语言时的等待时间）"""
+    print("\n=== 音色目录缓存 ===")
+    catalog_voices = _synthetic_voice_list()
+    fetch_count = 0
+    online = True
+
+    async def fetch():
+        nonlocal fetch_count
+        fetch_count += 1
+        await asyncio.sleep(fetch_latency)
+        if not online:
+            raise ConnectionError("offline")
+        return catalog_voices
+
+    async def uncached_lookup(locale):
+        voices = await fetch()
+        return [v for v in voices if v["Locale"] == locale]
+
+    async def timed(coro_factory, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            await coro_factory()
+        return (time.perf_counter() - start) / count
+
+    async def run():
+        nonlocal online
+        print(f"音色 {len(catalog_voices)} 个, 模拟拉取延迟 {fetch_latency * 1000:.0f} ms")
+        uncached = await timed(lambda: uncached_lookup("zh-CN"), 3)
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = os.path.join(directory, "voices.json")
+            catalog = tts_voices.VoiceCatalog(fetch, cache_path=cache_path)
+            cold = await timed(lambda: catalog.list_locale("zh-CN"), 1)
+            warm = await timed(lambda: catalog.list_locale("zh-CN"), lookups)
+
+            # 模拟重启后离线：新实例只能读磁盘缓存
+            online = False
+            restarted = tts_voices.VoiceCatalog(fetch, cache_path=cache_path, ttl=0)
+            start = time.perf_counter()
+            instant = restarted.cached_voices("zh-CN")
+            disk = time.perf_counter() - start
+            await restarted.list_locale("zh-CN")
+            await asyncio.sleep(fetch_latency * 1.5)  # 等待后台刷新失败
+            still_there = restarted.cached_voices("zh-CN")
+
+        print(f"{'每次拉取后筛选':<20}{uncached * 1000:>10.2f} ms/次")
+        print(f"{'缓存: 首次(无磁盘缓存)':<20}{cold * 1000:>10.2f} ms")
+        print(f"{'缓存: 内存命中':<20}{warm * 1000:>10.4f} ms/次")
+        print(f"{'缓存: 重启后读磁盘':<20}{disk * 1000:>10.2f} ms   (离线, 找到 {len(instant)} 个音色, "
+              f"后台刷新失败后仍有 {len(still_there)} 个)")
+        print(f"拉取次数: {fetch_count}")
+
+    asyncio.run(run())
+
+
+def bench_segmented_synthesis(lengths=(50, 200, 500, 1000), ttfb=0.2, ttfb_per_char=0.002, speed=15.0,
+                              parallel=3):
+    """长文本：整段一次合成 vs 分段并行合成的首段音频时间和合成总耗时（本地模拟TTS服务）"""
+    print("\n=== 长文本分段并行合成 ===")
+    print(f"模拟服务: 首包 {ttfb * 1000:.0f} ms + {ttfb_per_char * 1000:.0f} ms/字, 合成速度 {speed:.0f}x 实时, "
+          f"并行 {parallel} 段")
+    sentence = "今天的会议主要讨论明年的产品规划，以及各个团队之间如何更好地协作。"
+
+    def source(text):
+        return lambda: _simulated_stream(tts_backlog.estimate_speech_duration(text),
+                                         ttfb + ttfb_per_char * len(text), speed)
+
+    async def measure(prefetched):
+        start = time.perf_counter()
+        first = None
+        async for _ in prefetched.stream():
+            if first is None:
+                first = time.perf_counter() - start
+        return first, time.perf_counter() - start
+
+    async def run():
+        print(f"{'字数':<8}{'片段数':>8}{'整段首段(ms)':>14}{'分段首段(ms)':>14}{'整段总计(ms)':>14}{'分段总计(ms)':>14}")
+        for length in lengths:
+            text = (sentence * (length // len(sentence) + 1))[:length]
+            pieces = tts_audio.split_speech_text(text)
+            whole_first, whole_total = await measure(tts_audio.PrefetchedAudio(source(text)()))
+            segmented = tts_audio.SegmentedAudio([source(piece) for piece in pieces], parallel)
+            first, total = await measure(segmented)
+            print(f"{length:<8}{len(pieces):>8}{whole_first * 1000:>14.0f}{first * 1000:>14.0f}"
+                  f"{whole_total * 1000:>14.0f}{total * 1000:>14.0f}")
+
+    asyncio.run(run())
+
+
+def _event_utterances(count, seed=11):
+    """模拟一场活动的译文序列：约六成是反复出现的固定说法，其余为一次性句子"""
+    rng = random.Random(seed)
+    fixed = [f"Fixed phrase number {i} for this event." for i in range(40)]
+    weights = [1 / (i + 1) for i in range(len(fixed))]
+    return [rng.choices(fixed, weights)[0] if rng.random() < 0.6 else f"Unique sentence {i} said only once."
+            for i in range(count)]
+
+
+def bench_speech_cache(count=300, ttfb=0.25, speed=4.0):
+    """合成语音缓存：命中率与节省的合成等待时间（含重启后只剩磁盘层的情况）"""
+    print("\n=== 合成语音缓存 ===")
+    utterances = _event_utterances(count)
+    bytes_per_second = 6000  # 48kbps MP3
+
+    def synthesis_time(text):
+        return ttfb + len(text) * 0.07 / speed  # 英文约每字符70ms语音
+
+    def run_session(cache):
+        waited = saved = 0.0
+        for text in utterances:
+            start = time.perf_counter()
+            audio_data = cache.get(text, "en-US-AriaNeural")
+            lookup = time.perf_counter() - start
+            if audio_data is None:
+                waited += synthesis_time(text)
+                cache.put(text, "en-US-AriaNeural", os.urandom(int(len(text) * 0.07 * bytes_per_second)))
+            else:
+                waited += lookup
+                saved += synthesis_time(text) - lookup
+        return waited, saved
+
+    uncached = sum(synthesis_time(text) for text in utterances)
+    with tempfile.TemporaryDirectory() as directory:
+        rows = [("无缓存", None, uncached, 0.0)]
+        cache = tts_cache.SpeechCache(memory_bytes=2 * 1024 * 1024, disk_dir=directory)
+        waited, saved = run_session(cache)
+        rows.append(("首次会话", cache.get_stats(), waited, saved))
+        cache = tts_cache.SpeechCache(memory_bytes=2 * 1024 * 1024, disk_dir=directory)
+        waited, saved = run_session(cache)
+        rows.append(("重启后(磁盘层)", cache.get_stats(), waited, saved))
+
+    print(f"{count} 句, 模拟合成: 首包 {ttfb * 1000:.0f} ms + 语音时长/{speed:.0f}")
+    print(f"{'会话':<14}{'命中率':>8}{'内存命中':>10}{'磁盘命中':>10}{'合成等待(s)':>14}{'节省(s)':>10}{'平均节省(ms)':>14}")
+    for name, stats, waited, saved in rows:
+        if stats is None:
+            print(f"{name:<14}{'-':>8}{'-':>10}{'-':>10}{waited:>14.1f}{'-':>10}{'-':>14}")
+            continue
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        print(f"{name:<14}{stats['hit_rate']:>8.0%}{stats['memory_hits']:>10}{stats['disk_hits']:>10}"
+              f"{waited:>14.1f}{saved:>10.1f}{saved / hits * 1000 if hits else 0:>14.0f}")
+
+
+def bench_pipelined_playback(durations=(2.0, 1.5, 2.5, 1.0, 2.0, 1.5), ttfb=0.25, speed=4.0, depth=2):
+    """连续多句译文排队时相邻两句之间的静音间隔：逐句合成播放 vs 合成与播放流水线"""
+    print("\n=== 语音合成流水线 ===")
+    print(f"{len(durations)} 句共 {sum(durations):.1f} s 语音, 首包 {ttfb * 1000:.0f} ms, 合成速度 {speed:.0f}x 实时")
+    engine = AudioEngine(null_sink=True, prebuffer=0.2)
+    decoder = _PcmPassthrough()
+
+    def gap_since_previous(clip, previous):
+        return engine.gap_between(previous, clip) if previous else None
+
+    async def sequential_whole():
+        gaps, previous = [], None
+        for duration in durations:
+            _, clip = await _play_whole(_simulated_stream(duration, ttfb, speed), engine)
+            gaps.append(gap_since_previous(clip, previous))
+            previous = clip
+        return gaps
+
+    async def sequential_stream():
+        gaps, previous = [], None
+        for duration in durations:
+            stats = await tts_audio.play_stream(_simulated_stream(duration, ttfb, speed), engine, decoder)
+            gaps.append(gap_since_previous(stats["clip"], previous))
+            previous = stats["clip"]
+        return gaps
+
+    async def pipelined(overlap):
+        slots = asyncio.Semaphore(depth + 1)
+        prefetch_queue = asyncio.Queue()
+
+        async def synthesize():
+            for duration in durations:
+                await slots.acquire()
+                await prefetch_queue.put(tts_audio.PrefetchedAudio(_simulated_stream(duration, ttfb, speed)))
+            await prefetch_queue.put(None)
+
+        async def play(prefetched):
+            try:
+                return await tts_audio.play_stream(prefetched.stream(), engine, decoder)
+            finally:
+                slots.release()
+
+        producer = asyncio.ensure_future(synthesize())
+        playing = []
+        while True:
+            prefetched = await prefetch_queue.get()
+            if prefetched is None:
+                break
+            playing.append(asyncio.ensure_future(play(prefetched)))
+            # overlap: 上一句还在播放时就提交下一句（与应用的播放线程相同），否则等这一句播完
+            if not overlap:
+                await asyncio.wait([playing[-1]])
+            elif len(playing) > 1:
+                await asyncio.wait([playing[-2]])
+        await asyncio.gather(producer, *playing)
+        clips = [task.result()["clip"] for task in playing]
+        return [gap_since_previous(clip, previous) for clip, previous in zip(clips, [None] + clips[:-1])]
+
+    async def run():
+        print(f"{'方式':<20}{'平均间隔(ms)':>14}{'最大间隔(ms)':>14}")
+        for name, mode in (("逐句整段合成后播放", sequential_whole), ("逐句流式播放", sequential_stream),
+                           (f"流水线(提前{depth}句)", lambda: pipelined(False)),
+                           ("流水线+提前提交播放", lambda: pipelined(True))):
+            gaps = [gap for gap in await mode() if gap is not None]
+            print(f"{name:<20}{sum(gaps) / len(gaps) * 1000:>14.1f}{max(gaps) * 1000:>14.1f}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        engine.close()
+
+
+def bench_playback_engine(clips=10, clip_duration=0.51, poll_interval=0.1):
+    """播放引擎：句间静音（播完再提交 vs 提前排队）和播放完成通知延迟（完成事件 vs 轮询）"""
+    print("\n=== 播放引擎 ===")
+    engine = AudioEngine(null_sink=True, prebuffer=0.2)
+    pcm = bytes(int(SAMPLE_RATE * clip_duration) * SAMPLE_WIDTH)
+
+    def gaps_of(played):
+        return [engine.gap_between(previous, clip) for previous, clip in zip(played, played[1:])]
+
+    async def wait_then_submit():
+        played = []
+        for _ in range(clips):
+            clip = engine.play(pcm)
+            await clip.wait_async()
+            played.append(clip)
+        return played
+
+    async def queued():
+        played = [engine.play(pcm) for _ in range(clips)]
+        await played[-1].wait_async()
+        return played
+
+    async def notify_latency(wait):
+        latencies = []
+        for _ in range(clips):
+            clip = engine.play(pcm[:len(pcm) // 4])
+            await wait(clip)
+            latencies.append(time.perf_counter() - clip.done_time)
+        return latencies
+
+    async def poll(clip):
+        while not clip.done.is_set():
+            await asyncio.sleep(poll_interval)
+
+    async def run():
+        print(f"{clips} 段 {clip_duration * 1000:.0f} ms 语音（空输出，数据块 {engine.block_frames / SAMPLE_RATE * 1000:.0f} ms）")
+        print(f"{'句间静音':<20}{'平均(ms)':>12}{'最大(ms)':>12}")
+        for name, mode in (("播完再提交下一句", wait_then_submit), ("提前排队", queued)):
+            gaps = gaps_of(await mode())
+            print(f"{name:<20}{sum(gaps) / len(gaps) * 1000:>12.1f}{max(gaps) * 1000:>12.1f}")
+        print(f"{'完成通知延迟':<20}{'平均(ms)':>12}{'最大(ms)':>12}")
+        for name, wait in ((f"轮询({poll_interval * 1000:.0f} ms)", poll), ("完成事件", lambda clip: clip.wait_async())):
+            latencies = await notify_latency(wait)
+            print(f"{name:<20}{sum(latencies) / len(latencies) * 1000:>12.2f}{max(latencies) * 1000:>12.2f}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        engine.close()
+
+
+def _simulate_backlog(policy, sentences, ttfb, pause, depth):
+    """
+    按应用的合成/播放流程模拟（虚拟时钟）：合成阶段最多领先播放阶段depth+1次合成，
+    每次取出所有已到达的译文交给policy。
+
+    返回:
+        (每句开始播放时落后的秒数列表（按译文顺序，被丢弃的句子为None）, 合成次数)
+    """
+    lags = [None] * len(sentences)
+    index_of = {}   # BacklogItem -> 译文序号
+    submitted = []  # (Utterance, 开始播放时刻, 播放结束时刻)
+    next_index, clock, last_end = 0, 0.0, 0.0
+    while next_index < len(sentences):
+        clock = max(clock, sentences[next_index][1])
+        # 等待播放阶段腾出位置
+        unfinished = [entry for entry in submitted if entry[2] > clock]
+        if len(unfinished) > depth:
+            clock = sorted(entry[2] for entry in unfinished)[-depth - 1]
+        for entry in submitted:
+            if entry[2] <= clock and entry[0] is not None:
+                policy.played(entry[0])
+        submitted = [entry if entry[2] > clock else (None,) + entry[1:] for entry in submitted]
+
+        pending = []
+        while next_index < len(sentences) and sentences[next_index][1] <= clock:
+            text, created, _ = sentences[next_index]
+            item = tts_backlog.BacklogItem(text, created)
+            index_of[item] = next_index
+            pending.append(item)
+            next_index += 1
+        utterances, _, _ = policy.plan(pending)
+        for utterance in utterances:
+            # 实际语音时长与估算有偏差
+            spoken = sum(sentences[index_of[item]][2] for item in utterance.items) / utterance.rate
+            start = max(clock + ttfb, last_end)
+            last_end = start + spoken + pause
+            policy.submitted(utterance)
+            submitted.append((utterance, start, last_end))
+            for item in utterance.items:
+                lags[index_of[item]] = start - item.created
+    return lags, len(submitted)
+
+
+def bench_backlog_policy(count=400, intervals=(1.6, 1.2), ttfb=0.25, pause=0.15, depth=2, seed=5):
+    """快语速回放：说话人产生译文的速度快于正常语速播放时，各策略下听众的稳态落后时间"""
+    print("\n=== 语音积压控制 ===")
+    policies = (
+        ("不控制", dict(target_lag=None, max_lag=None, max_rate=1.0, merge=False)),
+        ("仅加速(1.5x)", dict(target_lag=3.0, max_lag=None, max_rate=1.5, merge=False)),
+        ("加速+合并", dict(target_lag=3.0, max_lag=None, max_rate=1.5, merge=True)),
+        ("仅丢弃", dict(target_lag=None, max_lag=8.0, max_rate=1.0, merge=False)),
+        ("加速+合并+丢弃", dict(target_lag=3.0, max_lag=8.0, max_rate=1.5, merge=True)),
+    )
+    for interval in intervals:
+        rng = random.Random(seed)
+        sentences = []
+        for i in range(count):
+            text = "测" * rng.randint(8, 12)
+            spoken = tts_backlog.estimate_speech_duration(text) * rng.uniform(0.9, 1.1)
+            sentences.append((text, i * interval, spoken))
+        load = sum(spoken + pause for _, _, spoken in sentences) / (count * interval)
+        print(f"\n{count} 句, 每 {interval:.1f} s 一句, 正常语速播放需要 {load:.2f} 倍实时 "
+              f"(首包 {ttfb * 1000:.0f} ms, 句间停顿 {pause * 1000:.0f} ms)")
+        print(f"{'策略':<16}{'稳态平均落后(s)':>16}{'稳态最大落后(s)':>16}{'最终落后(s)':>12}{'合成次数':>10}{'丢弃句数':>10}")
+        for name, options in policies:
+            lags, requests = _simulate_backlog(tts_backlog.BacklogPolicy(**options), sentences, ttfb, pause, depth)
+            steady = [lag for lag in lags[count // 2:] if lag is not None]
+            dropped = sum(1 for lag in lags if lag is None)
+            print(f"{name:<16}{sum(steady) / len(steady):>16.1f}{max(steady):>16.1f}{steady[-1]:>12.1f}"
+                  f"{requests:>10}{dropped:>10}")
+
+
+def _tone_pcm(duration, sample_rate=SAMPLE_RATE, frequency=220.0):
+    """生成带包络的正弦音（16位单声道PCM），比静音更接近语音的编解码开销"""
+    samples = array.array("h", (int(12000 * math.sin(2 * math.pi * frequency * i / sample_rate)
+                                    * (0.5 + 0.5 * math.sin(2 * math.pi * 3 * i / sample_rate)))
+                                for i in range(int(sample_rate * duration))))
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return samples.tobytes()
+
+
+async def _format_stream(data, duration, ttfb, speed, bandwidth, chunk_duration=0.1):
+    """按服务的节奏发送某种格式的音频数据：首包延迟ttfb，之后受合成速度和网络带宽（bit/s）中较慢者限制"""
+    chunks = max(1, int(duration / chunk_duration))
+    chunk_bytes = -(-len(data) // chunks)
+    await asyncio.sleep(ttfb + chunk_bytes * 8 / bandwidth)
+    for i in range(chunks):
+        if i:
+            await asyncio.sleep(max(chunk_duration / speed, chunk_bytes * 8 / bandwidth))
+        yield {"type": "audio", "data": data[i * chunk_bytes:(i + 1) * chunk_bytes]}
+
+
+def bench_output_formats(duration=5.0, ttfb=0.25, speed=10.0, bandwidths=(20e6, 1e6)):
+    """合成输出格式：每秒语音的解码CPU时间和开始出声时间（MP3需要安装 av）"""
+    print("\n=== 合成输出格式 ===")
+    formats = {"pcm": _tone_pcm(duration)}
+    if tts_audio.av_available:
+        formats["mp3"] = fake_edge_tts.encode_mp3(_tone_pcm(duration), SAMPLE_RATE, 48000)
+        formats["mp3-low"] = fake_edge_tts.encode_mp3(_tone_pcm(duration, 16000), 16000, 32000)
+    else:
+        print("未安装 av，只测量原始PCM（MP3格式的解码需要PyAV）")
+
+    print(f"{duration:.0f} 秒语音, 数据块 100 ms")
+    print(f"{'格式':<10}{'数据量(KB)':>12}{'解码CPU(ms/秒语音)':>20}")
+    for name, data in formats.items():
+        chunk_bytes = -(-len(data) // int(duration / 0.1))
+        rounds = 20
+        start = time.process_time()
+        for _ in range(rounds):
+            decoder = tts_audio.create_decoder(name)
+            for offset in range(0, len(data), chunk_bytes):
+                decoder.decode(data[offset:offset + chunk_bytes])
+            decoder.flush()
+        cpu = (time.process_time() - start) / rounds / duration
+        print(f"{name:<10}{len(data) / 1024:>12.1f}{cpu * 1000:>20.3f}")
+
+    engine = AudioEngine(null_sink=True, prebuffer=0.2)
+
+    async def run():
+        print(f"开始出声时间: 首包 {ttfb * 1000:.0f} ms, 合成速度 {speed:.0f}x 实时")
+        print(f"{'格式':<10}" + "".join(f"{f'{bandwidth / 1e6:g} Mbps(ms)':>16}" for bandwidth in bandwidths))
+        for name, data in formats.items():
+            row = []
+            for bandwidth in bandwidths:
+                stats = await tts_audio.play_stream(_format_stream(data, duration, ttfb, speed, bandwidth),
+                                                    engine, tts_audio.create_decoder(name))
+                row.append(stats["first_sound"])
+            print(f"{name:<10}" + "".join(f"{value * 1000:>16.0f}" for value in row))
+
+    try:
+        asyncio.run(run())
+    finally:
+        engine.close()
+
+
+def _load_edge_tts_offline(output_format):
+    """以本地模拟服务和空输出加载edge_TTS（只需安装语音服务以外的依赖）"""
+    os.environ["TTS_SERVICE"] = "fake"
+    os.environ["TTS_AUDIO_SINK"] = "null"
+    import edge_TTS
+    edge_TTS.OUTPUT_FORMAT = output_format
+    edge_TTS.voice_catalog.cache_path = None
+    return edge_TTS
+
+
+def bench_speech_service(texts=("你好。", "今天的会议主要讨论明年的产品规划。",
+                                "Thanks everyone for joining, let's get started with the agenda for today."),
+                         ttfb=0.25, speed=10.0, chunk_duration=0.1):
+    """语音输出环节端到端（edge_TTS + 本地模拟服务 + 空输出）：音色列表、首段音频、开始出声和播放完成时间"""
+    print("\n=== 语音输出环节(本地模拟服务) ===")
+    output_format = "pcm" if not tts_audio.av_available else "mp3"
+    edge_TTS = _load_edge_tts_offline(output_format)
+    fake_edge_tts.configure(ttfb=ttfb, speed=speed, chunk_duration=chunk_duration, voices_latency=0.05)
+    print(f"模拟服务: 首包 {ttfb * 1000:.0f} ms, {speed:.0f}x 实时, 数据块 {chunk_duration * 1000:.0f} ms, "
+          f"输出格式 {edge_TTS.active_output_format()}")
+
+    async def run():
+        start = time.perf_counter()
+        locales = await edge_TTS.get_available_languages()
+        voices = await edge_TTS.voice_catalog.list_locale("zh-CN")
+        print(f"音色列表: {len(locales)} 种语言, 耗时 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        voice = voices[0]["ShortName"]
+        print(f"{'字数':<6}{'语音(s)':>8}{'首段音频(ms)':>14}{'开始出声(ms)':>14}{'播放完成(s)':>12}")
+        for text in texts:
+            start = time.perf_counter()
+            prefetched = await edge_TTS.start_synthesis(text, voice)
+            stats = await tts_audio.play_stream(prefetched.stream(), edge_TTS.get_audio_engine(),
+                                                tts_audio.create_decoder(prefetched.output_format))
+            print(f"{len(text):<6}{stats['clip'].duration():>8.1f}{stats['first_chunk'] * 1000:>14.0f}"
+                  f"{stats['first_sound'] * 1000:>14.0f}{time.perf_counter() - start:>12.2f}")
+        print(f"模拟服务统计: {fake_edge_tts.stats}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        edge_TTS.close_audio_engine()
+
+
+BENCHMARKS = {
+    "concat": bench_audio_concat,
+    "ttfs": bench_time_to_first_sound,
+    "voices": bench_voice_catalog,
+    "cache": bench_speech_cache,
+    "pipeline": bench_pipelined_playback,
+    "segments": bench_segmented_synthesis,
+    "engine": bench_playback_engine,
+    "formats": bench_output_formats,
+    "service": bench_speech_service,
+    "backlog": bench_backlog_policy,
+}
+
+
+if __name__ == "__main__":
+    # 用法: python bench_tts.py [测试名 ...]，不带参数时运行全部测试
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知的测试: {name}，可选: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
@@ -0,0 +1,273 @@
+# bench_ui.py - 界面文本框更新的基准测试（需要图形界面环境；没有显示器时自动通过 xvfb-run 运行）
+import os
+import random
+import shutil
+import sys
+import time
+import tkinter as tk
+from tkinter import scrolledtext
+
+from transcript_view import TranscriptView, INTERIM_MARK, INTERIM_TAG
+
+SENTENCE_SECONDS = 3.0  # 模拟会话中平均每句的时长
+INTERIM_UPDATES = 6     # 每句的ASR中间结果数
+
+
+def _legacy_update_text_area(area, text, mode='append_final', has_interim=False):
+    """原SimultaneousTranslatorApp._update_text_area：每次更新读取整个文本框的内容查找最后一行"""
+    area.config(state="normal")
+    if mode == 'append_final':
+        area.insert(tk.END, text)
+    elif mode == 'update_interim':
+        current_content = area.get(1.0, tk.END).rstrip('\n')
+        last_newline_idx = current_content.rfind('\n')
+        if not has_interim:
+            if current_content and not current_content.endswith('\n'):
+                area.insert(tk.END, "\n")
+            area.insert(tk.END, text)
+        elif last_newline_idx == -1:
+            area.delete(1.0, tk.END)
+            area.insert(1.0, text)
+        else:
+            area.delete(f"1.0 + {last_newline_idx + 1}c", tk.END)
+            area.insert(tk.END, text)
+    elif mode == 'replace_interim_with_final':
+        current_content = area.get(1.0, tk.END).rstrip('\n')
+        last_newline_idx = current_content.rfind('\n')
+        if last_newline_idx == -1:
+            area.delete(1.0, tk.END)
+        else:
+            area.delete(f"1.0 + {last_newline_idx + 1}c", tk.END)
+        current_content_after_delete = area.get(1.0, tk.END).rstrip('\n')
+        if current_content_after_delete and not current_content_after_delete.endswith('\n'):
+            area.insert(tk.END, "\n")
+        area.insert(tk.END, text)
+    area.see(tk.END)
+    area.config(state="disabled")
+
+
+def _session_script(sentences, seed=29):
+    """
+    模拟会话的界面更新序列，每句为一组 [(文本框, 操作, 文本)]：
+    识别框的中间结果和最终结果、译文框的最终译文，以及对应的日志行
+    """
+    rng = random.Random(seed)
+    alphabet = "我们今天讨论产品计划市场销售团队目标客户问题方案时间"
+    words = ["the", "team", "plan", "market", "customer", "today", "product", "goal", "time", "problem"]
+    script = []
+    for i in range(sentences):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(20, 40))) + "。"
+        translation = " ".join(rng.choice(words) for _ in range(rng.randint(10, 20))) + "."
+        updates = []
+        for k in range(1, INTERIM_UPDATES + 1):
+            prefix = text[:len(text) * k // (INTERIM_UPDATES + 1)]
+            updates.append(("recognized", "interim", prefix))
+            updates.append(("log", "final", f"ASR (Interim): {prefix[-8:]}\n"))
+        updates.append(("recognized", "final", text + "\n"))
+        updates.append(("log", "final", f"ASR (Final): {text}\n"))
+        updates.append(("log", "final", f"开始翻译: {text[:30]}... -> en\n"))
+        updates.append(("log", "final", f"翻译完成: {translation[:30]}...\n"))
+        updates.append(("translated", "final", translation + "\n"))
+        updates.append(("log", "final", f"开始语音合成: {translation[:30]}... (音色: en-US-EmmaNeural)\n"))
+        updates.append(("log", "final", f"语音播放成功: {translation[:30]}... (落后 {i % 5 + 1}.0 s)\n"))
+        script.append(updates)
+    return script
+
+
+def _make_areas(root):
+    for child in root.winfo_children():
+        child.destroy()
+    areas = {}
+    for name in ("recognized", "translated", "log"):
+        area = scrolledtext.ScrolledText(root, height=8, wrap=tk.WORD, state="disabled")
+        area.pack(fill=tk.BOTH, expand=True)
+        areas[name] = area
+    root.update()
+    return areas
+
+
+def _run_legacy(root, script, sample_from):
+    """逐条立即更新（原实现），返回样本句子中每次更新的平均耗时和结束时的总行数"""
+    areas = _make_areas(root)
+    has_interim = False
+    elapsed, count = 0.0, 0
+    for index, updates in enumerate(script):
+        for name, kind, text in updates:
+            start = time.perf_counter()
+            if name == "recognized" and kind == "interim":
+                _legacy_update_text_area(areas[name], text, 'update_interim', has_interim)
+                has_interim = True
+            elif name == "recognized":
+                _legacy_update_text_area(areas[name], text, 'replace_interim_with_final' if has_interim else 'append_final')
+                has_interim = False
+            else:
+                _legacy_update_text_area(areas[name], text, 'append_final')
+            root.update_idletasks()
+            if index >= sample_from:
+                elapsed += time.perf_counter() - start
+                count += 1
+    lines = sum(int(area.index("end-1c").split(".")[0]) for area in areas.values())
+    return elapsed / count, lines
+
+
+def _run_view(root, script, sample_from, max_lines, frame_updates):
+    """
+    TranscriptView，每frame_updates条更新应用一帧（1表示每条更新立即应用），
+    返回样本句子中每次更新的平均耗时、每帧的平均耗时和结束时的总行数
+    """
+    areas = _make_areas(root)
+    views = {name: TranscriptView(area, max_lines=max_lines) for name, area in areas.items()}
+    elapsed, count, frames = 0.0, 0, 0
+    for index, updates in enumerate(script):
+        start = time.perf_counter()
+        for i, (name, kind, text) in enumerate(updates, 1):
+            if name == "recognized" and kind == "interim":
+                views[name].set_interim(text)
+            elif name == "recognized":
+                views[name].replace_interim_with_final(text)
+            else:
+                views[name].append_final(text)
+            if i % frame_updates == 0 or i == len(updates):
+                for view in views.values():
+                    view.flush()
+                root.update_idletasks()
+                if index >= sample_from:
+                    frames += 1
+        if index >= sample_from:
+            elapsed += time.perf_counter() - start
+            count += len(updates)
+    lines = sum(int(area.index("end-1c").split(".")[0]) for area in areas.values())
+    return elapsed / count, elapsed / frames, lines
+
+
+def bench_long_session(hours=3.0, sample=50):
+    """
+    长时间会话后UI线程每次文本更新的耗时：原实现（读取整个文本框、历史无限增长）vs TranscriptView（标记定位临时结果、
+    限制历史行数），以及按帧批量应用时每帧的耗时
+    """
+    sentences = int(hours * 3600 / SENTENCE_SECONDS)
+    print(f"\n=== 长时间会话的界面更新（{hours:g} 小时, {sentences} 句, 每句 {INTERIM_UPDATES} 个中间结果） ===")
+    script = _session_script(sentences)
+    root = tk.Tk()
+    root.geometry("800x700")
+    try:
+        print(f"{'方式':<28}{'开始时(us/次)':>14}{'结束时(us/次)':>14}{'每帧(us)':>10}{'总行数':>8}")
+        legacy_start, _ = _run_legacy(root, script[:sample], 0)
+        legacy_end, legacy_lines = _run_legacy(root, script, sentences - sample)
+        print(f"{'原实现（逐条更新）':<28}{legacy_start * 1e6:>14.0f}{legacy_end * 1e6:>14.0f}{'':>10}{legacy_lines:>8}")
+        for label, frame_updates in (("TranscriptView（逐条应用）", 1), ("TranscriptView（每帧4条）", 4)):
+            view_start, _, _ = _run_view(root, script[:sample], 0, 1000, frame_updates)
+            view_end, per_frame, view_lines = _run_view(root, script, sentences - sample, 1000, frame_updates)
+            print(f"{label:<28}{view_start * 1e6:>14.0f}{view_end * 1e6:>14.0f}{per_frame * 1e6:>10.0f}"
+                  f"{view_lines:>8}")
+    finally:
+        root.destroy()
+
+
+def check_transcript_view(max_lines=10):
+    """
+    在真实的tk.Text（隐藏的根窗口）上检查TranscriptView的标记逻辑：临时结果位于INTERIM_MARK之后并带标签、
+    已确定的文本插入在临时结果之前、替换临时结果只改动最后一段，以及超出行数后从开头裁剪
+
+    返回:
+        全部检查通过时为True，否则为False（命令行以非零状态退出）
+    """
+    print("\n=== TranscriptView标记逻辑检查 ===")
+    root = tk.Tk()
+    root.withdraw()
+    failures = []
+
+    def expect(name, actual, expected):
+        if actual != expected:
+            failures.append(name)
+            print(f"  失败: {name}，期望 {expected!r}，实际 {actual!r}")
+
+    try:
+        area = tk.Text(root, state="disabled")
+        view = TranscriptView(area, max_lines=max_lines)
+
+        def content():
+            return area.get("1.0", "end-1c")
+
+        def interim_ranges():
+            return [str(index) for index in area.tag_ranges(INTERIM_TAG)]
+
+        view.append_final("第一句\n")
+        view.set_interim("临时")
+        view.flush()
+        expect("临时结果在末尾", content(), "第一句\n临时")
+        expect("临时结果起点", area.index(INTERIM_MARK), "2.0")
+        expect("临时结果标签", interim_ranges(), ["2.0", "2.2"])
+
+        view.append_final("第二句\n")
+        view.flush()
+        expect("确定文本插入在临时结果之前", content(), "第一句\n第二句\n临时")
+        expect("插入后临时结果起点", area.index(INTERIM_MARK), "3.0")
+        expect("确定文本不带临时标签", INTERIM_TAG in area.tag_names("2.0"), False)
+
+        view.set_interim("新的临时")
+        view.set_interim("最新")
+        view.flush()
+        expect("替换临时结果", content(), "第一句\n第二句\n最新")
+        expect("替换后临时结果标签", interim_ranges(), ["3.0", "3.2"])
+
+        view.replace_interim_with_final("第三句\n")
+        view.flush()
+        expect("临时结果转为确定文本", content(), "第一句\n第二句\n第三句\n")
+        expect("转为确定文本后无临时标签", interim_ranges(), [])
+
+        for i in range(max_lines * 2):
+            view.append_final(f"行{i}\n")
+            view.flush()
+        lines = int(area.index("end-1c").split(".")[0])
+        expect("裁剪后的行数不超过上限的110%", lines <= max_lines + max_lines // 10, True)
+        expect("裁剪掉最早的行", content().startswith("第一句"), False)
+        expect("保留最新的行", content().endswith(f"行{max_lines * 2 - 1}\n"), True)
+
+        view.set_interim("裁剪后")
+        view.flush()
+        expect("裁剪后临时结果", content().endswith(f"行{max_lines * 2 - 1}\n裁剪后"), True)
+        expect("裁剪后临时结果起点", area.index(INTERIM_MARK), f"{lines}.0")
+    finally:
+        root.destroy()
+
+    print("全部通过" if not failures else f"{len(failures)} 项检查失败")
+    return not failures
+
+
+BENCHMARKS = {
+    "session": bench_long_session,
+    "check": check_transcript_view,
+}
+
+
+def _rerun_headless():
+    """Linux下没有$DISPLAY时，如果安装了Xvfb，就在xvfb-run提供的虚拟显示器中重新运行本脚本"""
+    if not sys.platform.startswith("linux") or os.environ.get("DISPLAY") or os.environ.get("BENCH_UI_XVFB"):
+        return
+    xvfb_run = shutil.which("xvfb-run")
+    if xvfb_run is None:
+        return
+    os.environ["BENCH_UI_XVFB"] = "1"
+    os.execv(xvfb_run, [xvfb_run, "-a", "-s", "-screen 0 1024x768x24", sys.executable] + sys.argv)
+
+
+if __name__ == "__main__":
+    # 用法: python bench_ui.py [测试名 ...]，不带参数时运行全部测试
+    # 带正确性检查的测试返回False时，全部运行完后以非零状态退出
+    _rerun_headless()
+    names = sys.argv[1:] or list(BENCHMARKS)
+    failed = []
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知的测试: {name}，可选: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        try:
+            if BENCHMARKS[name]() is False:
+                failed.append(name)
+        except tk.TclError as e:
+            print(f"无法创建窗口（需要图形界面环境，或安装Xvfb后重新运行）: {e}")
+            sys.exit(1)
+    if failed:
+        print(f"\n未通过检查: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,369 @@
+# bulk_translation.py - 大文件批量翻译工具（分块、并行、断点续传）
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from text_split import SENTENCE_RE
+from translation_module import TranslationModule, LANGUAGE_CODES
+
+# 讯飞ITS接口单次请求的字符上限
+MAX_REQUEST_CHARS = 5000
+
+# 目标语言不使用空格分词时，同一行的多个分片译文直接拼接
+_NO_SPACE_LANGS = ("cn", "ja", "th")
+
+SUPPORTED_FORMATS = ("txt", "jsonl", "srt")
+
+
+def split_sentences(text, max_chars):
+    """
+    按句子边界把一行文本切成不超过max_chars的分片
+
+    单个句子超过max_chars时按长度硬切分。
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    pieces = []
+    current = ""
+    for sentence in SENTENCE_RE.findall(text):
+        if not sentence:
+            continue
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if len(current) + len(sentence) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+# ---------- 文件格式 ----------
+
+def read_items(path, file_format, field="text"):
+    """
+    读取待翻译条目
+
+    返回:
+        (条目文本列表, 写回时需要的上下文)：txt为每行一条；jsonl为每条记录的field字段；srt为每个字幕块的文本
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    if file_format == "txt":
+        return content.split("\n"), None
+
+    if file_format == "jsonl":
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+        return [str(record.get(field, "")) for record in records], records
+
+    # srt：序号行 + 时间轴行 + 若干文本行，字幕块之间以空行分隔
+    cues = []
+    for block in re.split(r"\n\s*\n", content.replace("\r\n", "\n").strip()):
+        lines = block.split("\n")
+        if len(lines) >= 2 and "-->" in lines[1]:
+            cues.append((lines[0], lines[1], "\n".join(lines[2:])))
+        elif lines and "-->" in lines[0]:
+            cues.append(("", lines[0], "\n".join(lines[1:])))
+    return [text for _, _, text in cues], cues
+
+
+def write_items(path, file_format, translations, context, output_field="translation"):
+    """把译文按原格式写出"""
+    with open(path, "w", encoding="utf-8") as f:
+        if file_format == "txt":
+            f.write("\n".join(translations))
+        elif file_format == "jsonl":
+            for record, translation in zip(context, translations):
+                record[output_field] = translation
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            blocks = []
+            for (index, timing, _), translation in zip(context, translations):
+                blocks.append("\n".join(line for line in (index, timing, translation) if line))
+            f.write("\n\n".join(blocks) + "\n")
+
+
+def detect_format(path):
+    """根据扩展名判断文件格式，未知扩展名按纯文本处理"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return extension if extension in SUPPORTED_FORMATS else "txt"
+
+
+# ---------- 翻译任务 ----------
+
+class BulkTranslationJob:
+    """
+    批量翻译任务
+
+    条目按行、行内按句子切分成分片，连续的分片用换行合并成不超过max_chars的请求块，
+    多个请求块并行翻译（仍受翻译模块的请求间隔限制），完成后按原顺序重新组装。
+    每完成一个请求块就追加写入检查点文件，中断后重新运行只翻译未完成的请求块。
+    """
+
+    def __init__(self, translator, items, from_lang="cn", to_lang="en", max_chars=2000, workers=4,
+                 checkpoint_path=None, on_progress=None):
+        """
+        参数:
+            translator: 翻译后端（需提供translate方法）
+            items: 待翻译条目文本列表，条目内可以包含换行
+            from_lang: 源语言
+            to_lang: 目标语言
+            max_chars: 单个请求块的最大字符数，不超过接口上限5000
+            workers: 并行请求数
+            checkpoint_path: 检查点文件路径，为None时不保存进度
+            on_progress: 进度回调 on_progress(已完成块数, 总块数)
+        """
+        if not 0 < max_chars <= MAX_REQUEST_CHARS:
+            raise ValueError(f"max_chars必须在1~{MAX_REQUEST_CHARS}之间")
+        self.translator = translator
+        self.items = items
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.max_chars = max_chars
+        self.workers = workers
+        self.checkpoint_path = checkpoint_path
+        self.on_progress = on_progress
+        self.stop_event = threading.Event()
+
+        # 分片：(条目序号, 行序号, 文本)；空白行不翻译
+        self.lines = [item.split("\n") for item in items]
+        self.pieces = []
+        for item_index, lines in enumerate(self.lines):
+            for line_index, line in enumerate(lines):
+                if line.strip():
+                    for piece in split_sentences(line, max_chars):
+                        self.pieces.append((item_index, line_index, piece))
+
+        # 请求块：分片序号区间[start, end)
+        self.chunks = []
+        start = 0
+        size = 0
+        for index, (_, _, piece) in enumerate(self.pieces):
+            if index > start and size + 1 + len(piece) > max_chars:
+                self.chunks.append((start, index))
+                start = index
+                size = 0
+            size += len(piece) + (1 if size else 0)
+        if start < len(self.pieces):
+            self.chunks.append((start, len(self.pieces)))
+
+        self.results = [None] * len(self.chunks)
+        self.stats = {"chunks": len(self.chunks), "resumed": 0, "translated": 0, "failed": 0,
+                      "chars": 0, "requests": 0, "elapsed": 0.0}
+
+    def _chunk_text(self, chunk_index):
+        start, end = self.chunks[chunk_index]
+        return "\n".join(piece for _, _, piece in self.pieces[start:end])
+
+    def _chunk_key(self, chunk_index):
+        """请求块的检查点键：语言对+原文的哈希，输入或切分方式改变后不会误用旧结果"""
+        data = f"{self.from_lang}\t{self.to_lang}\t{self._chunk_text(chunk_index)}".encode("utf-8")
+        return hashlib.sha1(data).hexdigest()
+
+    def _load_checkpoint(self):
+        """读取检查点，返回 {请求块键: 分片译文列表}"""
+        done = {}
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return done
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    done[entry["key"]] = entry["parts"]
+                except (ValueError, KeyError):
+                    # 中断时可能留下半行，忽略即可
+                    continue
+        return done
+
+    def _translate_chunk(self, chunk_index):
+        """
+        翻译一个请求块
+
+        返回:
+            (分片译文列表, 请求次数)，翻译失败时列表为None；任务已中断时直接返回None
+        """
+        if self.stop_event.is_set():
+            return None
+        start, end = self.chunks[chunk_index]
+        pieces = [piece for _, _, piece in self.pieces[start:end]]
+
+        result = self.translator.translate("\n".join(pieces), self.from_lang, self.to_lang, use_cache=False)
+        requests = 1
+        if result is None:
+            return None, requests
+        parts = result.split("\n")
+        if len(parts) != len(pieces):
+            # 换行没有被原样保留，逐个分片重新翻译
+            parts = []
+            for piece in pieces:
+                if self.stop_event.is_set():
+                    return None, requests
+                translation = self.translator.translate(piece, self.from_lang, self.to_lang, use_cache=False)
+                requests += 1
+                if translation is None:
+                    return None, requests
+                parts.append(translation)
+        return parts, requests
+
+    def run(self):
+        """
+        执行任务，可以在其他线程调用stop()中断
+
+        返回:
+            全部完成时返回与items等长的译文列表，否则返回None（已完成的部分保存在检查点中）
+        """
+        start_time = time.perf_counter()
+        done = self._load_checkpoint()
+        pending = []
+        for chunk_index in range(len(self.chunks)):
+            parts = done.get(self._chunk_key(chunk_index))
+            if parts is not None and len(parts) == self.chunks[chunk_index][1] - self.chunks[chunk_index][0]:
+                self.results[chunk_index] = parts
+                self.stats["resumed"] += 1
+            else:
+                pending.append(chunk_index)
+
+        checkpoint = open(self.checkpoint_path, "a", encoding="utf-8") if self.checkpoint_path else None
+        completed = len(self.chunks) - len(pending)
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {executor.submit(self._translate_chunk, chunk_index): chunk_index for chunk_index in pending}
+            for future in as_completed(futures):
+                chunk_index = futures[future]
+                outcome = future.result()
+                if outcome is None:
+                    continue
+                parts, requests = outcome
+                self.stats["requests"] += requests
+                if parts is None:
+                    self.stats["failed"] += 1
+                    continue
+                self.results[chunk_index] = parts
+                self.stats["translated"] += 1
+                self.stats["chars"] += len(self._chunk_text(chunk_index))
+                if checkpoint:
+                    checkpoint.write(json.dumps({"key": self._chunk_key(chunk_index), "parts": parts},
+                                                ensure_ascii=False) + "\n")
+                    checkpoint.flush()
+                completed += 1
+                if self.on_progress:
+                    self.on_progress(completed, len(self.chunks))
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if checkpoint:
+                checkpoint.close()
+            self.stats["elapsed"] = time.perf_counter() - start_time
+
+        if completed < len(self.chunks):
+            return None
+        return self._assemble()
+
+    def stop(self):
+        """请求中断任务：不再发起新的请求块，正在进行的请求完成后run()返回"""
+        self.stop_event.set()
+
+    def _assemble(self):
+        """按原顺序把分片译文拼回条目"""
+        joiner = "" if self.to_lang in _NO_SPACE_LANGS else " "
+        translated = [list(lines) for lines in self.lines]
+        line_parts = {}
+        for (start, end), parts in zip(self.chunks, self.results):
+            for (item_index, line_index, _), part in zip(self.pieces[start:end], parts):
+                line_parts.setdefault((item_index, line_index), []).append(part.strip())
+        for (item_index, line_index), parts in line_parts.items():
+            translated[item_index][line_index] = joiner.join(parts)
+        return ["\n".join(lines) for lines in translated]
+
+    def throughput(self):
+        """本次运行的翻译吞吐量（字符/秒），不含从检查点恢复的部分"""
+        return self.stats["chars"] / self.stats["elapsed"] if self.stats["elapsed"] else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大文件批量翻译（txt / jsonl / srt），支持中断后续传")
+    parser.add_argument("input", help="输入文件")
+    parser.add_argument("-o", "--output", required=True, help="输出文件")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, default=None, help="文件格式，默认按扩展名判断")
+    parser.add_argument("--field", default="text", help="jsonl格式中待翻译的字段")
+    parser.add_argument("--output-field", default="translation", help="jsonl格式中写入译文的字段")
+    parser.add_argument("--from", dest="from_lang", default="cn", choices=sorted(LANGUAGE_CODES.values()))
+    parser.add_argument("--to", dest="to_lang", default="en", choices=sorted(LANGUAGE_CODES.values()))
+    parser.add_argument("--max-chars", type=int, default=2000, help=f"单个请求的最大字符数（不超过{MAX_REQUEST_CHARS}）")
+    parser.add_argument("--workers", type=int, default=4, help="并行请求数")
+    parser.add_argument("--request-interval", type=float, default=None, help="最小请求间隔（秒），用于满足接口QPS限制")
+    parser.add_argument("--checkpoint", default=None, help="检查点文件，默认为 输出文件.checkpoint.jsonl")
+    parser.add_argument("--url", default=None, help="翻译API地址，默认为讯飞ITS接口")
+    parser.add_argument("--app-id", default=os.environ.get("ITS_APP_ID"))
+    parser.add_argument("--api-secret", default=os.environ.get("ITS_API_SECRET"))
+    parser.add_argument("--api-key", default=os.environ.get("ITS_API_KEY"))
+    parser.add_argument("--fake", action="store_true", help="使用内置模拟服务（不消耗接口配额）")
+    args = parser.parse_args()
+
+    file_format = args.format or detect_format(args.input)
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint.jsonl"
+
+    server = None
+    url = args.url
+    if args.fake:
+        from fake_translation_server import start_server
+        server, url = start_server()
+        args.app_id, args.api_secret, args.api_key = "fake_app", "fake_secret", "fake_key"
+    elif not (args.app_id and args.api_secret and args.api_key):
+        parser.error("需要 --app-id/--api-secret/--api-key（或环境变量 ITS_APP_ID/ITS_API_SECRET/ITS_API_KEY）")
+
+    options = {"url": url} if url else {}
+    translator = TranslationModule(args.app_id, args.api_secret, args.api_key, **options)
+    if args.request_interval is not None:
+        translator.request_interval = args.request_interval
+
+    items, context = read_items(args.input, file_format, args.field)
+
+    def on_progress(completed, total):
+        print(f"\r进度: {completed}/{total} 块", end="", flush=True)
+
+    job = BulkTranslationJob(translator, items, args.from_lang, args.to_lang, args.max_chars, args.workers,
+                             checkpoint_path, on_progress)
+    print(f"共 {len(items)} 条, {len(job.pieces)} 个分片, {len(job.chunks)} 个请求块")
+    try:
+        translations = job.run()
+    except KeyboardInterrupt:
+        print(f"\n已中断，进度保存在 {checkpoint_path}，重新运行同一命令即可继续")
+        sys.exit(130)
+    finally:
+        translator.close()
+        if server is not None:
+            server.shutdown()
+
+    stats = job.stats
+    print(f"\n本次翻译 {stats['translated']} 块（从检查点恢复 {stats['resumed']} 块，失败 {stats['failed']} 块），"
+          f"{stats['requests']} 次请求, {stats['chars']} 字符, 耗时 {stats['elapsed']:.2f} s, "
+          f"吞吐量 {job.throughput():.0f} 字符/s")
+
+    if translations is None:
+        print(f"部分请求块翻译失败，进度保存在 {checkpoint_path}，重新运行同一命令即可继续")
+        sys.exit(1)
+
+    write_items(args.output, file_format, translations, context, args.output_field)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"译文已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,139 @@
 # 导入所需的库
 import asyncio
-import edge_tts
-import pygame
+import inspect
 import io
-from pygame import mixer
+import os
 import sys
+import tts_audio
+import tts_voices
+
+# 语音服务："edge" 使用微软Edge在线语音合成，"fake" 使用本地模拟服务（fake_edge_tts，离线基准测试用）
+TTS_SERVICE = os.environ.get("TTS_SERVICE", "edge")
+if TTS_SERVICE == "fake":
+    import fake_edge_tts as edge_tts
+else:
+    import edge_tts
+
+# pygame只在没有PyAV时解码MP3、没有sounddevice时播放
+try:
+    from pygame import mixer
+
+    pygame_available = True
+except ImportError:
+    pygame_available = False
+
+# 音频输出："device" 使用声卡，"null" 不出声、按实时速度消费数据（无声卡环境和基准测试用）
+AUDIO_SINK = os.environ.get("TTS_AUDIO_SINK", "device")
+
+# 合成输出格式（tts_audio.OUTPUT_FORMATS的键）："mp3"为edge-tts默认格式，"mp3-low"码率更低，
+# "pcm"为原始PCM，省去MP3解码直接播放。已安装的edge-tts不支持指定输出格式时使用"mp3"
+OUTPUT_FORMAT = os.environ.get("TTS_OUTPUT_FORMAT", "mp3")
+output_format_supported = "output_format" in inspect.signature(edge_tts.Communicate).parameters
+
+# 播放引擎需要sounddevice（持久输出流），流式播放MP3还需要PyAV（增量解码）；
+# 缺少sounddevice时退回pygame逐句播放
+engine_available = tts_audio.sounddevice_available or AUDIO_SINK == "null"
+
+# 长文本分段并行合成：第一段不超过SEGMENT_FIRST_CHARS字符，之后每段不超过SEGMENT_MAX_CHARS字符，
+# 同时合成的片段数不超过SYNTHESIS_PARALLEL
+SEGMENT_FIRST_CHARS = 60
+SEGMENT_MAX_CHARS = 200
+SYNTHESIS_PARALLEL = 3
+
+_audio_engine = None
+_mixer_ready = False
+_mixer_lock = None
+_stream_fallback_warned = False
+_format_fallback_warned = False
+
+
+def _init_mixer():
+    """初始化pygame混音器（只初始化一次，参数与edge-tts输出一致，get_raw()得到的就是引擎使用的PCM）"""
+    global _mixer_ready
+    if not _mixer_ready:
+        if not pygame_available:
+            raise ImportError("没有安装 av 和 sounddevice 时需要安装 pygame 解码和播放语音")
+        if AUDIO_SINK == "null":
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        mixer.init(frequency=tts_audio.SAMPLE_RATE, size=-16, channels=tts_audio.CHANNELS)
+        _mixer_ready = True
+
+
+def active_output_format():
+    """实际使用的合成输出格式"""
+    global _format_fallback_warned
+    if OUTPUT_FORMAT == "mp3":
+        return "mp3"
+    if OUTPUT_FORMAT not in tts_audio.OUTPUT_FORMATS or not output_format_supported:
+        if not _format_fallback_warned:
+            _format_fallback_warned = True
+            print(f"不支持输出格式 {OUTPUT_FORMAT}（edge-tts不支持指定格式或格式名称无效），改用 mp3")
+        return "mp3"
+    return OUTPUT_FORMAT
+
+
+def can_stream(output_format):
+    """该格式能否边合成边播放：原始PCM只需要播放引擎，MP3还需要PyAV"""
+    return engine_available and (output_format == "pcm" or tts_audio.av_available)
+
+
+def decode_audio(audio_data, output_format="mp3"):
+    """把完整的音频数据解码为引擎使用的16位PCM（MP3优先使用PyAV，否则使用pygame；原始PCM直接使用）"""
+    if output_format == "pcm" or tts_audio.av_available:
+        decoder = tts_audio.create_decoder(output_format)
+        return decoder.decode(audio_data) + decoder.flush()
+    _init_mixer()
+    return mixer.Sound(file=io.BytesIO(audio_data)).get_raw()
+
+
+async def _play_with_mixer(audio_data, output_format="mp3"):
+    """没有播放引擎时用pygame播放，按调用顺序逐句播放，按音频时长等待而不是轮询"""
+    global _mixer_lock
+    if _mixer_lock is None:
+        _mixer_lock = asyncio.Lock()
+    async with _mixer_lock:
+        _init_mixer()
+        if output_format == "pcm":
+            # 混音器的参数与原始PCM一致，可以直接使用
+            sound = mixer.Sound(buffer=decode_audio(audio_data, output_format))
+        else:
+            sound = mixer.Sound(file=io.BytesIO(audio_data))
+        channel = sound.play()
+        await asyncio.sleep(sound.get_length())
+        # 声卡缓冲区中可能还有少量数据
+        while channel is not None and channel.get_busy():
+            await asyncio.sleep(0.01)
 
 
-async def play_audio_from_memory(audio_data):
+async def play_audio_from_memory(audio_data, output_format="mp3"):
     """直接从内存播放音频数据"""
-    # 初始化pygame混音器
-    mixer.init()
+    print("正在播放语音...")
+    if engine_available:
+        await get_audio_engine().play(decode_audio(audio_data, output_format)).wait_async()
+    else:
+        await _play_with_mixer(audio_data, output_format)
+    print("播放完成！")
 
-    # 创建内存缓冲区并加载音频数据
-    audio_io = io.BytesIO(audio_data)
 
-    # 加载和播放
-    print("正在播放语音...")
-    mixer.music.load(audio_io)
-    mixer.music.play()
+async def _fetch_voice_list():
+    """从微软服务拉取完整的音色列表"""
+    voices = await edge_tts.VoicesManager.create()
+    return voices.voices
 
-    # 等待播放完成
-    while mixer.music.get_busy():
-        await asyncio.sleep(0.1)
 
-    # 显式关闭以确保资源被释放
-    mixer.music.unload()
-    print("播放完成！")
+# 音色目录缓存：按Locale索引，保存在磁盘上，过期后后台刷新，离线时使用旧数据
+voice_catalog = tts_voices.VoiceCatalog(_fetch_voice_list)
 
 
 async def get_available_languages():
     """获取所有可用的语言"""
     print("正在获取可用语言列表...")
-    voices = await edge_tts.VoicesManager.create()
-
-    # 提取语言代码和区域
-    languages = {}
-    for voice in voices.voices:
-        lang_code = voice["Locale"]
-        if lang_code not in languages:
-            languages[lang_code] = True
-
-    # 转换为列表并排序
-    language_list = sorted(languages.keys())
-    return language_list
+    return await voice_catalog.get_locales()
 
 
 async def list_voices_by_language(language_code):
     """列出指定语言的所有可用音色"""
-    voices = await edge_tts.VoicesManager.create()
-
-    # 筛选指定语言的音色
-    filtered_voices = [v for v in voices.voices if v["Locale"] == language_code]
+    filtered_voices = await voice_catalog.list_locale(language_code)
 
     if not filtered_voices:
         print(f"没有找到语言代码为 {language_code} 的音色")
@@ -68,28 +150,108 @@ async def list_voices_by_language(language_code):
     return filtered_voices
 
 
-async def text_to_speech(text, voice):
-    """将文本转换为语音并直接播放（不保存文件）"""
-    print(f"正在使用音色 {voice} 生成语音...")
-
+def get_audio_engine():
+    """获取会话内共享的播放引擎（首次调用时打开音频设备）"""
+    global _audio_engine
+    if _audio_engine is None:
+        _audio_engine = tts_audio.AudioEngine(null_sink=AUDIO_SINK == "null")
+    return _audio_engine
+
+
+def close_audio_engine():
+    """关闭播放引擎，释放音频设备"""
+    global _audio_engine
+    if _audio_engine is not None:
+        _audio_engine.close()
+        _audio_engine = None
+
+
+async def start_synthesis(text, voice, cache=None, rate="+0%"):
+    """
+    开始合成一段语音，不等待合成完成（可以在上一句播放时提前合成下一句）
+
+    参数:
+        cache: 可选的SpeechCache，命中时直接使用缓存的音频，未命中时合成完成后写入缓存
+        rate: 语速，例如"+25%"（服务端变速，不改变音调）
+
+    返回:
+        tts_audio.PrefetchedAudio（长文本为分段并行合成的tts_audio.SegmentedAudio），交给play_prefetched播放
+    """
+    output_format = active_output_format()
+    # 正常语速的MP3沿用原来的缓存键
+    variant = ("" if rate == "+0%" else rate) + ("" if output_format == "mp3" else f"|{output_format}")
+    if cache is not None:
+        audio_data = cache.get(text, voice, variant)
+        if audio_data is not None:
+            print(f"命中语音缓存 (音色 {voice})")
+            return tts_audio.PrefetchedAudio(tts_audio.audio_from_bytes(audio_data), output_format=output_format)
+
+    if cache is not None:
+        def on_complete(audio_data):
+            cache.put(text, voice, audio_data, variant)
+    else:
+        on_complete = None
+
+    options = {"rate": rate}
+    if output_format != "mp3":
+        options["output_format"] = tts_audio.OUTPUT_FORMATS[output_format]
+
+    pieces = tts_audio.split_speech_text(text, SEGMENT_FIRST_CHARS, SEGMENT_MAX_CHARS)
+    if len(pieces) > 1:
+        # 长文本分段并行合成，第一段合成出来即可开始播放
+        sources = [lambda piece=piece: edge_tts.Communicate(piece, voice, **options).stream() for piece in pieces]
+        return tts_audio.SegmentedAudio(sources, SYNTHESIS_PARALLEL, on_complete, output_format)
+
+    # 创建通信对象，在后台接收音频数据
+    communicate = edge_tts.Communicate(text, voice, **options)
+    return tts_audio.PrefetchedAudio(communicate.stream(), on_complete, output_format)
+
+
+async def play_prefetched(prefetched, stream=True):
+    """
+    播放start_synthesis返回的语音
+
+    播放顺序按调用顺序确定：上一句还在播放时就可以调用下一句的play_prefetched，
+    播放引擎会在上一句结束后无间隙地接着播放。
+
+    参数:
+        stream: 是否收到第一段音频即开始播放（需要安装 sounddevice，MP3格式还需要安装 av，缺少时等合成完成后播放）
+
+    返回:
+        是否播放成功
+    """
     try:
-        # 创建通信对象
-        communicate = edge_tts.Communicate(text, voice)
-
-        # 收集音频数据
-        audio_data = bytes()
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_data += chunk["data"]
-
+        output_format = prefetched.output_format
+        if stream and can_stream(output_format):
+            stats = await tts_audio.play_stream(prefetched.stream(), get_audio_engine(),
+                                                tts_audio.create_decoder(output_format))
+            if not stats["pcm_bytes"]:
+                print("警告：未生成音频数据，可能是文本或语音选择有问题")
+                return False
+            print(f"播放完成！首段音频 {stats['first_chunk'] * 1000:.0f} ms，开始出声 {stats['first_sound'] * 1000:.0f} ms")
+            return True
+
+        if not engine_available:
+            audio_data = await prefetched.read_all()
+            if not audio_data:
+                print("警告：未生成音频数据，可能是文本或语音选择有问题")
+                return False
+            await _play_with_mixer(audio_data, output_format)
+            return True
+
+        # 先在播放队列中占住位置，保证合成完成的先后不影响播放顺序
+        clip = get_audio_engine().open_clip()
+        audio_data = b""
+        try:
+            audio_data = await prefetched.read_all()
+            if audio_data:
+                clip.write(decode_audio(audio_data, output_format))
+        finally:
+            clip.end()
         if not audio_data:
             print("警告：未生成音频数据，可能是文本或语音选择有问题")
             return False
-
-        print("语音生成完成，准备播放...")
-
-        # 直接从内存播放音频
-        await play_audio_from_memory(audio_data)
+        await clip.wait_async()
         return True
 
     except edge_tts.exceptions.NoAudioReceived:
@@ -103,6 +265,28 @@ async def text_to_speech(text, voice):
         return False
 
 
+async def text_to_speech(text, voice, stream=False, cache=None):
+    """
+    将文本转换为语音并直接播放（不保存文件）
+
+    参数:
+        stream: 是否流式播放（需要安装 av 和 sounddevice，缺少时退回整段合成后播放）
+        cache: 可选的SpeechCache，命中时直接播放缓存的音频，未命中时保存合成结果
+    """
+    global _stream_fallback_warned
+    if stream and not can_stream(active_output_format()) and not _stream_fallback_warned:
+        _stream_fallback_warned = True
+        print("未安装 av/sounddevice，流式播放不可用，改为整段合成后播放")
+
+    print(f"正在使用音色 {voice} 生成语音...")
+    try:
+        prefetched = await start_synthesis(text, voice, cache)
+    except Exception as e:
+        print(f"错误：生成语音时发生异常: {str(e)}")
+        return False
+    return await play_prefetched(prefetched, stream)
+
+
 async def main():
     """主函数，交互式运行TTS"""
     print("=== Edge TTS 交互式演示程序 ===")
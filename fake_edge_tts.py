@@ -0,0 +1,252 @@
+# fake_edge_tts.py - 本地模拟语音合成服务（与edge-tts的Communicate/VoicesManager接口兼容，离线基准测试用）
+#
+# 设置环境变量 TTS_SERVICE=fake 后，edge_TTS 使用本模块代替 edge_tts。合成结果是按音色区分音高的提示音，
+# 时长按文本长度估算；首包延迟、合成速度和数据块大小可以通过 configure() 或 FAKE_TTS_* 环境变量调整。
+import array
+import asyncio
+import io
+import math
+import os
+import random
+import sys
+import zlib
+
+from tts_backlog import estimate_speech_duration
+
+try:
+    import av
+
+    av_available = True
+except ImportError:
+    av_available = False
+
+# 支持的输出格式 -> (采样率, MP3码率，None表示原始PCM)
+SUPPORTED_FORMATS = {
+    "audio-24khz-48kbitrate-mono-mp3": (24000, 48000),
+    "audio-16khz-32kbitrate-mono-mp3": (16000, 32000),
+    "raw-24khz-16bit-mono-pcm": (24000, None),
+}
+DEFAULT_OUTPUT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+DEFAULT_VOICE = "en-US-EmmaMultilingualNeural"
+
+# 模拟的音色目录：Locale -> [(名称, 性别)]
+_VOICE_TABLE = {
+    "zh-CN": [("Xiaoxiao", "Female"), ("Yunxi", "Male")],
+    "en-US": [("Emma", "Female"), ("EmmaMultilingual", "Female"), ("Guy", "Male")],
+    "ja-JP": [("Nanami", "Female"), ("Keita", "Male")],
+    "es-ES": [("Elvira", "Female"), ("Alvaro", "Male")],
+    "fr-FR": [("Denise", "Female"), ("Henri", "Male")],
+    "de-DE": [("Katja", "Female"), ("Conrad", "Male")],
+    "ko-KR": [("SunHi", "Female"), ("InJoon", "Male")],
+    "ru-RU": [("Svetlana", "Female"), ("Dmitry", "Male")],
+    "id-ID": [("Gadis", "Female"), ("Ardi", "Male")],
+    "vi-VN": [("HoaiMy", "Female"), ("NamMinh", "Male")],
+    "th-TH": [("Premwadee", "Female"), ("Niwat", "Male")],
+}
+
+
+class NoAudioReceived(Exception):
+    """与edge_tts.exceptions.NoAudioReceived对应"""
+
+
+class exceptions:
+    """与edge_tts.exceptions对应的命名空间"""
+    NoAudioReceived = NoAudioReceived
+
+
+class FakeTTSConfig:
+    """模拟服务的行为配置"""
+
+    def __init__(self, ttfb=0.25, ttfb_per_char=0.0, speed=10.0, chunk_duration=0.1, jitter=0.0,
+                 error_rate=0.0, voices_latency=0.0):
+        """
+        参数:
+            ttfb: 首个音频块的延迟（秒）
+            ttfb_per_char: 首包延迟随文本长度增加的部分（秒/字符）
+            speed: 首包之后音频数据的到达速度（实时速度的倍数）
+            chunk_duration: 每个音频块的时长（秒）
+            jitter: 每个数据块间隔的随机波动比例（0~1）
+            error_rate: 合成失败（抛出NoAudioReceived）的比例（0~1）
+            voices_latency: 获取音色列表的延迟（秒）
+        """
+        self.ttfb = ttfb
+        self.ttfb_per_char = ttfb_per_char
+        self.speed = speed
+        self.chunk_duration = chunk_duration
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.voices_latency = voices_latency
+
+    @classmethod
+    def from_env(cls):
+        """按 FAKE_TTS_TTFB / FAKE_TTS_SPEED / FAKE_TTS_CHUNK / FAKE_TTS_JITTER / FAKE_TTS_ERROR_RATE 创建配置"""
+        config = cls()
+        for name, attr in (("TTFB", "ttfb"), ("SPEED", "speed"), ("CHUNK", "chunk_duration"),
+                           ("JITTER", "jitter"), ("ERROR_RATE", "error_rate")):
+            value = os.environ.get(f"FAKE_TTS_{name}")
+            if value:
+                setattr(config, attr, float(value))
+        return config
+
+
+config = FakeTTSConfig.from_env()
+stats = {"requests": 0, "failures": 0, "audio_bytes": 0}
+
+
+def configure(**kwargs):
+    """修改模拟服务的配置，参数同FakeTTSConfig"""
+    for name, value in kwargs.items():
+        if not hasattr(config, name):
+            raise ValueError(f"未知的配置项: {name}")
+        setattr(config, name, value)
+
+
+def _voice_entry(locale, name, gender):
+    short_name = f"{locale}-{name}Neural"
+    return {
+        "Name": f"Microsoft Server Speech Text to Speech Voice ({locale}, {name}Neural)",
+        "ShortName": short_name,
+        "Gender": gender,
+        "Locale": locale,
+        "SuggestedCodec": DEFAULT_OUTPUT_FORMAT,
+        "FriendlyName": f"Microsoft {name} Online (Natural) - {locale}",
+        "Status": "GA",
+        "VoiceTag": {"ContentCategories": ["General"], "VoicePersonalities": ["Friendly"]},
+    }
+
+
+VOICES = [_voice_entry(locale, name, gender) for locale, names in _VOICE_TABLE.items() for name, gender in names]
+
+
+def _parse_percent(value):
+    """把"+25%"形式的参数转换为倍数1.25"""
+    try:
+        return max(0.1, 1.0 + float(value.rstrip("%")) / 100)
+    except (AttributeError, ValueError):
+        raise ValueError(f"无效的参数: {value}")
+
+
+_tone_cache = {}
+
+
+def _tone_block(voice, sample_rate, chunk_duration):
+    """生成一个数据块时长的提示音（16位单声道PCM），音高按音色区分；按整周期生成，块与块之间可以无缝拼接"""
+    key = (voice, sample_rate, chunk_duration)
+    block = _tone_cache.get(key)
+    if block is None:
+        samples = int(sample_rate * chunk_duration)
+        cycles = max(1, round(samples * (180 + zlib.crc32(voice.encode("utf-8")) % 200) / sample_rate))
+        data = array.array("h", (int(8000 * math.sin(2 * math.pi * cycles * i / samples)) for i in range(samples)))
+        if sys.byteorder == "big":
+            data.byteswap()
+        block = _tone_cache[key] = data.tobytes()
+    return block
+
+
+def encode_mp3(pcm, sample_rate, bit_rate):
+    """用PyAV把16位单声道PCM编码为MP3（按1152样本的整帧编码）"""
+    if not av_available:
+        raise ImportError("模拟MP3输出需要安装 av (PyAV)，或使用 raw-24khz-16bit-mono-pcm 输出格式")
+    frame_bytes = 1152 * 2
+    pcm += bytes(-len(pcm) % frame_bytes)
+    output = io.BytesIO()
+    container = av.open(output, "w", format="mp3")
+    stream = container.add_stream("mp3", rate=sample_rate)
+    stream.bit_rate = bit_rate
+    for offset in range(0, len(pcm), frame_bytes):
+        frame = av.AudioFrame(format="s16", layout="mono", samples=1152)
+        frame.planes[0].update(pcm[offset:offset + frame_bytes])
+        frame.sample_rate = sample_rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+    for packet in stream.encode(None):
+        container.mux(packet)
+    container.close()
+    return output.getvalue()
+
+
+class Communicate:
+    """
+    模拟edge_tts.Communicate：stream()按edge-tts的数据块格式产生WordBoundary和audio数据块
+
+    首个音频块在config.ttfb（加上按字符数增加的部分）之后到达，之后以config.speed倍实时速度到达。
+    """
+
+    def __init__(self, text, voice=DEFAULT_VOICE, *, rate="+0%", volume="+0%", pitch="+0Hz",
+                 output_format=DEFAULT_OUTPUT_FORMAT, **kwargs):
+        if output_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}")
+        self.text = text
+        self.voice = voice
+        self.rate = _parse_percent(rate)
+        _parse_percent(volume)
+        self.output_format = output_format
+
+    def _chunks(self, duration):
+        """按数据块时长切分的音频数据"""
+        sample_rate, bit_rate = SUPPORTED_FORMATS[self.output_format]
+        count = max(1, math.ceil(duration / config.chunk_duration))
+        block = _tone_block(self.voice, sample_rate, config.chunk_duration)
+        if bit_rate is None:
+            return [block] * count
+        data = encode_mp3(block * count, sample_rate, bit_rate)
+        size = -(-len(data) // count)
+        return [data[i * size:(i + 1) * size] for i in range(count)]
+
+    async def stream(self):
+        stats["requests"] += 1
+        words = self.text.split() or list(self.text.strip())
+        duration = estimate_speech_duration(self.text) / self.rate
+        await asyncio.sleep(config.ttfb + config.ttfb_per_char * len(self.text))
+        if not words or random.random() < config.error_rate:
+            stats["failures"] += 1
+            raise NoAudioReceived("No audio was received. Please verify that your parameters are correct.")
+
+        chunks = self._chunks(duration)
+        interval = config.chunk_duration / config.speed
+        word_ticks = int(duration * 1e7 / len(words))  # edge-tts的偏移单位为100纳秒
+        word_index = 0
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(interval * random.uniform(1 - config.jitter, 1 + config.jitter))
+            # 本块覆盖到的单词先发出WordBoundary
+            chunk_end = (i + 1) * config.chunk_duration * 1e7
+            while word_index < len(words) and word_index * word_ticks < chunk_end:
+                yield {"type": "WordBoundary", "offset": word_index * word_ticks, "duration": word_ticks,
+                       "text": words[word_index]}
+                word_index += 1
+            stats["audio_bytes"] += len(chunk)
+            yield {"type": "audio", "data": chunk}
+
+    async def save(self, audio_fname):
+        """把合成的音频写入文件"""
+        with open(audio_fname, "wb") as f:
+            async for chunk in self.stream():
+                if chunk["type"] == "audio":
+                    f.write(chunk["data"])
+
+
+async def list_voices(**kwargs):
+    """模拟edge_tts.list_voices"""
+    await asyncio.sleep(config.voices_latency)
+    return [dict(voice) for voice in VOICES]
+
+
+class VoicesManager:
+    """模拟edge_tts.VoicesManager"""
+
+    def __init__(self):
+        self.voices = []
+        self.called_create = False
+
+    @classmethod
+    async def create(cls, custom_voices=None):
+        self = cls()
+        voices = custom_voices if custom_voices is not None else await list_voices()
+        self.voices = [{**voice, "Language": voice["Locale"].split("-")[0]} for voice in voices]
+        self.called_create = True
+        return self
+
+    def find(self, **kwargs):
+        """按字段筛选音色，例如 find(Gender="Female", Locale="zh-CN")"""
+        return [voice for voice in self.voices if all(voice.get(key) == value for key, value in kwargs.items())]
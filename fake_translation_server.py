@@ -0,0 +1,292 @@
+# fake_translation_server.py - 本地模拟翻译服务（兼容讯飞ITS接口的请求/响应格式）
+import argparse
+import base64
+import json
+import math
+import random
+import socket
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 延迟分布类型
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "exponential", "lognormal")
+
+# 模拟使用的ITS错误码
+ERROR_PARSE_REQUEST = 10160    # 请求JSON解析失败
+ERROR_ENGINE = 10163           # 引擎处理错误
+ERROR_QPS_LIMIT = 11202        # 超出每秒请求数限制
+ERROR_INTERNAL = 10500         # 服务内部错误
+
+
+class FakeServerConfig:
+    """模拟服务的行为配置"""
+
+    def __init__(self, latency=0.02, latency_dist="constant", latency_max=None, latency_sigma=0.5,
+                 slow_rate=0.0, slow_latency=1.0, error_rate=0.0, api_error_rate=0.0, rate_limit=None,
+                 connect_latency=0.0):
+        """
+        参数:
+            latency: 延迟参数（秒）：constant为固定值，uniform为下限，exponential为均值，lognormal为中位数
+            latency_dist: 延迟分布，可选 constant / uniform / exponential / lognormal
+            latency_max: uniform分布的上限（秒），默认为latency的2倍
+            latency_sigma: lognormal分布的形状参数
+            slow_rate: 额外的慢请求比例（0~1），用于模拟长尾
+            slow_latency: 慢请求的延迟（秒）
+            error_rate: 返回HTTP 500错误的比例（0~1）
+            api_error_rate: 返回HTTP 200但header.code非0的业务错误比例（0~1）
+            rate_limit: 每秒允许的请求数，超出时返回HTTP 429，None表示不限流
+            connect_latency: 每个新连接额外的建立延迟（秒），模拟DNS/TCP/TLS握手的网络往返
+        """
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"不支持的延迟分布: {latency_dist}")
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.latency_max = latency_max if latency_max is not None else latency * 2
+        self.latency_sigma = latency_sigma
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.api_error_rate = api_error_rate
+        self.rate_limit = rate_limit
+        self.connect_latency = connect_latency
+
+    def sample_latency(self):
+        """按配置的分布采样一次请求延迟"""
+        if random.random() < self.slow_rate:
+            return self.slow_latency
+        if self.latency_dist == "uniform":
+            return random.uniform(self.latency, self.latency_max)
+        if self.latency_dist == "exponential":
+            return random.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+        if self.latency_dist == "lognormal":
+            return random.lognormvariate(math.log(self.latency), self.latency_sigma) if self.latency > 0 else 0.0
+        return self.latency
+
+
+class TokenBucket:
+    """令牌桶限流器"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.last_time = time.time()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """尝试取一个令牌，成功返回True"""
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_time) * self.rate)
+            self.last_time = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class FakeServerStats:
+    """模拟服务的请求统计"""
+
+    def __init__(self):
+        self.requests = 0
+        self.success = 0
+        self.http_errors = 0
+        self.api_errors = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def incr(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "success": self.success,
+                "http_errors": self.http_errors,
+                "api_errors": self.api_errors,
+                "throttled": self.throttled
+            }
+
+
+def fake_translate(text, from_lang, to_lang):
+    """模拟翻译：在每行原文前加上目标语言标记（与真实接口一样保留换行）"""
+    return "\n".join(f"[{to_lang}] {line}" for line in text.split("\n"))
+
+
+def _new_sid():
+    return f"fake{random.getrandbits(32):08x}"
+
+
+def build_success_response(text, from_lang, to_lang):
+    """构建与ITS接口一致的成功响应"""
+    trans_result = {
+        "from": from_lang,
+        "to": to_lang,
+        "trans_result": {"src": text, "dst": fake_translate(text, from_lang, to_lang)}
+    }
+    encoded = base64.b64encode(json.dumps(trans_result, ensure_ascii=False).encode("utf-8")).decode("utf-8")
+    return {
+        "header": {"code": 0, "message": "success", "sid": _new_sid()},
+        "payload": {"result": {"seq": "0", "status": "3", "text": encoded}}
+    }
+
+
+def build_error_response(code, message):
+    """构建与ITS接口一致的错误响应（只有header，没有payload）"""
+    return {"header": {"code": code, "message": message, "sid": _new_sid()}}
+
+
+class FakeTranslationHandler(BaseHTTPRequestHandler):
+    """处理模拟翻译请求"""
+
+    # 使用HTTP/1.1以支持连接复用（所有响应都带Content-Length）
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # 响应头和正文分两次写出，关闭Nagle算法以免长连接上出现延迟确认等待
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # 每个连接只在建立时付出一次握手延迟
+        if self.server.config.connect_latency:
+            time.sleep(self.server.config.connect_latency)
+
+    def do_HEAD(self):
+        # 连接预热请求：只返回空响应
+        self.send_response(404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self.do_HEAD()
+
+    def do_POST(self):
+        config = self.server.config
+        stats = self.server.stats
+        stats.incr("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length)
+
+        # 限流检查在处理前完成，被限流的请求立即返回
+        if self.server.rate_limiter and not self.server.rate_limiter.try_acquire():
+            stats.incr("throttled")
+            self._send_json(429, build_error_response(ERROR_QPS_LIMIT, "licc limit: qps exceeded"))
+            return
+
+        # 模拟网络与处理延迟
+        time.sleep(config.sample_latency())
+
+        if random.random() < config.error_rate:
+            stats.incr("http_errors")
+            self._send_json(500, build_error_response(ERROR_INTERNAL, "internal error"))
+            return
+
+        if random.random() < config.api_error_rate:
+            stats.incr("api_errors")
+            self._send_json(200, build_error_response(ERROR_ENGINE, "engine error"))
+            return
+
+        try:
+            body = json.loads(raw_body)
+            its = body["parameter"]["its"]
+            text = base64.b64decode(body["payload"]["input_data"]["text"]).decode("utf-8")
+        except Exception:
+            stats.incr("api_errors")
+            self._send_json(200, build_error_response(ERROR_PARSE_REQUEST, "parse request json error"))
+            return
+
+        stats.incr("success")
+        self._send_json(200, build_success_response(text, its["from"], its["to"]))
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        # 不输出每个请求的访问日志
+        pass
+
+
+def start_server(host="127.0.0.1", port=0, config=None, certfile=None, keyfile=None):
+    """
+    在后台线程中启动模拟服务
+
+    参数:
+        certfile/keyfile: 指定证书和私钥时以HTTPS方式提供服务
+
+    返回:
+        (server, url)，调用 server.shutdown() 停止服务，server.stats 为请求统计
+    """
+    server = ThreadingHTTPServer((host, port), FakeTranslationHandler)
+    scheme = "http"
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    server.daemon_threads = True
+    server.config = config or FakeServerConfig()
+    server.stats = FakeServerStats()
+    server.rate_limiter = TokenBucket(server.config.rate_limit) if server.config.rate_limit else None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"{scheme}://{host}:{server.server_address[1]}/v1/its"
+    return server, url
+
+
+def add_config_arguments(parser):
+    """向命令行解析器添加模拟服务配置参数"""
+    group = parser.add_argument_group("模拟服务配置")
+    group.add_argument("--latency", type=float, default=0.05, help="延迟参数（秒）")
+    group.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="constant", help="延迟分布")
+    group.add_argument("--latency-max", type=float, default=None, help="uniform分布的上限（秒）")
+    group.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal分布的形状参数")
+    group.add_argument("--slow-rate", type=float, default=0.0, help="慢请求比例")
+    group.add_argument("--slow-latency", type=float, default=1.0, help="慢请求延迟（秒）")
+    group.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500错误比例")
+    group.add_argument("--api-error-rate", type=float, default=0.0, help="业务错误比例")
+    group.add_argument("--rate-limit", type=float, default=None, help="每秒允许的请求数")
+    group.add_argument("--connect-latency", type=float, default=0.0, help="新连接的建立延迟（秒）")
+
+
+def config_from_args(args):
+    """根据命令行参数创建FakeServerConfig"""
+    return FakeServerConfig(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        latency_max=args.latency_max,
+        latency_sigma=args.latency_sigma,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+        error_rate=args.error_rate,
+        api_error_rate=args.api_error_rate,
+        rate_limit=args.rate_limit,
+        connect_latency=args.connect_latency
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟翻译服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--certfile", default=None, help="TLS证书文件，指定时使用HTTPS")
+    parser.add_argument("--keyfile", default=None, help="TLS私钥文件")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, config_from_args(args), args.certfile, args.keyfile)
+    print(f"模拟翻译服务已启动: {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n模拟翻译服务已停止。请求统计: {server.stats.snapshot()}")
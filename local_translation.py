@@ -0,0 +1,135 @@
+# local_translation.py - 本地离线翻译后端（CTranslate2 + Marian/OPUS-MT模型）
+from translation_module import TranslationBackend, LRUCache
+
+# 可选依赖：CTranslate2推理引擎和transformers分词器
+try:
+    import ctranslate2
+    import transformers
+
+    local_translation_available = True
+except ImportError:
+    local_translation_available = False
+
+
+class LocalTranslationBackend(TranslationBackend):
+    """
+    基于CTranslate2的本地翻译后端，在CPU上批量推理，不受API配额和网络延迟限制
+
+    每个语言对使用一个转换后的Marian模型目录，例如:
+        ct2-transformers-converter --model Helsinki-NLP/opus-mt-zh-en \\
+            --output_dir models/opus-mt-zh-en-ct2 --copy_files source.spm target.spm vocab.json tokenizer_config.json
+    """
+
+    def __init__(self, models, device="cpu", inter_threads=1, intra_threads=0,
+                 max_batch_size=32, beam_size=2, cache_size=200):
+        """
+        参数:
+            models: {(源语言, 目标语言): 模型目录}，目录中需包含CTranslate2模型和分词器文件
+            device: 推理设备，"cpu"或"cuda"
+            inter_threads: 并行处理的批次数
+            intra_threads: 每个批次使用的线程数，0表示自动
+            max_batch_size: 单次推理的最大句子数
+            beam_size: 束搜索宽度，越小越快
+            cache_size: 缓存大小
+        """
+        if not local_translation_available:
+            raise ImportError("本地翻译后端需要安装 ctranslate2 和 transformers")
+
+        self.max_batch_size = max_batch_size
+        self.beam_size = beam_size
+        self.cache_size = cache_size
+        self.cache = LRUCache(capacity=cache_size)
+
+        self.translators = {}
+        self.tokenizers = {}
+        for pair, model_dir in models.items():
+            self.translators[pair] = ctranslate2.Translator(
+                model_dir, device=device, inter_threads=inter_threads, intra_threads=intra_threads)
+            self.tokenizers[pair] = transformers.AutoTokenizer.from_pretrained(model_dir)
+
+    def capabilities(self):
+        """本地模型的能力描述"""
+        return {
+            "name": "ctranslate2",
+            "offline": True,
+            "language_pairs": list(self.translators),
+            "max_text_length": 512,
+            "native_batch": True
+        }
+
+    def _translate_uncached(self, texts, from_lang, to_lang):
+        """对一批文本做推理（不含缓存）"""
+        pair = (from_lang, to_lang)
+        translator = self.translators[pair]
+        tokenizer = self.tokenizers[pair]
+
+        results = []
+        for start in range(0, len(texts), self.max_batch_size):
+            chunk = texts[start:start + self.max_batch_size]
+            sources = [tokenizer.convert_ids_to_tokens(tokenizer.encode(text)) for text in chunk]
+            outputs = translator.translate_batch(
+                sources, beam_size=self.beam_size, max_batch_size=self.max_batch_size)
+            for output in outputs:
+                tokens = output.hypotheses[0]
+                results.append(tokenizer.decode(tokenizer.convert_tokens_to_ids(tokens), skip_special_tokens=True))
+        return results
+
+    def batch_translate(self, texts, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True):
+        """
+        批量翻译：缓存未命中的文本合并成一次批量推理
+
+        返回:
+            与texts等长的结果列表，出错时对应位置为None
+        """
+        results = [None] * len(texts)
+        if from_lang == to_lang:
+            return list(texts)
+        if (from_lang, to_lang) not in self.translators:
+            raise ValueError(f"本地模型不支持的语言对: {from_lang} -> {to_lang}")
+
+        # 空文本和缓存命中的文本直接返回，其余合并推理
+        pending = {}
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = ""
+                continue
+            cached_result = self.cache.get(self.cache_key(text, from_lang, to_lang, use_terminology)) if use_cache else None
+            if cached_result is not None:
+                results[i] = cached_result
+            else:
+                pending.setdefault(text, []).append(i)
+
+        if pending:
+            sources = list(pending)
+            try:
+                translations = self._translate_uncached(sources, from_lang, to_lang)
+            except Exception as e:
+                print(f"本地翻译出错: {str(e)}")
+                return results
+            for text, translation in zip(sources, translations):
+                if use_cache:
+                    self.cache.put(self.cache_key(text, from_lang, to_lang, use_terminology), translation)
+                for i in pending[text]:
+                    results[i] = translation
+
+        return results
+
+    def translate(self, text, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True):
+        """
+        翻译单条文本
+
+        返回:
+            翻译结果字符串，如果出错返回None
+        """
+        return self.batch_translate([text], from_lang, to_lang, use_terminology, use_cache)[0]
+
+    def clear_cache(self):
+        """清空翻译缓存"""
+        self.cache.clear()
+
+    def get_cache_stats(self):
+        """获取缓存统计信息"""
+        return {
+            "capacity": self.cache_size,
+            "current_size": len(self.cache)
+        }
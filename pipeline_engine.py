@@ -0,0 +1,697 @@
+# pipeline_engine.py - 无界面的同声传译流水线引擎（识别 → 翻译 → 语音合成 → 播放）
+#
+# 引擎运行在asyncio事件循环上，各阶段之间通过类型明确的队列传递数据：
+#   识别结果 RecognizedSentence -> 翻译阶段 -> TranslatedSentence -> 合成阶段 -> (Utterance, 合成任务) -> 播放阶段
+# 界面（simultaneous_translator_app.py）和命令行都只是引擎的使用者，通过add_listener接收PipelineEvent。
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from translation_module import TranslationModule, TranslationBatcher, IncrementalTranslator, LANGUAGE_CODES
+from tts_backlog import BacklogPolicy, BacklogItem, format_rate
+from tts_voices import TTS_LOCALES
+
+# 事件类型
+EVENT_LOG = "log"                              # message
+EVENT_ASR_PARTIAL = "asr_partial"              # segment, text
+EVENT_ASR_FINAL = "asr_final"                  # sentence: RecognizedSentence
+EVENT_ASR_EMPTY = "asr_empty"                  # 句子结束但识别结果为空
+EVENT_PROVISIONAL = "translation_provisional"  # seq, text
+EVENT_TRANSLATION = "translation"              # sentence: TranslatedSentence（译文为空时text为None）
+EVENT_TTS_STARTED = "tts_started"              # utterance: tts_backlog.Utterance
+EVENT_TTS_DROPPED = "tts_dropped"              # item: tts_backlog.BacklogItem, backlog
+EVENT_TTS_PLAYED = "tts_played"                # utterance, ok, lag
+EVENT_STOPPED = "stopped"
+
+STAGES = ("asr", "translation", "synthesis", "playback")
+
+
+class PipelineEvent:
+    """引擎发出的事件，data中的字段见事件类型说明"""
+
+    __slots__ = ("kind", "data", "time")
+
+    def __init__(self, kind, data):
+        self.kind = kind
+        self.data = data
+        self.time = time.perf_counter()
+
+
+class RecognizedSentence:
+    """识别阶段输出的一句最终结果"""
+
+    __slots__ = ("seq", "text", "created")
+
+    def __init__(self, seq, text, created):
+        self.seq = seq
+        self.text = text
+        self.created = created  # 识别完成的时刻（perf_counter）
+
+
+class TranslatedSentence:
+    """翻译阶段输出的一句译文"""
+
+    __slots__ = ("seq", "source", "text", "extra", "created", "translated_at")
+
+    def __init__(self, seq, source, text, extra, created, translated_at):
+        self.seq = seq
+        self.source = source
+        self.text = text
+        self.extra = extra                # [(语言代码, 译文)]，多语言输出时的其他目标语言
+        self.created = created            # 识别完成的时刻
+        self.translated_at = translated_at
+
+
+class StageStats:
+    """单个阶段的处理统计：处理数量、跳过数量、吞吐量和从识别完成算起的延迟"""
+
+    __slots__ = ("name", "items", "skipped", "total_latency", "max_latency")
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.skipped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency=0.0, items=1):
+        self.items += items
+        self.total_latency += latency * items
+        self.max_latency = max(self.max_latency, latency)
+
+    def skip(self, items=1):
+        self.skipped += items
+
+    def snapshot(self, elapsed):
+        """
+        参数:
+            elapsed: 流水线运行时长（秒），用于计算吞吐量
+        """
+        return {
+            "items": self.items,
+            "skipped": self.skipped,
+            "throughput": self.items / elapsed if elapsed else 0.0,
+            "mean_latency": self.total_latency / self.items if self.items else 0.0,
+            "max_latency": self.max_latency
+        }
+
+
+class PipelineConfig:
+    """流水线配置，运行中修改to_lang/voice/extra_langs对之后的句子生效"""
+
+    def __init__(self, from_lang="cn", to_lang="en", voice=None, extra_langs=(), tts_enabled=True,
+                 stream_tts=True, prefetch_depth=2, translation_workers=4, translation_timeout=5.0, use_batcher=True,
+                 batch_max_chars=60, batch_max_delay=0.3, incremental=False, incremental_min_interval=1.0,
+                 incremental_max_requests=3):
+        """
+        参数:
+            from_lang/to_lang: 源语言和目标语言代码
+            voice: 语音合成音色（edge-tts的ShortName）
+            extra_langs: 同时翻译（只显示、不合成语音）的其他目标语言代码
+            tts_enabled: 是否合成并播放语音
+            stream_tts: 是否收到第一段音频即开始播放
+            prefetch_depth: 播放当前句子时最多提前合成的句子数
+            translation_workers: 同时进行的翻译请求数（使用批处理器时为同时发送的合并请求数）
+            translation_timeout: 句子开始翻译后最多等待多久（秒），超时跳过该句以免阻塞后面的译文，None表示一直等待
+            use_batcher/batch_max_chars/batch_max_delay: 翻译微批处理（仅在线翻译接口）
+            incremental/incremental_min_interval/incremental_max_requests: 增量翻译（仅在线翻译接口）
+        """
+        self.from_lang = from_lang
+        self.to_lang = to_lang
+        self.voice = voice
+        self.extra_langs = list(extra_langs)
+        self.tts_enabled = tts_enabled
+        self.stream_tts = stream_tts
+        self.prefetch_depth = prefetch_depth
+        self.translation_workers = translation_workers
+        self.translation_timeout = translation_timeout
+        self.use_batcher = use_batcher
+        self.batch_max_chars = batch_max_chars
+        self.batch_max_delay = batch_max_delay
+        self.incremental = incremental
+        self.incremental_min_interval = incremental_min_interval
+        self.incremental_max_requests = incremental_max_requests
+
+
+class PipelineEngine:
+    """
+    同声传译流水线引擎
+
+    submit_asr()接收识别结果（可在任意线程调用，签名与FunASR的text_output_callback相同），
+    翻译阶段按识别顺序输出译文，合成阶段提前合成后面的句子（积压过多时由backlog_policy加速、合并或丢弃），
+    播放阶段按顺序把语音交给播放引擎。事件回调在引擎的事件循环线程中调用，界面需要自行切换线程。
+    """
+
+    def __init__(self, translator, config=None, tts=None, speech_cache=None, backlog_policy=None):
+        """
+        参数:
+            translator: 翻译后端（TranslationModule或其他TranslationBackend）
+            config: PipelineConfig
+            tts: 语音合成模块（edge_TTS），None表示不合成语音
+            speech_cache: 可选的SpeechCache
+            backlog_policy: 可选的BacklogPolicy，默认逐句按正常语速播放
+        """
+        self.translator = translator
+        self.config = config or PipelineConfig()
+        self.tts = tts
+        self.speech_cache = speech_cache
+        self.backlog_policy = backlog_policy or BacklogPolicy(target_lag=None, max_lag=None, max_rate=1.0,
+                                                              merge=False)
+        online = isinstance(translator, TranslationModule)
+        self.batcher = None
+        if self.config.use_batcher and online:
+            self.batcher = TranslationBatcher(translator, max_chars=self.config.batch_max_chars,
+                                              max_delay=self.config.batch_max_delay,
+                                              workers=self.config.translation_workers)
+        # 翻译调用使用独立线程池：超时跳过的请求归还名额后仍占着线程等待HTTP返回，
+        # 额外留出两倍的线程给这些请求，避免它们占满线程池挡住新的句子
+        self._translation_executor = None
+        if not self.batcher:
+            self._translation_executor = ThreadPoolExecutor(max_workers=self.config.translation_workers * 3,
+                                                            thread_name_prefix="pipeline-translate")
+        self.incremental = None
+        if self.config.incremental and online:
+            self.incremental = IncrementalTranslator(translator, on_provisional=self._on_provisional,
+                                                     min_interval=self.config.incremental_min_interval,
+                                                     max_requests_per_sentence=self.config.incremental_max_requests)
+
+        self.listeners = []
+        self.loop = None
+        self.running = False
+        self._thread = None
+        self._main = None
+        self._tasks = []
+        self._playing = deque()
+        self.started_at = None
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self.sentence_count = 0
+        self.last_final_text = ""
+
+    # ---------- 事件 ----------
+
+    def add_listener(self, callback):
+        """注册事件回调 callback(PipelineEvent)"""
+        self.listeners.append(callback)
+
+    def _emit(self, kind, **data):
+        event = PipelineEvent(kind, data)
+        for callback in self.listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"流水线事件回调出错: {e}")
+
+    def _log(self, message):
+        self._emit(EVENT_LOG, message=message)
+
+    # ---------- 生命周期 ----------
+
+    def start(self, loop=None):
+        """
+        启动流水线
+
+        参数:
+            loop: 运行引擎的事件循环（在其他线程中运行），None时创建自己的事件循环线程
+        """
+        if self.running:
+            return
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, daemon=True)
+            self._thread.start()
+        self.loop = loop
+        self.running = True
+        self.started_at = time.perf_counter()
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self.sentence_count = 0
+        self.last_final_text = ""
+        self.backlog_policy.reset()
+        started = threading.Event()
+        self._main = asyncio.run_coroutine_threadsafe(self._run(started), loop)
+        started.wait(5)
+
+    async def _run(self, started):
+        self.asr_queue = asyncio.Queue()          # RecognizedSentence
+        self.in_flight = asyncio.Queue()          # (RecognizedSentence, 翻译结果的asyncio future, 开始翻译的时刻, 归还并发名额的函数)
+        self.translation_queue = asyncio.Queue()  # TranslatedSentence
+        self.playback_queue = asyncio.Queue()     # (Utterance, 合成任务)
+        self._slots = asyncio.Semaphore(self.config.prefetch_depth + 1)
+        self._translation_slots = asyncio.Semaphore(self.config.translation_workers)
+        self._translating = set()  # 尚未完成的翻译（包括超时被跳过的）
+        self._playing = deque()
+        self._tasks = [asyncio.ensure_future(stage()) for stage in
+                       (self._translation_stage, self._translation_output_stage,
+                        self._synthesis_stage, self._playback_stage)]
+        started.set()
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._emit(EVENT_STOPPED)
+
+    def stop(self, drain=False, timeout=None):
+        """
+        停止流水线（线程安全）
+
+        参数:
+            drain: 是否先处理完已识别的句子（等待翻译、合成和播放全部完成）
+            timeout: 在其他线程调用时等待停止完成的最长时间（秒）
+        """
+        if not self.running:
+            return
+        self.running = False
+        future = asyncio.run_coroutine_threadsafe(self._shutdown(drain), self.loop)
+        if self._thread is not threading.current_thread():
+            try:
+                future.result(timeout)
+            except Exception as e:
+                print(f"停止流水线时出错: {e}")
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    async def drain(self):
+        """等待已提交的句子全部处理完（不停止流水线）"""
+        for q in (self.asr_queue, self.in_flight, self.translation_queue, self.playback_queue):
+            await q.join()
+        while self._playing:
+            await asyncio.wait([self._playing[0]])
+
+    async def _shutdown(self, drain):
+        if drain:
+            await self.drain()
+        # 已交给播放引擎的语音会播完
+        tasks = self._tasks + list(self._playing) + list(self._translating)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # 丢弃尚未播放的合成任务
+        while not self.playback_queue.empty():
+            _, prefetched = self.playback_queue.get_nowait()
+            prefetched.cancel()
+        self.backlog_policy.reset()
+
+    def close(self):
+        """停止流水线并释放翻译批处理器等资源"""
+        self.stop()
+        if self._translation_executor:
+            self._translation_executor.shutdown(wait=False)
+        if self.batcher:
+            self.batcher.close()
+        if self.incremental:
+            self.incremental.close()
+
+    def get_stats(self):
+        """各阶段的处理统计"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {name: stats.snapshot(elapsed) for name, stats in self.stats.items()}
+
+    # ---------- 识别结果输入 ----------
+
+    def submit_asr(self, segment, full_sentence, is_sentence_end):
+        """接收识别结果（线程安全，签名与FunASR的text_output_callback相同）"""
+        if self.running:
+            self.loop.call_soon_threadsafe(self._on_asr, segment, full_sentence, is_sentence_end)
+
+    def _on_asr(self, segment, full_sentence, is_sentence_end):
+        if not is_sentence_end:
+            self._log(f"ASR (Interim): {segment}")
+            self._emit(EVENT_ASR_PARTIAL, segment=segment, text=full_sentence)
+            if self.incremental:
+                self.incremental.update(full_sentence, self.sentence_count, self.config.from_lang,
+                                        self.config.to_lang)
+            return
+
+        final_text = full_sentence.strip()
+        if not final_text:
+            self._log("ASR (Final Empty Ignored)")
+            self._emit(EVENT_ASR_EMPTY)
+        elif final_text == self.last_final_text:
+            self._log(f"ASR (Duplicate Final Ignored): {final_text}")
+        else:
+            self._log(f"ASR (Final): {final_text}")
+            self.last_final_text = final_text
+            sentence = RecognizedSentence(self.sentence_count, final_text, time.perf_counter())
+            self.sentence_count += 1
+            self.stats["asr"].record()
+            self._emit(EVENT_ASR_FINAL, sentence=sentence)
+            self.asr_queue.put_nowait(sentence)
+
+    def _on_provisional(self, sentence_id, source_prefix, translated_prefix):
+        # 增量翻译线程中调用
+        if self.running:
+            self.loop.call_soon_threadsafe(self._emit, EVENT_PROVISIONAL, seq=sentence_id, text=translated_prefix)
+
+    # ---------- 翻译阶段 ----------
+
+    def _start_translation(self, sentence):
+        """启动一句的翻译，返回 asyncio future，结果为 (译文, [(语言代码, 译文)], 错误)，错误信息未知时为None"""
+        loop = asyncio.get_running_loop()
+        from_lang, to_lang = self.config.from_lang, self.config.to_lang
+        extra_langs = [code for code in self.config.extra_langs if code not in (from_lang, to_lang)]
+        self._log(f"开始翻译: {sentence.text[:30]}... -> {', '.join([to_lang] + extra_langs)}")
+
+        if extra_langs:
+            # 多语言输出：所有目标语言并发翻译
+            def translate_multi():
+                results = self.translator.translate_multi(sentence.text, from_lang, [to_lang] + extra_langs)
+                return (results.get(to_lang), [(code, results[code]) for code in extra_langs if results.get(code)],
+                        None)
+            return loop.run_in_executor(self._translation_executor, translate_multi)
+
+        if self.batcher:
+            future = asyncio.wrap_future(self.batcher.submit(sentence.text, from_lang, to_lang))
+            return asyncio.ensure_future(self._single_result(future))
+        # 错误随这一次调用返回，不读取翻译模块上被其他线程共享的状态
+        future = loop.run_in_executor(self._translation_executor, self.translator.translate_with_error,
+                                      sentence.text, from_lang, to_lang)
+        return asyncio.ensure_future(self._single_result(future, with_error=True))
+
+    @staticmethod
+    async def _single_result(future, with_error=False):
+        if with_error:
+            translated_text, error = await future
+            return translated_text, [], error
+        return await future, [], None
+
+    async def _translation_stage(self):
+        """
+        按识别顺序启动翻译，最多translation_workers句同时进行，一句慢请求不会阻塞后面的句子；
+        使用批处理器时全部交给批处理器，让相邻的短句合并成一个请求（并发数由批处理器控制）
+        """
+        while True:
+            sentence = await self.asr_queue.get()
+            release = None
+            if not self.batcher:
+                await self._translation_slots.acquire()
+                release = self._slot_releaser()
+            future = self._start_translation(sentence)
+            self._translating.add(future)
+            future.add_done_callback(self._translating.discard)
+            if release:
+                future.add_done_callback(release)
+            self.in_flight.put_nowait((sentence, future, time.perf_counter(), release))
+            self.asr_queue.task_done()
+
+    def _slot_releaser(self):
+        """返回只生效一次的名额归还函数（也用作future的完成回调）：超时跳过时提前归还，迟到的完成回调不再重复归还"""
+        released = False
+
+        def release(_future=None):
+            nonlocal released
+            if not released:
+                released = True
+                self._translation_slots.release()
+        return release
+
+    async def _translation_output_stage(self):
+        """
+        重排缓冲：翻译可能乱序完成，in_flight按序号排列，只输出队首的一句，保证译文严格按识别顺序输出；
+        队首一句开始翻译超过translation_timeout仍未完成时跳过该句（迟到的译文被丢弃）
+        """
+        while True:
+            sentence, future, started, release = await self.in_flight.get()
+            timeout = self.config.translation_timeout
+            if timeout is not None:
+                await asyncio.wait([future], timeout=max(0.0, started + timeout - time.perf_counter()))
+            else:
+                await asyncio.wait([future])
+            translated_text, extra, reason = None, [], ""
+            if not future.done():
+                self._log(f"翻译超时（{timeout:.1f} s），跳过: {sentence.text[:30]}")
+                self.stats["translation"].skip()
+                # 被跳过的请求仍在执行器中等待HTTP返回，提前归还名额，避免几个卡住的请求挡住后面的句子
+                if release:
+                    release()
+            elif future.exception() is not None:
+                self._log(f"翻译API调用失败: {future.exception()}")
+            else:
+                translated_text, extra, error = future.result()
+                if not translated_text and error:
+                    reason = f"（{error['code']} {error['message']}）"
+            result = TranslatedSentence(sentence.seq, sentence.text, translated_text, extra, sentence.created,
+                                        time.perf_counter())
+            if translated_text:
+                self._log(f"翻译完成: {translated_text[:30]}...")
+                self.stats["translation"].record(result.translated_at - sentence.created)
+                if self.tts and self.config.tts_enabled:
+                    self.translation_queue.put_nowait(result)
+            else:
+                self._log(f"翻译结果为空{reason} for: {sentence.text[:30]}")
+            self._emit(EVENT_TRANSLATION, sentence=result)
+            self.in_flight.task_done()
+
+    # ---------- 语音合成与播放阶段 ----------
+
+    async def _synthesis_stage(self):
+        """按顺序启动合成（不等待完成），每次取出所有等待中的译文交给backlog_policy"""
+        while True:
+            taken = [await self.translation_queue.get()]
+            while not self.translation_queue.empty():
+                taken.append(self.translation_queue.get_nowait())
+            try:
+                voice = self.config.voice
+                if not voice:
+                    self._log("TTS错误: 未选择音色。语音无法合成。")
+                    continue
+                pending = [BacklogItem(sentence.text, sentence.created) for sentence in taken]
+                utterances, dropped, backlog = self.backlog_policy.plan(pending)
+                self.stats["synthesis"].skip(len(dropped))
+                for item in dropped:
+                    self._log(f"语音积压 {backlog:.1f} s，跳过: {item.text[:30]}")
+                    self._emit(EVENT_TTS_DROPPED, item=item, backlog=backlog)
+                for utterance in utterances:
+                    # 等待播放阶段腾出位置，避免合成远远跑在播放前面
+                    await self._slots.acquire()
+                    await self._start_utterance(utterance, voice, backlog)
+            finally:
+                for _ in taken:
+                    self.translation_queue.task_done()
+
+    async def _start_utterance(self, utterance, voice, backlog):
+        """启动一次合成（已取得_slots）"""
+        rate = format_rate(utterance.rate)
+        if len(utterance.items) > 1 or utterance.rate > 1.0:
+            self._log(f"语音积压 {backlog:.1f} s，合并 {len(utterance.items)} 句，语速 {rate}: {utterance.text[:30]}...")
+        self._log(f"开始语音合成: {utterance.text[:30]}... (音色: {voice})")
+        try:
+            prefetched = await self.tts.start_synthesis(utterance.text, voice, cache=self.speech_cache, rate=rate)
+        except Exception as e:
+            self._log(f"语音合成失败: {e}")
+            self._slots.release()
+            return
+        created = utterance.items[0].created
+        prefetched.task.add_done_callback(
+            lambda _: self.stats["synthesis"].record(time.perf_counter() - created, len(utterance.items)))
+        self.backlog_policy.submitted(utterance)
+        self._emit(EVENT_TTS_STARTED, utterance=utterance)
+        self.playback_queue.put_nowait((utterance, prefetched))
+
+    async def _playback_stage(self):
+        """
+        按顺序把语音交给播放引擎：上一句还在播放时就提交下一句，句间无间隙；
+        播放引擎中最多排着正在播放的一句和它后面的一句
+        """
+        previous = None
+        while True:
+            utterance, prefetched = await self.playback_queue.get()
+            task = asyncio.ensure_future(self._play(utterance, prefetched, previous))
+            self._playing.append(task)
+            task.add_done_callback(self._playing.remove)
+            previous = task
+            while len(self._playing) > 1:
+                await asyncio.wait([self._playing[0]])
+
+    async def _play(self, utterance, prefetched, previous):
+        try:
+            ok = await self.tts.play_prefetched(prefetched, stream=self.config.stream_tts)
+        except Exception as e:
+            self._log(f"TTS播放时发生错误: {e}")
+            ok = False
+        finally:
+            self.backlog_policy.played(utterance)
+            self._slots.release()
+        # 按顺序报告播放结果
+        if previous is not None:
+            await asyncio.wait([previous])
+        lag = time.perf_counter() - utterance.items[-1].created
+        if ok:
+            self.stats["playback"].record(lag, len(utterance.items))
+            self._log(f"语音播放成功: {utterance.text[:30]}... (落后 {lag:.1f} s)")
+        else:
+            self._log(f"语音合成或播放失败: {utterance.text[:30]}")
+        self._emit(EVENT_TTS_PLAYED, utterance=utterance, ok=ok, lag=lag)
+        self.playback_queue.task_done()
+
+
+# ---------- 命令行：处理音频文件或识别文本 ----------
+
+def read_audio_file(path, sample_rate=16000):
+    """
+    读取音频文件，返回单声道float32采样（numpy数组）
+
+    WAV文件用标准库读取，其他格式需要安装 av (PyAV)。
+    """
+    import numpy as np
+
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            if f.getsampwidth() != 2:
+                raise ValueError("只支持16位PCM的WAV文件")
+            channels, rate = f.getnchannels(), f.getframerate()
+            samples = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").astype(np.float32) / 32768
+        samples = samples.reshape(-1, channels).mean(axis=1)
+        if rate != sample_rate:
+            positions = np.arange(0, len(samples), rate / sample_rate)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples
+
+    import av
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    chunks = []
+    with av.open(path) as container:
+        for frame in container.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+
+def _feed_audio(asr, samples, realtime, chunk_seconds=0.1):
+    """把音频文件的采样送入ASR，返回送入的音频时长（秒）"""
+    chunk = int(asr.sample_rate * chunk_seconds)
+    start = time.perf_counter()
+    for offset in range(0, len(samples), chunk):
+        asr.feed_audio(samples[offset:offset + chunk])
+        if realtime:
+            delay = start + (offset + chunk) / asr.sample_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    # 等待ASR处理完送入的音频
+    while not (asr.audio_idle.wait(0.05) and asr.audio_queue.empty()):
+        pass
+    asr.stop()
+    return len(samples) / asr.sample_rate
+
+
+def _feed_text(engine, path, interval):
+    """把文本文件的每一行当作一句识别结果送入流水线（不需要ASR模型）"""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    for i, line in enumerate(lines):
+        if i and interval:
+            time.sleep(interval)
+        engine.submit_asr(line, line, True)
+    return len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同声传译流水线（无界面）：处理音频文件并统计各阶段吞吐量")
+    parser.add_argument("input", help="音频文件（wav，其他格式需要安装 av）；.txt文件的每一行作为一句识别结果")
+    parser.add_argument("--from", dest="from_lang", default="cn", choices=sorted(LANGUAGE_CODES.values()))
+    parser.add_argument("--to", dest="to_lang", default="en", choices=sorted(LANGUAGE_CODES.values()))
+    parser.add_argument("--voice", default=None, help="语音合成音色，默认为目标语言的第一个音色")
+    parser.add_argument("--no-tts", action="store_true", help="只识别和翻译，不合成语音")
+    parser.add_argument("--play", action="store_true", help="从声卡播放语音（默认不出声，按实时速度消费音频）")
+    parser.add_argument("--fake-tts", action="store_true", help="使用本地模拟语音服务")
+    parser.add_argument("--format", default="mp3", choices=["mp3", "mp3-low", "pcm"],
+                        help="合成输出格式（pcm不需要安装 av）")
+    parser.add_argument("--fake", action="store_true", help="使用内置模拟翻译服务（不消耗接口配额）")
+    parser.add_argument("--realtime", action="store_true", help="按实时速度送入音频（默认尽快送入）")
+    parser.add_argument("--sentence-interval", type=float, default=0.0, help="文本输入时相邻两句的间隔（秒）")
+    parser.add_argument("--lag-policy", action="store_true", help="启用语音积压控制（加速、合并、丢弃）")
+    parser.add_argument("--workers", type=int, default=4, help="同时进行的翻译请求数")
+    parser.add_argument("--timeout", type=float, default=5.0, help="单句翻译超时（秒），超时跳过该句")
+    parser.add_argument("--no-batch", action="store_true", help="不合并短句，逐句请求翻译")
+    parser.add_argument("--app-id", default=os.environ.get("ITS_APP_ID"))
+    parser.add_argument("--api-secret", default=os.environ.get("ITS_API_SECRET"))
+    parser.add_argument("--api-key", default=os.environ.get("ITS_API_KEY"))
+    from fake_translation_server import add_config_arguments, config_from_args, start_server
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    options = {}
+    if args.fake:
+        server, options["url"] = start_server(config=config_from_args(args))
+        args.app_id, args.api_secret, args.api_key = "fake_app", "fake_secret", "fake_key"
+    elif not (args.app_id and args.api_secret and args.api_key):
+        parser.error("需要 --app-id/--api-secret/--api-key（或环境变量 ITS_APP_ID/ITS_API_SECRET/ITS_API_KEY），或使用 --fake")
+
+    tts = None
+    if not args.no_tts:
+        # 语音服务和输出方式在导入edge_TTS时确定
+        if args.fake_tts:
+            os.environ["TTS_SERVICE"] = "fake"
+        if not args.play:
+            os.environ["TTS_AUDIO_SINK"] = "null"
+        import edge_TTS as tts
+        tts.OUTPUT_FORMAT = args.format
+
+    translator = TranslationModule(args.app_id, args.api_secret, args.api_key, **options)
+    config = PipelineConfig(from_lang=args.from_lang, to_lang=args.to_lang, voice=args.voice,
+                            tts_enabled=tts is not None, translation_workers=args.workers,
+                            translation_timeout=args.timeout, use_batcher=not args.no_batch)
+    policy = BacklogPolicy() if args.lag_policy else None
+    engine = PipelineEngine(translator, config, tts=tts, backlog_policy=policy)
+    if tts is not None and not config.voice:
+        locale = TTS_LOCALES.get(args.to_lang, args.to_lang)
+        voices = asyncio.run(tts.voice_catalog.list_locale(locale))
+        if not voices:
+            parser.error(f"没有找到 {locale} 的音色，请用 --voice 指定")
+        config.voice = voices[0]["ShortName"]
+
+    def on_event(event):
+        if event.kind == EVENT_TRANSLATION and event.data["sentence"].text:
+            sentence = event.data["sentence"]
+            print(f"[{sentence.seq}] {sentence.source}\n    -> {sentence.text}")
+        elif event.kind == EVENT_TTS_DROPPED:
+            print(f"    (积压 {event.data['backlog']:.1f} s，跳过语音: {event.data['item'].text[:30]})")
+
+    engine.add_listener(on_event)
+    engine.start()
+    start = time.perf_counter()
+    audio_seconds = None
+    try:
+        if args.input.lower().endswith(".txt"):
+            _feed_text(engine, args.input, args.sentence_interval)
+        else:
+            from FunASR import FastLoadASR
+            asr = FastLoadASR(use_vad=True, use_punc=True, text_output_callback=engine.submit_asr)
+            samples = read_audio_file(args.input, asr.sample_rate)
+            if not asr.start(capture=False):
+                sys.exit(1)
+            audio_seconds = _feed_audio(asr, samples, args.realtime)
+        asr_done = time.perf_counter() - start
+        engine.stop(drain=True)
+    except KeyboardInterrupt:
+        print("\n已中断")
+        engine.stop()
+        asr_done = time.perf_counter() - start
+    finally:
+        engine.close()
+        translator.close()
+        if server is not None:
+            server.shutdown()
+        if tts is not None:
+            tts.close_audio_engine()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n总耗时 {elapsed:.2f} s（输入处理完 {asr_done:.2f} s）")
+    if audio_seconds:
+        print(f"音频时长 {audio_seconds:.1f} s，识别实时率 {asr_done / audio_seconds:.2f}")
+    print(f"{'阶段':<12}{'句数':>8}{'跳过':>6}{'吞吐量(句/s)':>14}{'平均延迟(s)':>14}{'最大延迟(s)':>14}")
+    for name, stats in engine.get_stats().items():
+        print(f"{name:<12}{stats['items']:>8}{stats['skipped']:>6}{stats['throughput']:>14.2f}"
+              f"{stats['mean_latency']:>14.2f}{stats['max_latency']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
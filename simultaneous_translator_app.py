@@ -3,7 +3,11 @@ from tkinter import ttk, scrolledtext
 import asyncio
 import threading
 import queue
-import time # Added for sleep in worker threads on error
+from collections import deque
+
+from tts_backlog import BacklogPolicy
+from transcript_view import TranscriptView
+from tts_voices import TTS_LOCALES
 
 # 尝试导入现有模块
 try:
@@ -14,7 +18,9 @@ except ImportError:
     FastLoadASR = None
 
 try:
-    from translation_module import TranslationModule, LANGUAGE_CODES, LANGUAGE_NAMES
+    from translation_module import TranslationModule, start_metrics_server, LANGUAGE_CODES, LANGUAGE_NAMES
+    from pipeline_engine import (PipelineEngine, PipelineConfig, EVENT_LOG, EVENT_ASR_PARTIAL, EVENT_ASR_FINAL,
+                                 EVENT_ASR_EMPTY, EVENT_PROVISIONAL, EVENT_TRANSLATION)
     # TODO: Replace with your actual API keys for translation_module
     TRANSLATION_APP_ID = "86c79fb7"  # <--- 在此处替换您的 APPID
     TRANSLATION_API_SECRET = "MDY3ZGFkYWEyZDBiOTJkOGIyOTllOWMz" # <--- 在此处替换您的 API_SECRET
@@ -22,9 +28,22 @@ try:
 except ImportError:
     print("警告: translation_module.py 未找到或无法导入。翻译功能将不可用。")
     TranslationModule = None
+    PipelineEngine = None
+    start_metrics_server = None
     LANGUAGE_CODES = {"中文": "cn", "英语": "en"} # Fallback
     LANGUAGE_NAMES = {"cn": "中文", "en": "英语"} # Fallback
 
+try:
+    from local_translation import LocalTranslationBackend
+except ImportError:
+    LocalTranslationBackend = None
+
+try:
+    from tts_cache import SpeechCache
+except ImportError:
+    SpeechCache = None
+
+
 try:
     import edge_TTS
     # We will call edge_TTS.get_available_languages() and edge_TTS.list_voices_by_language()
@@ -33,6 +52,57 @@ except ImportError:
     print("警告: edge_TTS.py 未找到或无法导入。语音合成功能将不可用。")
     edge_TTS = None
 
+# 翻译后端："its" 使用讯飞在线翻译接口，"local" 使用本地CTranslate2模型（需安装 ctranslate2 和 transformers）
+TRANSLATION_BACKEND = "its"
+LOCAL_TRANSLATION_MODELS = {}         # 例如 {("cn", "en"): "models/opus-mt-zh-en-ct2"}
+
+# 流式语音播放：收到第一段合成音频即开始播放（需要安装 av 和 sounddevice，否则自动退回整段播放）
+USE_STREAMING_TTS = True
+
+# 合成输出格式："mp3"（edge-tts默认）、"mp3-low" 或 "pcm"（原始PCM，省去MP3解码，不需要安装 av）；
+# edge-tts不支持指定输出格式时自动使用"mp3"
+TTS_OUTPUT_FORMAT = "mp3"
+
+# 语音合成流水线：播放当前句子的同时提前合成后面的句子，最多提前的句子数
+TTS_PREFETCH_DEPTH = 2
+
+# 语音播放延迟预算：说话人语速快于译文语音时，积压超过TTS_TARGET_LAG秒开始加快语速并合并排队的句子，
+# 加速到TTS_MAX_RATE倍仍超过TTS_MAX_LAG秒时丢弃最旧的句子
+USE_TTS_LAG_POLICY = True
+TTS_TARGET_LAG = 3.0
+TTS_MAX_LAG = 8.0
+TTS_MAX_RATE = 1.5
+
+# 合成语音缓存：重复出现的译文直接播放缓存的音频，不再请求TTS服务
+USE_TTS_CACHE = True
+TTS_CACHE_MEMORY_MB = 32
+TTS_CACHE_DISK_MB = 512
+
+# Prometheus指标导出端口（http://127.0.0.1:端口/metrics），None表示不启动
+METRICS_PORT = None
+
+# 并发翻译：最多同时进行的翻译请求数，译文仍按识别顺序输出；单句超过TRANSLATION_TIMEOUT秒未完成时跳过
+TRANSLATION_WORKERS = 4
+TRANSLATION_TIMEOUT = 5.0
+
+# 翻译微批处理：把流式ASR产生的短句合并成一个请求，减少API往返次数
+USE_TRANSLATION_BATCHER = True
+TRANSLATION_BATCH_MAX_CHARS = 60   # 单个合并请求的字符预算
+TRANSLATION_BATCH_MAX_DELAY = 0.3  # 句子最多等待多久再发送（秒）
+
+# 增量翻译：句子结束前先翻译中间结果中已稳定的前缀，显示临时译文，句子结束后替换为最终译文
+USE_INCREMENTAL_TRANSLATION = False
+INCREMENTAL_MIN_INTERVAL = 1.0        # 同一句两次临时翻译的最小间隔（秒）
+INCREMENTAL_MAX_REQUESTS = 3          # 每句临时翻译的最大API请求数
+
+# 界面刷新：文本框更新按固定帧率批量应用，识别/翻译结果和日志只保留最近的行数
+UI_FRAME_INTERVAL_MS = 33
+TEXT_HISTORY_LINES = 1000
+LOG_HISTORY_LINES = 2000
+
+# 多语言输出：除界面选择的目标语言外，同时并发翻译成以下语言（仅显示，语音合成仍使用所选目标语言）
+ADDITIONAL_TARGET_LANGUAGES = []      # 例如 ["日语", "西班牙语"]
+
 class SimultaneousTranslatorApp:
     def __init__(self, root):
         self.root = root
@@ -42,25 +112,73 @@ class SimultaneousTranslatorApp:
         self.is_running = False
         # self.asr_instance = None # Will be initialized below
         self.translation_instance = None
+        self.pipeline = None
 
         # Initialize Translation Module
-        if TranslationModule and TRANSLATION_APP_ID != "YOUR_APP_ID" and TRANSLATION_API_KEY != "YOUR_API_KEY" and TRANSLATION_API_SECRET != "YOUR_API_SECRET":
+        if TRANSLATION_BACKEND == "local":
+            if LocalTranslationBackend and LOCAL_TRANSLATION_MODELS:
+                try:
+                    self.translation_instance = LocalTranslationBackend(LOCAL_TRANSLATION_MODELS)
+                except Exception as e:
+                    print(f"警告: 本地翻译模型加载失败: {e}")
+            else:
+                print("警告: 本地翻译后端不可用，请安装 ctranslate2/transformers 并配置 LOCAL_TRANSLATION_MODELS。")
+        elif TranslationModule and TRANSLATION_APP_ID != "YOUR_APP_ID" and TRANSLATION_API_KEY != "YOUR_API_KEY" and TRANSLATION_API_SECRET != "YOUR_API_SECRET":
             self.translation_instance = TranslationModule(
                 app_id=TRANSLATION_APP_ID,
                 api_secret=TRANSLATION_API_SECRET,
-                api_key=TRANSLATION_API_KEY
+                api_key=TRANSLATION_API_KEY,
+                keep_warm=True  # 启动时预先建立连接，避免第一句翻译付出握手延迟
             )
         else:
             print("警告: 翻译模块API密钥未配置或模块导入失败。翻译功能将不可用。")
             if TRANSLATION_APP_ID == "YOUR_APP_ID":
                 print("请在 simultaneous_translator_app.py 中设置 TRANSLATION_APP_ID, TRANSLATION_API_SECRET, 和 TRANSLATION_API_KEY")
 
-        self.asr_output_queue = queue.Queue()
-        self.translation_output_queue = queue.Queue()
+        if edge_TTS:
+            edge_TTS.OUTPUT_FORMAT = TTS_OUTPUT_FORMAT
 
-        self.current_recognized_sentence = ""
-        self.last_final_asr_text = ""
-        self.recognized_text_has_interim = False
+        self.speech_cache = None
+        if USE_TTS_CACHE and SpeechCache and edge_TTS:
+            self.speech_cache = SpeechCache(memory_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024,
+                                            disk_bytes=TTS_CACHE_DISK_MB * 1024 * 1024)
+
+        self.metrics_server = None
+        if METRICS_PORT and start_metrics_server and isinstance(self.translation_instance, TranslationModule):
+            try:
+                self.metrics_server = start_metrics_server(self.translation_instance.metrics, port=METRICS_PORT)
+                print(f"翻译指标导出: http://127.0.0.1:{METRICS_PORT}/metrics")
+            except OSError as e:
+                print(f"警告: 指标导出服务启动失败: {e}")
+
+        self.pipeline_events = queue.Queue()  # 流水线事件，由UI线程的process_ui_updates处理
+        if self.translation_instance and PipelineEngine:
+            if USE_TTS_LAG_POLICY:
+                backlog_policy = BacklogPolicy(target_lag=TTS_TARGET_LAG, max_lag=TTS_MAX_LAG, max_rate=TTS_MAX_RATE)
+            else:
+                backlog_policy = None  # 逐句按正常语速播放
+            config = PipelineConfig(
+                from_lang="cn",
+                extra_langs=[LANGUAGE_CODES[name] for name in ADDITIONAL_TARGET_LANGUAGES if name in LANGUAGE_CODES],
+                tts_enabled=edge_TTS is not None,
+                stream_tts=USE_STREAMING_TTS,
+                prefetch_depth=TTS_PREFETCH_DEPTH,
+                translation_workers=TRANSLATION_WORKERS,
+                translation_timeout=TRANSLATION_TIMEOUT,
+                use_batcher=USE_TRANSLATION_BATCHER,
+                batch_max_chars=TRANSLATION_BATCH_MAX_CHARS,
+                batch_max_delay=TRANSLATION_BATCH_MAX_DELAY,
+                incremental=USE_INCREMENTAL_TRANSLATION,
+                incremental_min_interval=INCREMENTAL_MIN_INTERVAL,
+                incremental_max_requests=INCREMENTAL_MAX_REQUESTS
+            )
+            self.pipeline = PipelineEngine(self.translation_instance, config, tts=edge_TTS,
+                                           speech_cache=self.speech_cache, backlog_policy=backlog_policy)
+            self.pipeline.add_listener(self.pipeline_events.put)
+
+        self.translated_text_has_interim = False
+        self.translated_sentence_count = 0  # 已显示最终译文的句子数
+        self.pending_logs = deque()  # 其他线程产生的日志，由process_ui_updates显示
 
         # --- UI Elements ---
         control_frame = ttk.Frame(root, padding="10")
@@ -83,6 +201,7 @@ class SimultaneousTranslatorApp:
         self.tts_voice_var = tk.StringVar()
         self.tts_voice_dropdown = ttk.Combobox(lang_frame, textvariable=self.tts_voice_var, state="readonly", width=35)
         self.tts_voice_dropdown.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0,10))
+        self.tts_voice_dropdown.bind("<<ComboboxSelected>>", self._sync_pipeline_target)
 
         self.start_stop_button = ttk.Button(control_frame, text="开始同传", command=self.toggle_translation, width=12)
         self.start_stop_button.pack(side=tk.RIGHT, padx=(10,0))
@@ -105,6 +224,10 @@ class SimultaneousTranslatorApp:
         ttk.Label(text_frame, text="日志与状态:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=(10,0))
         self.log_text_area = scrolledtext.ScrolledText(text_frame, height=6, wrap=tk.WORD, state="disabled")
         self.log_text_area.grid(row=5, column=0, sticky="nsew", padx=5, pady=(0,5))
+
+        self.recognized_view = TranscriptView(self.recognized_text_area, max_lines=TEXT_HISTORY_LINES)
+        self.translated_view = TranscriptView(self.translated_text_area, max_lines=TEXT_HISTORY_LINES)
+        self.log_view = TranscriptView(self.log_text_area, max_lines=LOG_HISTORY_LINES)
         # --- End of UI Elements from previous version ---
 
         self.async_loop_thread = None
@@ -170,16 +293,10 @@ class SimultaneousTranslatorApp:
 
     def log_message(self, message, is_status=True):
         print(message) 
-        self.root.after(0, self._update_log_area, message + "\n")
+        self.pending_logs.append(message + "\n")
         if is_status:
              pass 
 
-    def _update_log_area(self, message):
-        self.log_text_area.config(state="normal")
-        self.log_text_area.insert(tk.END, message)
-        self.log_text_area.see(tk.END)
-        self.log_text_area.config(state="disabled")
-
     def start_asyncio_loop(self):
         def loop_runner():
             self.async_loop = asyncio.new_event_loop()
@@ -200,7 +317,13 @@ class SimultaneousTranslatorApp:
 
     def populate_target_languages(self):
         if TranslationModule and LANGUAGE_CODES:
-            self.target_lang_dropdown['values'] = list(LANGUAGE_CODES.keys())
+            target_names = list(LANGUAGE_CODES.keys())
+            # 本地模型只支持已加载的语言对，只列出以中文为源语言的目标语言
+            language_pairs = self.translation_instance.capabilities()["language_pairs"] if self.translation_instance else None
+            if language_pairs is not None:
+                targets = {to_lang for from_lang, to_lang in language_pairs if from_lang == "cn"}
+                target_names = [name for name in target_names if LANGUAGE_CODES[name] in targets]
+            self.target_lang_dropdown['values'] = target_names
             if self.target_lang_dropdown['values']:
                 self.target_lang_var.set(self.target_lang_dropdown['values'][0])
                 self.on_target_language_selected(None)
@@ -214,11 +337,7 @@ class SimultaneousTranslatorApp:
             self.log_message("edge_TTS模块不可用。")
             return []
         self.log_message(f"正在为语言代码 {lang_code_for_tts} 获取音色...")
-        tts_lang_map = {
-            "cn": "zh-CN", "en": "en-US", "ja": "ja-JP", "es": "es-ES",
-            "fr": "fr-FR", "de": "de-DE", "ko": "ko-KR", "ru": "ru-RU",
-        }
-        effective_lang_code = tts_lang_map.get(lang_code_for_tts.lower(), lang_code_for_tts)
+        effective_lang_code = TTS_LOCALES.get(lang_code_for_tts.lower(), lang_code_for_tts)
         try:
             voices_list = await edge_TTS.list_voices_by_language(effective_lang_code)
             if not voices_list and "-" not in effective_lang_code: 
@@ -239,25 +358,43 @@ class SimultaneousTranslatorApp:
         if not TranslationModule or not edge_TTS or not selected_language_name or selected_language_name == "N/A":
             self.tts_voice_dropdown['values'] = []
             self.tts_voice_var.set("")
+            self._sync_pipeline_target()
             return
         lang_code = LANGUAGE_CODES.get(selected_language_name)
         if not lang_code:
             self.log_message(f"未知目标语言名称: {selected_language_name}")
             return
+        self._sync_pipeline_target()
+        # 先用本地缓存的音色目录立即填充下拉框，再异步确认（缓存过期时后台刷新）
+        cached_voices = edge_TTS.voice_catalog.cached_voices(TTS_LOCALES.get(lang_code, lang_code))
+        if cached_voices:
+            self._set_voice_names([v['ShortName'] for v in cached_voices])
         future = self.run_async_task(self._fetch_voices_async(lang_code))
         if future:
             def update_voices_ui(f):
                 try:
                     voice_names = f.result()
-                    self.tts_voice_dropdown['values'] = voice_names
-                    if voice_names:
-                        self.tts_voice_var.set(voice_names[0])
-                    else:
-                        self.tts_voice_var.set("")
+                    if voice_names or not cached_voices:
+                        self._set_voice_names(voice_names)
                 except Exception as e:
                     self.log_message(f"更新音色UI时出错: {e}")
             self._check_future_for_ui(future, update_voices_ui)
 
+    def _set_voice_names(self, voice_names):
+        """更新音色下拉框，原来选中的音色仍可用时保持不变"""
+        if list(self.tts_voice_dropdown['values']) == voice_names:
+            return
+        self.tts_voice_dropdown['values'] = voice_names
+        if self.tts_voice_var.get() not in voice_names:
+            self.tts_voice_var.set(voice_names[0] if voice_names else "")
+        self._sync_pipeline_target()
+
+    def _sync_pipeline_target(self, event=None):
+        """把界面选择的目标语言和音色交给流水线，运行中切换对之后的句子生效"""
+        if self.pipeline:
+            self.pipeline.config.to_lang = LANGUAGE_CODES.get(self.target_lang_var.get())
+            self.pipeline.config.voice = self.tts_voice_var.get()
+
     def _check_future_for_ui(self, future, callback):
         if future.done():
             self.root.after(0, lambda: callback(future))
@@ -274,7 +411,7 @@ class SimultaneousTranslatorApp:
         if not self.asr_instance: # Check if ASR instance was created
             self.log_message("错误：FunASR实例未初始化，无法开始。", True)
             return
-        if not self.translation_instance:
+        if not self.pipeline:
             self.log_message("错误：翻译模块未初始化（请检查API密钥），无法开始。", True)
             return
         if not edge_TTS:
@@ -301,11 +438,12 @@ class SimultaneousTranslatorApp:
         self.start_stop_button.config(text="停止同传")
         self.log_message("正在启动同声传译服务...", True)
         
-        self._update_text_area(self.recognized_text_area, "", clear_all=True)
-        self._update_text_area(self.translated_text_area, "", clear_all=True)
-        self.current_recognized_sentence = ""
-        self.last_final_asr_text = ""
-        self.recognized_text_has_interim = False
+        self.recognized_view.clear()
+        self.translated_view.clear()
+        self.translated_text_has_interim = False
+        self.translated_sentence_count = 0
+        self._sync_pipeline_target()
+        self.pipeline.start(self.async_loop)
 
         # Start ASR instance (this should reset its internal state, not reload models)
         try:
@@ -316,12 +454,9 @@ class SimultaneousTranslatorApp:
         except Exception as e:
             self.log_message(f"启动FunASR失败: {e}", True)
             self.is_running = False
+            self.pipeline.stop()
             self.start_stop_button.config(text="开始同传")
             return
-        
-        # Start worker threads for translation and TTS
-        threading.Thread(target=self.translation_worker, daemon=True).start()
-        threading.Thread(target=self.tts_worker, daemon=True).start()
 
     def stop_translation_process(self):
         self.log_message("正在停止同声传译服务...", True)
@@ -331,174 +466,78 @@ class SimultaneousTranslatorApp:
             except Exception as e:
                 self.log_message(f"停止FunASR时出错: {e}")
         
-        self.is_running = False # Set to false to signal worker threads to stop
+        self.is_running = False
         self.start_stop_button.config(text="开始同传")
-        
-        # Clear queues after stopping ASR and setting is_running to false
-        # Give a moment for worker threads to see is_running=False and process remaining queue items
-        self.root.after(100, self._clear_queues)
-        self.log_message("同声传译已停止。", True)
 
-    def _clear_queues(self):
-        for q in [self.asr_output_queue, self.translation_output_queue]:
-            while not q.empty():
-                try: q.get_nowait()
-                except queue.Empty: break
-        self.log_message("处理队列已清空。")
+        # 丢弃尚未处理的句子（正在播放的一句会播完）
+        if self.pipeline:
+            self.pipeline.stop()
+        self.log_message("同声传译已停止。", True)
+        if self.speech_cache:
+            stats = self.speech_cache.get_stats()
+            self.log_message(f"语音缓存: 命中率 {stats['hit_rate']:.0%} (内存 {stats['memory_hits']}, "
+                             f"磁盘 {stats['disk_hits']}, 未命中 {stats['misses']})")
 
     def asr_text_callback(self, recognized_segment, current_full_sentence, is_sentence_end):
-        if not self.is_running: return
-
-        if is_sentence_end:
-            final_text = current_full_sentence.strip()
-            if final_text and final_text != self.last_final_asr_text:
-                self.log_message(f"ASR (Final): {final_text}")
-                self.last_final_asr_text = final_text
-                update_mode = 'replace_interim_with_final' if self.recognized_text_has_interim else 'append_final'
-                self.root.after(0, lambda: self._update_text_area(self.recognized_text_area, final_text + "\n", mode=update_mode))
-                self.asr_output_queue.put(final_text)
-                self.recognized_text_has_interim = False
-            elif not final_text:
-                 self.log_message(f"ASR (Final Empty Ignored)")
-                 if self.recognized_text_has_interim:
-                    self.root.after(0, lambda: self._update_text_area(self.recognized_text_area, "", mode='clear_interim'))
-                 self.recognized_text_has_interim = False
-            else: 
-                self.log_message(f"ASR (Duplicate Final Ignored): {final_text}")
-            self.current_recognized_sentence = "" 
-        else: 
-            self.current_recognized_sentence = current_full_sentence
-            self.log_message(f"ASR (Interim): {recognized_segment}")
-            self.root.after(0, lambda: self._update_text_area(self.recognized_text_area, self.current_recognized_sentence, mode='update_interim'))
-            self.recognized_text_has_interim = True
-
-    def translation_worker(self):
-        while True: 
-            try:
-                source_text = self.asr_output_queue.get(timeout=0.5)
-                if not self.is_running and self.asr_output_queue.empty(): break 
-                if not source_text or not self.translation_instance:
-                    if not self.is_running: break
-                    continue
-                from_lang_code = "cn" 
-                target_lang_name = self.target_lang_var.get()
-                to_lang_code = LANGUAGE_CODES.get(target_lang_name)
-                if not to_lang_code:
-                    self.log_message(f"翻译错误：无效目标语言 {target_lang_name}")
-                    if not self.is_running: break
-                    continue
-                self.log_message(f"开始翻译: {source_text[:30]}... -> {to_lang_code}")
-                try:
-                    translated_text = self.translation_instance.translate(
-                        text=source_text,
-                        from_lang=from_lang_code,
-                        to_lang=to_lang_code
-                    )
-                    if translated_text:
-                        self.log_message(f"翻译完成: {translated_text[:30]}...")
-                        self.translation_output_queue.put(translated_text)
-                        self.root.after(0, lambda t=translated_text: self._update_text_area(self.translated_text_area, t + "\n", mode='append_final'))
-                    else:
-                        self.log_message(f"翻译结果为空 for: {source_text[:30]}")
-                except Exception as e:
-                    self.log_message(f"翻译API调用失败: {e}")
-                self.asr_output_queue.task_done()
-            except queue.Empty:
-                if not self.is_running: break
-                continue 
-            except Exception as e:
-                self.log_message(f"翻译线程异常: {e}")
-                if not self.is_running: break
-                time.sleep(0.1) 
-        self.log_message("翻译线程已停止。")
+        if self.is_running and self.pipeline:
+            self.pipeline.submit_asr(recognized_segment, current_full_sentence, is_sentence_end)
+
+    def _handle_pipeline_event(self, event):
+        """在UI线程中处理流水线事件"""
+        data = event.data
+        if event.kind == EVENT_LOG:
+            self.log_message(data["message"])
+        elif event.kind == EVENT_ASR_PARTIAL:
+            self.recognized_view.set_interim(data["text"])
+        elif event.kind == EVENT_ASR_FINAL:
+            self.recognized_view.replace_interim_with_final(data["sentence"].text + "\n")
+        elif event.kind == EVENT_ASR_EMPTY:
+            self.recognized_view.clear_interim()
+        elif event.kind == EVENT_PROVISIONAL:
+            self._show_provisional_translation(data["seq"], data["text"])
+        elif event.kind == EVENT_TRANSLATION:
+            self._show_final_translation(data["sentence"].text, data["sentence"].extra)
+
+    def _show_provisional_translation(self, sentence_id, translated_prefix):
+        # 只显示紧跟在已显示最终译文之后的那一句，前面句子的最终译文还没出来时丢弃
+        if not self.is_running or sentence_id != self.translated_sentence_count:
+            return
+        self.translated_view.set_interim(translated_prefix + " ...")
+        self.translated_text_has_interim = True
+
+    def _show_final_translation(self, translated_text, extra_translations=None):
+        if translated_text:
+            self.translated_view.replace_interim_with_final(translated_text + "\n")
+        elif self.translated_text_has_interim:
+            self.translated_view.clear_interim()
+        for lang_code, extra_text in extra_translations or []:
+            self.translated_view.append_final(f"  [{LANGUAGE_NAMES.get(lang_code, lang_code)}] {extra_text}\n")
+        self.translated_text_has_interim = False
+        self.translated_sentence_count += 1
 
-    def tts_worker(self):
+    def process_ui_updates(self):
+        """每帧处理一次积累的流水线事件和日志，文本框的修改在帧末一次性应用"""
         while True:
             try:
-                translated_text = self.translation_output_queue.get(timeout=0.5)
-                if not self.is_running and self.translation_output_queue.empty(): break
-                if not translated_text or not edge_TTS:
-                    if not self.is_running: break
-                    continue
-                selected_voice = self.tts_voice_var.get()
-                if not selected_voice:
-                    self.log_message("TTS错误: 未选择音色。语音无法合成。")
-                    if not self.is_running: break
-                    continue
-                self.log_message(f"开始语音合成: {translated_text[:30]}... (音色: {selected_voice})")
-                future = self.run_async_task(
-                    edge_TTS.text_to_speech(translated_text, selected_voice)
-                )
-                if future:
-                    try:
-                        success = future.result(timeout=30) 
-                        if success:
-                            self.log_message(f"语音播放成功: {translated_text[:30]}...")
-                        else:
-                             self.log_message(f"语音合成或播放失败: {translated_text[:30]}")
-                    except asyncio.TimeoutError:
-                        self.log_message(f"TTS任务超时: {translated_text[:30]}")
-                    except Exception as e:
-                        self.log_message(f"TTS播放时发生错误: {e}")
-                else:
-                    self.log_message("无法调度TTS任务进行播放。")
-                self.translation_output_queue.task_done()
+                event = self.pipeline_events.get_nowait()
             except queue.Empty:
-                if not self.is_running: break
-                continue
-            except Exception as e:
-                self.log_message(f"TTS线程异常: {e}")
-                if not self.is_running: break
-                time.sleep(0.1)
-        self.log_message("TTS线程已停止。")
-
-    def _update_text_area(self, area, text, mode='append_final', clear_all=False):
-        area.config(state="normal")
-        if clear_all:
-            area.delete(1.0, tk.END)
-        elif mode == 'append_final':
-            area.insert(tk.END, text)
-        elif mode == 'update_interim':
-            current_content = area.get(1.0, tk.END).rstrip('\n')
-            last_newline_idx = current_content.rfind('\n')
-            if not self.recognized_text_has_interim: 
-                if current_content and not current_content.endswith('\n'):
-                    area.insert(tk.END, "\n") 
-                area.insert(tk.END, text) 
-            elif last_newline_idx == -1: 
-                area.delete(1.0, tk.END)
-                area.insert(1.0, text)
-            else: 
-                area.delete(f"1.0 + {last_newline_idx + 1}c", tk.END) 
-                area.insert(tk.END, text) 
-        elif mode == 'replace_interim_with_final':
-            current_content = area.get(1.0, tk.END).rstrip('\n')
-            last_newline_idx = current_content.rfind('\n')
-            if last_newline_idx == -1:
-                area.delete(1.0, tk.END)
-            else:
-                area.delete(f"1.0 + {last_newline_idx + 1}c", tk.END)
-            current_content_after_delete = area.get(1.0, tk.END).rstrip('\n')
-            if current_content_after_delete and not current_content_after_delete.endswith('\n'):
-                 area.insert(tk.END, "\n")
-            area.insert(tk.END, text) 
-        elif mode == 'clear_interim':
-            current_content = area.get(1.0, tk.END).rstrip('\n')
-            last_newline_idx = current_content.rfind('\n')
-            if self.recognized_text_has_interim:
-                if last_newline_idx == -1: 
-                    area.delete(1.0, tk.END)
-                else: 
-                    area.delete(f"1.0 + {last_newline_idx + 1}c", tk.END)
-        area.see(tk.END)
-        area.config(state="disabled")
-
-    def process_ui_updates(self):
-        self.root.after(200, self.process_ui_updates) 
+                break
+            self._handle_pipeline_event(event)
+        while self.pending_logs:
+            self.log_view.append_final(self.pending_logs.popleft())
+        for view in (self.recognized_view, self.translated_view, self.log_view):
+            view.flush()
+        self.root.after(UI_FRAME_INTERVAL_MS, self.process_ui_updates)
 
     def on_closing(self):
         self.log_message("应用正在关闭...", True)
         self.stop_translation_process() 
+        if self.pipeline:
+            self.pipeline.close()
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+        if edge_TTS:
+            edge_TTS.close_audio_engine()
         if self.async_loop and self.async_loop.is_running():
             self.log_message("正在停止Asyncio事件循环...")
             self.async_loop.call_soon_threadsafe(self.async_loop.stop)
@@ -0,0 +1,5 @@
+# text_split.py - 批量翻译与分段合成共用的文本切分规则
+import re
+
+# 句子切分：句末标点（含其后的引号括号）或英文句点后接空白
+SENTENCE_RE = re.compile(r'.*?(?:[。！？!?；;…]+[”’"」』）)]*|\.(?=\s)|$)\s*')
@@ -0,0 +1,85 @@
+# transcript_view.py - 滚动文本框的字幕视图（临时结果只改动最后一行、限制历史行数、按帧批量更新）
+import tkinter as tk
+
+INTERIM_MARK = "interim"  # 临时结果的起点：之前是已确定的行，之后到末尾是临时结果
+INTERIM_TAG = "interim"
+
+
+class TranscriptView:
+    """
+    文本框的追加式视图
+
+    已确定的文本插入在INTERIM_MARK处，临时结果位于INTERIM_MARK到末尾之间，更新临时结果只删除和插入这一段，
+    不读取整个文本框的内容，耗时与会话长度无关。超过max_lines行时从开头裁剪。
+    所有修改先记录下来，由flush()在UI线程中一次性应用（连续的临时结果更新只保留最后一次）。
+    """
+
+    def __init__(self, area, max_lines=1000, interim_foreground="gray"):
+        """
+        参数:
+            area: tk.Text或ScrolledText（state为disabled，由flush临时打开）
+            max_lines: 保留的最大行数，None表示不裁剪
+            interim_foreground: 临时结果的文字颜色
+        """
+        self.area = area
+        self.max_lines = max_lines
+        self.ops = []  # [(类型, 文本)]：final / interim / clear
+        area.mark_set(INTERIM_MARK, "end-1c")
+        area.mark_gravity(INTERIM_MARK, tk.RIGHT)
+        area.tag_configure(INTERIM_TAG, foreground=interim_foreground)
+
+    def append_final(self, text):
+        """追加已确定的文本（插入在临时结果之前）"""
+        if self.ops and self.ops[-1][0] == "final":
+            self.ops[-1] = ("final", self.ops[-1][1] + text)
+        else:
+            self.ops.append(("final", text))
+
+    def set_interim(self, text):
+        """替换临时结果"""
+        if self.ops and self.ops[-1][0] == "interim":
+            self.ops[-1] = ("interim", text)
+        else:
+            self.ops.append(("interim", text))
+
+    def clear_interim(self):
+        self.set_interim("")
+
+    def replace_interim_with_final(self, text):
+        """用已确定的文本替换临时结果"""
+        self.clear_interim()
+        self.append_final(text)
+
+    def clear(self):
+        self.ops = [("clear", None)]
+
+    def flush(self):
+        """在UI线程中应用记录的修改，返回是否有修改"""
+        if not self.ops:
+            return False
+        area = self.area
+        area.config(state="normal")
+        for kind, text in self.ops:
+            if kind == "final":
+                area.insert(INTERIM_MARK, text)
+            elif kind == "interim":
+                start = area.index(INTERIM_MARK)
+                area.delete(start, "end-1c")
+                if text:
+                    area.insert("end-1c", text, INTERIM_TAG)
+                    area.mark_set(INTERIM_MARK, start)
+            else:
+                area.delete("1.0", tk.END)
+        self.ops = []
+        self._trim()
+        area.see(tk.END)
+        area.config(state="disabled")
+        return True
+
+    def _trim(self):
+        # 超出10%再裁剪，避免每追加一行都删除一次
+        if self.max_lines is None:
+            return
+        lines = int(self.area.index("end-1c").split(".")[0])
+        if lines > self.max_lines + self.max_lines // 10:
+            self.area.delete("1.0", f"{lines - self.max_lines + 1}.0")
@@ -0,0 +1,116 @@
+# translation_load_test.py - 翻译模块压力测试工具
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from translation_module import TranslationModule, percentile
+from fake_translation_server import add_config_arguments, config_from_args, start_server
+
+# 使用内置模拟服务时的伪密钥
+FAKE_APP_ID = "load_test_app"
+FAKE_API_SECRET = "load_test_secret"
+FAKE_API_KEY = "load_test_key"
+
+SAMPLE_SENTENCES = [
+    "今天的会议主要讨论下一季度的产品规划",
+    "请大家先看一下屏幕上的数据",
+    "我们的用户数量比去年增长了百分之三十",
+    "接下来由市场部介绍推广方案",
+    "有什么问题可以随时提出来",
+]
+
+
+def make_texts(count, distinct=None):
+    """生成count条待翻译文本，distinct限制不同文本的数量（用于测试缓存命中）"""
+    distinct = distinct or count
+    return [f"{SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]}（{i % distinct}）" for i in range(count)]
+
+
+def run_load(translator, texts, concurrency=4, mode="translate", batch_size=10, from_lang="cn", to_lang="en"):
+    """
+    并发驱动translate或batch_translate
+
+    返回:
+        统计结果字典：调用次数、句子数、字符数、失败数、总耗时以及每次调用的延迟列表
+    """
+    if mode == "batch":
+        units = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    else:
+        units = [[text] for text in texts]
+
+    def run_unit(unit):
+        start = time.perf_counter()
+        if mode == "batch":
+            results = translator.batch_translate(unit, from_lang, to_lang)
+        else:
+            results = [translator.translate(unit[0], from_lang, to_lang)]
+        return time.perf_counter() - start, sum(1 for r in results if r is None)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(run_unit, units))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "calls": len(units),
+        "sentences": len(texts),
+        "chars": sum(len(text) for text in texts),
+        "failures": sum(failed for _, failed in outcomes),
+        "elapsed": elapsed,
+        "latencies": [latency for latency, _ in outcomes]
+    }
+
+
+def print_report(result):
+    """打印吞吐量与延迟分位数"""
+    latencies = result["latencies"]
+    elapsed = result["elapsed"]
+    print(f"调用次数: {result['calls']}  句子数: {result['sentences']}  失败: {result['failures']}")
+    print(f"总耗时: {elapsed:.2f} s")
+    print(f"吞吐量: {result['calls'] / elapsed:.1f} 调用/s, {result['sentences'] / elapsed:.1f} 句/s, "
+          f"{result['chars'] / elapsed:.0f} 字符/s")
+    print(f"调用延迟: p50 {percentile(latencies, 50) * 1000:.1f} ms, p90 {percentile(latencies, 90) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="翻译模块压力测试（默认使用内置模拟服务）")
+    parser.add_argument("--url", default=None, help="翻译API地址，不指定时启动内置模拟服务")
+    parser.add_argument("--app-id", default=FAKE_APP_ID)
+    parser.add_argument("--api-secret", default=FAKE_API_SECRET)
+    parser.add_argument("--api-key", default=FAKE_API_KEY)
+    parser.add_argument("--requests", type=int, default=200, help="待翻译句子总数")
+    parser.add_argument("--distinct", type=int, default=None, help="不同句子的数量，默认全部不同")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发调用数")
+    parser.add_argument("--mode", choices=("translate", "batch"), default="translate")
+    parser.add_argument("--batch-size", type=int, default=10, help="batch模式下每次调用的句子数")
+    parser.add_argument("--request-interval", type=float, default=None,
+                        help="客户端最小请求间隔（秒），默认使用模拟服务时为0")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(config=config_from_args(args))
+        print(f"已启动内置模拟服务: {url}")
+
+    translator = TranslationModule(args.app_id, args.api_secret, args.api_key, url=url)
+    if args.request_interval is not None:
+        translator.request_interval = args.request_interval
+    elif server is not None:
+        translator.request_interval = 0
+
+    try:
+        texts = make_texts(args.requests, args.distinct)
+        result = run_load(translator, texts, args.concurrency, args.mode, args.batch_size)
+        print_report(result)
+        if server is not None:
+            print(f"模拟服务统计: {server.stats.snapshot()}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 # translation_module.py - 优化的文本翻译模块 - 性能优化版
-from datetime import datetime
+from abc import ABC, abstractmethod
 from wsgiref.handlers import format_date_time
-from time import mktime
 import hashlib
 import base64
 import hmac
@@ -9,31 +8,55 @@ from urllib.parse import urlencode
 from threading import Lock
 import time
 import threading
-from collections import OrderedDict
+import random
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 import sys
 import os
+import re
+import weakref
+import importlib.util
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# 尝试使用更快的JSON库
+# 尝试使用更快的JSON库：orjson > ujson > 标准json
 try:
-    import ujson as json
+    import orjson
 
-    print("使用ujson加速JSON处理")
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+    JSON_BACKEND = "orjson"
 except ImportError:
-    import json
+    try:
+        import ujson as json
+    except ImportError:
+        import json
+
+    json_loads = json.loads
+    json_dumps = json.dumps
+    JSON_BACKEND = json.__name__
 
-    print("使用标准json库")
+    if JSON_BACKEND == "json":
+        def json_loads(content):
+            # 标准json库解析bytes时会先探测编码，接口固定为UTF-8，直接解码更快
+            if isinstance(content, (bytes, bytearray)):
+                content = content.decode("utf-8")
+            return json.loads(content)
 
 # 尝试使用更快的HTTP库
 try:
     import httpx
 
     use_httpx = True
-    print("使用httpx加速HTTP请求")
+    TIMEOUT_ERRORS = (httpx.TimeoutException,)
 except ImportError:
     import requests
+    from requests.adapters import HTTPAdapter
 
     use_httpx = False
-    print("使用标准requests库")
+    TIMEOUT_ERRORS = (requests.Timeout,)
+
+HTTP_BACKEND = "httpx" if use_httpx else "requests"
 
 # 支持的语言代码
 LANGUAGE_CODES = {
@@ -49,6 +72,54 @@ LANGUAGE_CODES = {
 # 语言代码反向映射（用于显示）
 LANGUAGE_NAMES = {code: name for name, code in LANGUAGE_CODES.items()}
 
+# 默认的翻译API地址
+DEFAULT_API_URL = 'https://itrans.xf-yun.com/v1/its'
+
+
+def parse_its_response(content):
+    """
+    解析ITS接口的响应正文，外层JSON、base64和内层JSON各只解码一次
+
+    参数:
+        content: 响应正文（bytes或str）
+
+    返回:
+        (译文, 错误)，成功时错误为None；失败时译文为None，
+        错误为 {"code": 错误码, "message": 错误信息}
+    """
+    try:
+        result = json_loads(content)
+    except ValueError as e:
+        return None, {"code": None, "message": f"响应不是有效的JSON: {e}"}
+
+    try:
+        encoded_text = result["payload"]["result"]["text"]
+    except (KeyError, TypeError):
+        header = result.get("header") if isinstance(result, dict) else None
+        if isinstance(header, dict):
+            return None, {"code": header.get("code"), "message": header.get("message")}
+        return None, {"code": None, "message": f"无法识别的响应: {result}"}
+
+    try:
+        translated = base64.b64decode(encoded_text)
+    except (ValueError, TypeError) as e:
+        return None, {"code": None, "message": f"译文base64解码失败: {e}"}
+
+    # 译文通常是JSON，只提取翻译文本；不是JSON时返回原始文本
+    if translated[:1] == b"{":
+        try:
+            json_result = json_loads(translated)
+        except ValueError:
+            json_result = None
+        if isinstance(json_result, dict):
+            trans_result = json_result.get("trans_result")
+            if isinstance(trans_result, dict) and "dst" in trans_result:
+                return trans_result["dst"], None
+            if "dst" in json_result:
+                return json_result["dst"], None
+
+    return translated.decode("utf-8", errors="replace"), None
+
 
 class LRUCache:
     """基于OrderedDict实现的LRU缓存"""
@@ -90,15 +161,464 @@ class LRUCache:
         return len(self.cache)
 
 
-class TranslationModule:
-    """优化的星火机器翻译模块 - 性能优化版"""
+def _strip_spaces(text):
+    """去除文本中的所有空白"""
+    return "".join(text.split())
+
+
+class TranslationMemory:
+    """
+    翻译记忆库：按字符n-gram索引历史原文，对近似重复的句子直接复用已有译文
+
+    相似度使用n-gram集合的Dice系数。为避免把"3点"复用成"5点"的译文，
+    只有数字完全一致的句子才会匹配；长度相差较多的句子（例如只多了几个字的长句与它的前半句）
+    即使相似度达到阈值也不匹配。与精确缓存一样按语言对和是否使用术语资源分开索引。
+    条目数超过容量时按LRU淘汰。
+    """
+
+    def __init__(self, capacity=2000, threshold=0.85, ngram=2, min_length=4, min_length_ratio=0.9):
+        """
+        参数:
+            capacity: 最多保存的条目数
+            threshold: 复用译文所需的最低相似度（0~1）
+            ngram: n-gram长度
+            min_length: 参与模糊匹配的最短文本长度，太短的句子只走精确缓存
+            min_length_ratio: 较短原文与较长原文的最低长度比（去除空白后），低于此值不匹配
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ngram = ngram
+        self.min_length = min_length
+        self.min_length_ratio = min_length_ratio
+
+        # 语言对 = (源语言, 目标语言, 是否使用术语资源)
+        self.entries = OrderedDict()  # entry_id -> (语言对, 原文, 译文, n-gram集合, 数字, 去除空白后的长度)
+        self.index = {}               # (语言对, n-gram) -> {entry_id}
+        self.sources = {}             # (语言对, 原文) -> entry_id
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+        # 统计信息
+        self.lookups = 0
+        self.hits = 0
+
+    def _ngrams(self, text):
+        """提取去除空白后的字符n-gram集合"""
+        text = _strip_spaces(text)
+        n = self.ngram
+        if len(text) <= n:
+            return {text}
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    @staticmethod
+    def _digits(text):
+        return "".join(ch for ch in text if ch.isdigit())
+
+    def add(self, text, from_lang, to_lang, translation, use_terminology=True):
+        """记录一条原文与译文"""
+        if len(text) < self.min_length or not translation:
+            return
+        pair = (from_lang, to_lang, use_terminology)
+        with self.lock:
+            entry_id = self.sources.get((pair, text))
+            if entry_id is not None:
+                self._remove(entry_id)
+
+            grams = self._ngrams(text)
+            entry_id = self.next_id
+            self.next_id += 1
+            self.entries[entry_id] = (pair, text, translation, grams, self._digits(text), len(_strip_spaces(text)))
+            self.sources[(pair, text)] = entry_id
+            for gram in grams:
+                self.index.setdefault((pair, gram), set()).add(entry_id)
+
+            if len(self.entries) > self.capacity:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, entry_id):
+        """删除一条记录及其索引（调用时需持有锁）"""
+        pair, text, _, grams, _, _ = self.entries.pop(entry_id)
+        del self.sources[(pair, text)]
+        for gram in grams:
+            postings = self.index[(pair, gram)]
+            postings.discard(entry_id)
+            if not postings:
+                del self.index[(pair, gram)]
+
+    def lookup(self, text, from_lang, to_lang, use_terminology=True):
+        """
+        查找与text最相似的历史原文（只匹配相同语言对和术语设置的记录）
+
+        返回:
+            (译文, 相似度)，没有达到阈值的记录时返回None
+        """
+        if len(text) < self.min_length:
+            return None
+        pair = (from_lang, to_lang, use_terminology)
+        grams = self._ngrams(text)
+        digits = self._digits(text)
+        length = len(_strip_spaces(text))
+
+        with self.lock:
+            self.lookups += 1
+
+            # 统计每个候选条目与查询共享的n-gram数量
+            overlaps = {}
+            for gram in grams:
+                for entry_id in self.index.get((pair, gram), ()):
+                    overlaps[entry_id] = overlaps.get(entry_id, 0) + 1
+
+            best_id, best_score = None, 0.0
+            for entry_id, overlap in overlaps.items():
+                entry = self.entries[entry_id]
+                score = 2.0 * overlap / (len(grams) + len(entry[3]))
+                if score > best_score and entry[4] == digits and \
+                        min(length, entry[5]) >= self.min_length_ratio * max(length, entry[5]):
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(best_id)
+            return self.entries[best_id][2], best_score
+
+    def clear(self):
+        """清空翻译记忆"""
+        with self.lock:
+            self.entries.clear()
+            self.index.clear()
+            self.sources.clear()
+
+    def get_stats(self):
+        """获取翻译记忆统计信息"""
+        return {
+            "capacity": self.capacity,
+            "current_size": len(self.entries),
+            "lookups": self.lookups,
+            "hits": self.hits
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CircuitBreaker:
+    """简单的熔断器：连续失败达到阈值后在冷却期内快速失败"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        """是否允许发起请求；冷却期结束后放行一次试探请求"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        """记录一次成功请求，关闭熔断器"""
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """记录一次失败请求，达到阈值或试探失败时打开熔断器"""
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.time()
+
+
+class RetryableError(Exception):
+    """可重试的翻译请求错误（超时、连接失败、限流或服务端错误）"""
+
+
+def percentile(samples, q):
+    """计算样本的分位数（q取0~100），基准测试和压测脚本使用"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图，记录开销为O(1)，分位数按桶内线性插值估计"""
+
+    # 桶上限（秒），最后一个桶为+Inf
+    BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    __slots__ = ['counts', 'count', 'sum']
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        """记录一个延迟样本（调用方负责加锁）"""
+        self.counts[bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, q):
+        """估计分位数（q取0~100），落在+Inf桶时返回最大的有限桶上限"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        lower = 0.0
+        for index, count in enumerate(self.counts):
+            if index == len(self.BUCKETS):
+                return self.BUCKETS[-1]
+            upper = self.BUCKETS[index]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.BUCKETS[-1]
+
+
+class TranslationMetrics:
+    """
+    翻译模块的运行指标：按缓存结果和语言对划分的延迟直方图、进行中的请求数以及各类事件计数
+
+    缓存结果分为 hit（精确缓存命中）、memory（翻译记忆命中）、miss（调用API）。
+    """
+
+    # 事件计数器名称
+    COUNTERS = ("translations", "api_requests", "retries", "hedged_requests", "throttle_waits",
+                "throttled_responses", "timeouts", "http_errors", "network_errors", "api_errors",
+                "breaker_rejections", "failures")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}  # (缓存结果, 源语言, 目标语言) -> LatencyHistogram
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.throttle_wait_seconds = 0.0
+        self.in_flight = 0
+
+    def observe(self, cache_result, from_lang, to_lang, seconds):
+        """记录一次translate调用的端到端延迟"""
+        key = (cache_result, from_lang, to_lang)
+        with self.lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = LatencyHistogram()
+            histogram.observe(seconds)
+            self.counters["translations"] += 1
+
+    def incr(self, name, value=1):
+        """增加一个事件计数"""
+        with self.lock:
+            self.counters[name] += value
+
+    def add_throttle_wait(self, seconds):
+        """记录一次客户端限速等待"""
+        with self.lock:
+            self.counters["throttle_waits"] += 1
+            self.throttle_wait_seconds += seconds
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+            self.counters["api_requests"] += 1
+
+    def request_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def reset(self):
+        """清空所有指标（进行中的请求数除外）"""
+        with self.lock:
+            self.latency = {}
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+            self.throttle_wait_seconds = 0.0
+
+    def snapshot(self):
+        """
+        获取指标快照
+
+        返回:
+            {"in_flight": 进行中的API请求数, "counters": {事件: 次数}, "throttle_wait_seconds": 限速等待总时长,
+             "error_rate": 失败的API请求比例,
+             "latency": {缓存结果: {"源语言->目标语言": {"count", "mean_ms", "p50_ms", "p90_ms", "p99_ms"}}}}
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            latency = {}
+            for (cache_result, from_lang, to_lang), histogram in self.latency.items():
+                latency.setdefault(cache_result, {})[f"{from_lang}->{to_lang}"] = {
+                    "count": histogram.count,
+                    "mean_ms": histogram.sum / histogram.count * 1000,
+                    "p50_ms": histogram.percentile(50) * 1000,
+                    "p90_ms": histogram.percentile(90) * 1000,
+                    "p99_ms": histogram.percentile(99) * 1000
+                }
+            errors = (counters["timeouts"] + counters["http_errors"] + counters["network_errors"]
+                      + counters["throttled_responses"] + counters["api_errors"])
+            return {
+                "in_flight": self.in_flight,
+                "counters": counters,
+                "throttle_wait_seconds": self.throttle_wait_seconds,
+                "error_rate": errors / counters["api_requests"] if counters["api_requests"] else 0.0,
+                "latency": latency
+            }
+
+    def render_prometheus(self, prefix="translation"):
+        """按Prometheus文本格式输出全部指标"""
+        with self.lock:
+            lines = [f"# HELP {prefix}_latency_seconds translate() latency by cache result and language pair",
+                     f"# TYPE {prefix}_latency_seconds histogram"]
+            for (cache_result, from_lang, to_lang), histogram in sorted(self.latency.items()):
+                labels = f'cache="{cache_result}",from="{from_lang}",to="{to_lang}"'
+                cumulative = 0
+                for bound, count in zip(LatencyHistogram.BUCKETS + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_latency_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{prefix}_latency_seconds_count{{{labels}}} {histogram.count}")
+
+            lines.append(f"# TYPE {prefix}_in_flight_requests gauge")
+            lines.append(f"{prefix}_in_flight_requests {self.in_flight}")
+            for name, value in self.counters.items():
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            lines.append(f"# TYPE {prefix}_throttle_wait_seconds_total counter")
+            lines.append(f"{prefix}_throttle_wait_seconds_total {self.throttle_wait_seconds}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Prometheus抓取接口：GET /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = "".join(metrics.render_prometheus(prefix) for prefix, metrics in self.server.sources).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(metrics, port=9464, host="127.0.0.1", prefix="translation"):
+    """
+    在后台线程中启动Prometheus指标导出服务
+
+    参数:
+        metrics: TranslationMetrics实例，或 [(指标前缀, 指标对象), ...] 列表（对象需提供render_prometheus(prefix)）
+        port: 监听端口，0表示自动分配
+        host: 监听地址，默认只监听本机
+        prefix: metrics为单个对象时使用的指标前缀
+
+    返回:
+        server，server.server_address[1] 为实际端口，调用 server.shutdown() 停止服务
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.sources = [(prefix, metrics)] if hasattr(metrics, "render_prometheus") else list(metrics)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TranslationBackend(ABC):
+    """
+    翻译后端接口
+
+    实现类必须提供translate和capabilities，缺少时实例化即报TypeError；batch_translate和translate_multi
+    默认逐条调用translate，支持批量推理或并发请求的后端可以覆盖。
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def cache_key(text, from_lang, to_lang, use_terminology):
+        """生成翻译结果的缓存键"""
+        return f"{text}_{from_lang}_{to_lang}_{use_terminology}"
+
+    @abstractmethod
+    def translate(self, text, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True):
+        """翻译单条文本，出错返回None"""
+
+    def translate_with_error(self, text, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True):
+        """翻译单条文本，返回 (译文, 错误)；默认实现不提供错误信息，出错时为 (None, None)"""
+        return self.translate(text, from_lang, to_lang, use_terminology, use_cache), None
+
+    def batch_translate(self, texts, from_lang="cn", to_lang="en", use_terminology=True):
+        """批量翻译文本，返回与texts等长的结果列表"""
+        return [self.translate(text, from_lang, to_lang, use_terminology) for text in texts]
+
+    def translate_multi(self, text, from_lang="cn", to_langs=("en",), use_terminology=True, use_cache=True):
+        """把同一段文本翻译成多种目标语言，返回 {目标语言代码: 翻译结果}"""
+        return {to_lang: self.translate(text, from_lang, to_lang, use_terminology, use_cache)
+                for to_lang in dict.fromkeys(to_langs)}
+
+    @abstractmethod
+    def capabilities(self):
+        """
+        返回后端能力描述:
+            name: 后端名称
+            offline: 是否无需网络
+            language_pairs: 支持的(源语言, 目标语言)列表，None表示LANGUAGE_CODES中任意组合
+            max_text_length: 单条文本的最大长度
+            native_batch: batch_translate是否为真正的批量推理/请求
+        """
+
+    def clear_cache(self):
+        """清空翻译缓存"""
+
+    def get_cache_stats(self):
+        """获取缓存统计信息"""
+        return {}
+
+    def get_metrics(self):
+        """获取运行指标快照，不提供指标的后端返回空字典"""
+        return {}
+
+    def close(self):
+        """释放后端资源"""
+
+
+class TranslationModule(TranslationBackend):
+    """优化的星火机器翻译模块 - 性能优化版（讯飞ITS接口后端）"""
 
     # 使用__slots__减少内存占用
     __slots__ = ['app_id', 'api_secret', 'api_key', 'url', 'res_id',
                  'lock', 'cache', 'cache_size', 'last_request_time',
-                 'request_interval', 'client', 'timeout', 'session_lock']
-
-    def __init__(self, app_id, api_secret, api_key, cache_size=200):
+                 'request_interval', 'client', 'timeout',
+                 '_url_parts', '_auth_url_cache', 'max_retries', 'retry_backoff',
+                 'retry_backoff_max', 'hedge', 'hedge_delay', 'breaker',
+                 '_latencies', '_executor', '_fanout_executor', 'translation_memory',
+                 'keepalive_expiry', '_base_url', '_last_activity',
+                 '_warm_stop', 'metrics', '__weakref__']
+
+    def __init__(self, app_id, api_secret, api_key, cache_size=200, url=DEFAULT_API_URL,
+                 timeout=5.0, max_retries=2, retry_backoff=0.1, retry_backoff_max=1.0,
+                 hedge=False, hedge_delay=None, breaker_threshold=5, breaker_reset_timeout=10.0,
+                 translation_memory=None, http2=False, max_connections=10, max_keepalive_connections=5,
+                 keepalive_expiry=30.0, keep_warm=False, verify=True):
         """
         初始化翻译模块
 
@@ -107,33 +627,120 @@ class TranslationModule:
             api_secret: APISecret
             api_key: APIKey
             cache_size: 缓存大小，默认200条
+            url: 翻译API地址，默认为讯飞ITS接口
+            timeout: 单次请求超时（秒）
+            max_retries: 失败后的最大重试次数
+            retry_backoff: 重试退避基数（秒），按指数增长并加随机抖动
+            retry_backoff_max: 单次退避的最大等待时间（秒）
+            hedge: 是否启用对冲请求（首个请求超过p95延迟仍未返回时再发一个）
+            hedge_delay: 固定的对冲等待时间（秒），为None时使用最近请求延迟的p95
+            breaker_threshold: 连续失败多少次后打开熔断器
+            breaker_reset_timeout: 熔断器打开后的冷却时间（秒）
+            translation_memory: 可选的TranslationMemory实例，精确缓存未命中时用于近似匹配
+            http2: 是否启用HTTP/2多路复用（需要安装h2，仅httpx支持）
+            max_connections: 连接池最大连接数
+            max_keepalive_connections: 连接池保持的最大空闲连接数（仅httpx）
+            keepalive_expiry: 空闲连接的保持时间（秒）
+            keep_warm: 是否在构造时预先建立连接，并在空闲连接过期前刷新
+            verify: TLS证书校验，True/False，或CA证书（httpx为ssl.SSLContext，requests为文件路径）
         """
         self.app_id = app_id
         self.api_secret = api_secret
         self.api_key = api_key
-        self.url = 'https://itrans.xf-yun.com/v1/its'
+        self.url = url
         self.res_id = "its_en_cn_word"  # 术语资源ID
 
+        # 预先解析URL，避免每次请求重复解析
+        self._url_parts = {self.url: self.parse_url(self.url)}
+        # 签名URL缓存：(method, url) -> (秒级时间戳, 签名URL)，签名日期精度为1秒
+        self._auth_url_cache = {}
+
         # 线程安全锁
         self.lock = Lock()
 
         # 翻译结果缓存，使用LRU策略
         self.cache_size = cache_size
         self.cache = LRUCache(capacity=cache_size)
+        self.translation_memory = translation_memory
 
         # 请求速率控制
         self.last_request_time = 0
         self.request_interval = 0.05  # 50ms最小间隔，避免过快请求
 
         # HTTP客户端设置
-        self.timeout = 5.0  # 请求超时设置
-
-        # 如果使用httpx，创建一个客户端实例
+        self.timeout = timeout  # 单次请求超时设置
+
+        # 重试、对冲与熔断设置
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout)
+        self._latencies = deque(maxlen=200)  # 最近成功请求的延迟，用于估计p95
+        self._executor = ThreadPoolExecutor(max_workers=4) if hedge else None
+        self._fanout_executor = None  # 多目标语言并发翻译使用的线程池，按需创建
+        self.metrics = TranslationMetrics()  # 延迟直方图与错误计数，通过get_metrics()获取快照
+
+        # HTTP连接池：复用TCP/TLS连接，避免每次请求重新握手
+        self.keepalive_expiry = keepalive_expiry
         if use_httpx:
-            self.client = httpx.Client(timeout=self.timeout)
-            self.session_lock = Lock()
+            if http2 and importlib.util.find_spec("h2") is None:
+                print("未安装h2，HTTP/2不可用，使用HTTP/1.1")
+                http2 = False
+            self.client = httpx.Client(
+                timeout=self.timeout,
+                http2=http2,
+                verify=verify,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry
+                )
+            )
         else:
-            self.client = None
+            self.client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+            self.client.mount("https://", adapter)
+            self.client.mount("http://", adapter)
+            self.client.verify = verify
+
+        # 连接预热：后台线程建立连接，并在空闲连接过期前刷新
+        url_parts = self._url_parts[self.url]
+        self._base_url = f"{url_parts['schema']}{url_parts['host']}/"
+        self._last_activity = 0.0
+        self._warm_stop = threading.Event()
+        if keep_warm:
+            threading.Thread(
+                target=self._keep_warm_loop,
+                args=(weakref.ref(self), self._warm_stop, keepalive_expiry * 0.8),
+                daemon=True
+            ).start()
+
+    def warm_up(self):
+        """预先建立到翻译API的连接（DNS、TCP和TLS握手），不发起翻译请求"""
+        try:
+            self.client.head(self._base_url, timeout=self.timeout)
+            self._last_activity = time.time()
+            return True
+        except Exception as e:
+            print(f"预热连接失败: {str(e)}")
+            return False
+
+    @staticmethod
+    def _keep_warm_loop(module_ref, stop_event, interval):
+        """保活线程：连接空闲接近过期时发送轻量请求刷新（只持有弱引用，不阻止模块回收）"""
+        while True:
+            module = module_ref()
+            if module is None:
+                return
+            wait_time = module._last_activity + interval - time.time()
+            if wait_time <= 0:
+                module.warm_up()
+                wait_time = interval
+            del module
+            if stop_event.wait(max(wait_time, 0.05)):
+                return
 
     def parse_url(self, request_url):
         """解析URL"""
@@ -148,14 +755,29 @@ class TranslationModule:
         return {"host": host, "path": path, "schema": schema}
 
     def assemble_auth_url(self, request_url, method="POST"):
-        """构建带认证的请求URL"""
-        url_parts = self.parse_url(request_url)
+        """构建带认证的请求URL（同一秒内复用已签名的URL）"""
+        # 签名中的RFC1123日期只精确到秒，同一秒内的签名结果完全相同
+        now = int(time.time())
+        cache_key = (method, request_url)
+        cached = self._auth_url_cache.get(cache_key)
+        if cached is not None and cached[0] == now:
+            return cached[1]
+
+        signed_url = self._sign_auth_url(request_url, method, now)
+        self._auth_url_cache[cache_key] = (now, signed_url)
+        return signed_url
+
+    def _sign_auth_url(self, request_url, method, timestamp):
+        """计算指定时间戳的签名URL（不含缓存）"""
+        url_parts = self._url_parts.get(request_url)
+        if url_parts is None:
+            url_parts = self.parse_url(request_url)
+            self._url_parts[request_url] = url_parts
         host = url_parts["host"]
         path = url_parts["path"]
 
         # 生成时间戳
-        now = datetime.now()
-        date = format_date_time(mktime(now.timetuple()))
+        date = format_date_time(timestamp)
 
         # 生成签名
         signature_origin = f"host: {host}\ndate: {date}\n{method} {path} HTTP/1.1"
@@ -217,97 +839,177 @@ class TranslationModule:
         """准备请求头"""
         return {
             'content-type': "application/json",
-            'host': 'itrans.xf-yun.com',
+            'host': self._url_parts[self.url]["host"],
             'app_id': self.app_id
         }
 
     def _parse_response(self, response):
-        """解析API响应"""
-        try:
-            if hasattr(response, 'content'):
-                # requests响应
-                result = json.loads(response.content.decode())
-            else:
-                # httpx响应
-                result = response.json()
-
-            # 解析返回结果
-            if 'payload' in result and 'result' in result['payload'] and 'text' in result['payload']['result']:
-                translated_text_base64 = result['payload']['result']['text']
-                translated_text = base64.b64decode(translated_text_base64).decode()
+        """
+        解析API响应
 
-                # 解析JSON格式的响应，只提取翻译文本
-                try:
-                    json_result = json.loads(translated_text)
-                    # 提取翻译结果
-                    if 'trans_result' in json_result and 'dst' in json_result['trans_result']:
-                        return json_result['trans_result']['dst']
-                    elif 'dst' in json_result:
-                        return json_result['dst']
-                    else:
-                        # 如果找不到预期的字段，返回完整JSON
-                        return translated_text
-                except:
-                    # 如果不是JSON格式，返回原始文本
-                    return translated_text
-            else:
-                print(f"翻译API错误: {result}")
-                return None
-        except Exception as e:
-            print(f"解析响应出错: {str(e)}")
-            return None
+        返回:
+            (译文, 错误)，错误为None或 {"code": 错误码, "message": 错误信息}
+        """
+        return parse_its_response(response.content)
 
     def _rate_limit(self):
         """简单的请求速率限制"""
-        current_time = time.time()
-        elapsed = current_time - self.last_request_time
+        with self.lock:
+            current_time = time.time()
+            elapsed = current_time - self.last_request_time
 
-        # 如果距离上次请求时间太短，则等待
-        if elapsed < self.request_interval:
-            time.sleep(self.request_interval - elapsed)
+            # 如果距离上次请求时间太短，则等待
+            if elapsed < self.request_interval:
+                time.sleep(self.request_interval - elapsed)
+                self.metrics.add_throttle_wait(self.request_interval - elapsed)
 
-        # 更新最后请求时间
-        self.last_request_time = time.time()
+            # 更新最后请求时间
+            self.last_request_time = time.time()
 
-    def _do_translate(self, text, from_lang, to_lang, use_terminology):
-        """实际执行翻译的方法（不含缓存）"""
-        try:
-            # 应用速率限制
-            self._rate_limit()
+    def _send_request(self, text, from_lang, to_lang, use_terminology):
+        """发送单次翻译请求，返回(译文, 错误)，可重试的失败以RetryableError抛出"""
+        # 应用速率限制
+        self._rate_limit()
 
-            # 准备请求数据
-            body = self._prepare_request_body(text, from_lang, to_lang, use_terminology)
-            request_url = self.assemble_auth_url(self.url, "POST")
-            headers = self._prepare_headers()
+        # 准备请求数据
+        body = self._prepare_request_body(text, from_lang, to_lang, use_terminology)
+        request_url = self.assemble_auth_url(self.url, "POST")
+        headers = self._prepare_headers()
 
-            # 发送请求（使用更高效的HTTP客户端）
+        start_time = time.time()
+        self.metrics.request_started()
+        try:
+            # 发送请求（使用更高效的HTTP客户端，httpx.Client本身是线程安全的）
+            json_data = json_dumps(body)
             if use_httpx:
-                with self.session_lock:
-                    response = self.client.post(
-                        request_url,
-                        json=body,  # httpx会自动处理JSON序列化
-                        headers=headers
-                    )
+                response = self.client.post(
+                    request_url,
+                    content=json_data,
+                    headers=headers,
+                    timeout=self.timeout
+                )
             else:
-                # 使用标准requests
-                json_data = json.dumps(body)
-                response = requests.post(
+                # 使用标准requests（Session复用连接池）
+                response = self.client.post(
                     request_url,
                     data=json_data,
                     headers=headers,
                     timeout=self.timeout
                 )
-
-            # 解析响应
-            return self._parse_response(response)
-
+        except TIMEOUT_ERRORS as e:
+            self.metrics.incr("timeouts")
+            raise RetryableError(f"请求超时: {str(e)}")
         except Exception as e:
-            print(f"翻译过程出错: {str(e)}")
+            self.metrics.incr("network_errors")
+            raise RetryableError(f"请求失败: {str(e)}")
+        finally:
+            self.metrics.request_finished()
+
+        # 限流和服务端错误可以重试
+        if response.status_code == 429:
+            self.metrics.incr("throttled_responses")
+            raise RetryableError(f"HTTP {response.status_code}")
+        if response.status_code >= 500:
+            self.metrics.incr("http_errors")
+            raise RetryableError(f"HTTP {response.status_code}")
+
+        self._last_activity = time.time()
+        self._latencies.append(self._last_activity - start_time)
+        result, error = self._parse_response(response)
+        if error is not None:
+            self.metrics.incr("api_errors")
+        return result, error
+
+    def _latency_p95(self):
+        """最近成功请求延迟的p95，样本不足时返回None"""
+        samples = sorted(self._latencies)
+        if len(samples) < 20:
             return None
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def _send_hedged(self, text, from_lang, to_lang, use_terminology):
+        """发送请求，首个请求超过对冲等待时间仍未返回时再发一个，取先成功者"""
+        hedge_delay = self.hedge_delay if self.hedge_delay is not None else self._latency_p95()
+        args = (text, from_lang, to_lang, use_terminology)
+        first = self._executor.submit(self._send_request, *args)
+        if hedge_delay is None:
+            return first.result()
+
+        done, _ = wait([first], timeout=hedge_delay)
+        if done:
+            return first.result()
+
+        self.metrics.incr("hedged_requests")
+        pending = {first, self._executor.submit(self._send_request, *args)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except RetryableError as e:
+                    error = e
+        raise error
 
-    def translate(self, text, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True):
+    def _backoff_delay(self, attempt):
+        """第attempt次重试前的等待时间（指数退避 + 全抖动）"""
+        return random.uniform(0, min(self.retry_backoff_max, self.retry_backoff * (2 ** attempt)))
+
+    def _do_translate(self, text, from_lang, to_lang, use_terminology):
+        """
+        实际执行翻译的方法（不含缓存），包含重试、对冲和熔断
+
+        返回:
+            (译文, 错误)，成功时错误为None；失败时译文为None，错误为 {"code": 错误码, "message": 错误信息}。
+            不打印日志，错误计数见get_metrics()
+        """
+        error = None
+        for attempt in range(self.max_retries + 1):
+            # 熔断器打开时快速失败
+            if not self.breaker.allow_request():
+                self.metrics.incr("breaker_rejections")
+                self.metrics.incr("failures")
+                return None, {"code": None, "message": "翻译服务暂不可用（熔断中），跳过请求"}
+
+            try:
+                if self.hedge:
+                    result, error = self._send_hedged(text, from_lang, to_lang, use_terminology)
+                else:
+                    result, error = self._send_request(text, from_lang, to_lang, use_terminology)
+                if error is not None:
+                    # 业务错误不重试，但和传输错误一样计入熔断器
+                    self.breaker.record_failure()
+                    self.metrics.incr("failures")
+                    return result, error
+                self.breaker.record_success()
+                return result, None
+            except RetryableError as e:
+                self.breaker.record_failure()
+                error = {"code": None, "message": f"翻译请求失败 (第{attempt + 1}次): {str(e)}"}
+                if attempt < self.max_retries:
+                    self.metrics.incr("retries")
+                    time.sleep(self._backoff_delay(attempt))
+            except Exception as e:
+                self.breaker.record_failure()
+                self.metrics.incr("failures")
+                return None, {"code": None, "message": f"翻译过程出错: {str(e)}"}
+
+        self.metrics.incr("failures")
+        return None, error
+
+    def translate(self, text, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True, remember=True):
+        """
+        执行文本翻译，参数同translate_with_error
+
+        返回:
+            翻译结果字符串，如果出错返回None
         """
-        执行文本翻译
+        return self.translate_with_error(text, from_lang, to_lang, use_terminology, use_cache, remember)[0]
+
+    def translate_with_error(self, text, from_lang="cn", to_lang="en", use_terminology=True, use_cache=True,
+                             remember=True):
+        """
+        执行文本翻译，并随结果返回这一次调用的错误信息（多个线程并发翻译时各自拿到自己的错误）
 
         参数:
             text: 待翻译文本
@@ -315,41 +1017,165 @@ class TranslationModule:
             to_lang: 目标语言（cn：中文，en：英文等）
             use_terminology: 是否使用术语资源
             use_cache: 是否使用缓存
+            remember: 是否把译文写入缓存和翻译记忆；翻译句子前缀等临时文本时传False，
+                      避免半句的译文被完整句子复用
 
         返回:
-            翻译结果字符串，如果出错返回None
+            (译文, 错误)，成功时错误为None；出错时译文为None，错误为 {"code": 错误码, "message": 错误信息}
         """
         # 空文本直接返回
         if not text or not text.strip():
-            return ""
+            return "", None
 
         # 源语言与目标语言相同，直接返回原文
         if from_lang == to_lang:
-            return text
+            return text, None
 
         # 检查语言支持
-        if from_lang not in [code for code in LANGUAGE_CODES.values()]:
-            raise ValueError(f"不支持的源语言代码: {from_lang}")
-        if to_lang not in [code for code in LANGUAGE_CODES.values()]:
-            raise ValueError(f"不支持的目标语言代码: {to_lang}")
+        self._check_languages(from_lang, to_lang)
+
+        start_time = time.perf_counter()
 
         # 生成缓存键
         if use_cache:
-            cache_key = f"{text}_{from_lang}_{to_lang}_{use_terminology}"
+            cache_key = self.cache_key(text, from_lang, to_lang, use_terminology)
 
             # 检查缓存
             cached_result = self.cache.get(cache_key)
             if cached_result is not None:
-                return cached_result
+                self.metrics.observe("hit", from_lang, to_lang, time.perf_counter() - start_time)
+                return cached_result, None
+
+            # 检查翻译记忆中的近似句子
+            if self.translation_memory is not None:
+                match = self.translation_memory.lookup(text, from_lang, to_lang, use_terminology)
+                if match is not None:
+                    self.metrics.observe("memory", from_lang, to_lang, time.perf_counter() - start_time)
+                    return match[0], None
 
         # 执行翻译
-        result = self._do_translate(text, from_lang, to_lang, use_terminology)
+        result, error = self._do_translate(text, from_lang, to_lang, use_terminology)
+        self.metrics.observe("miss", from_lang, to_lang, time.perf_counter() - start_time)
 
         # 更新缓存
-        if use_cache and result:
+        if use_cache and remember and result:
             self.cache.put(cache_key, result)
+            if self.translation_memory is not None:
+                self.translation_memory.add(text, from_lang, to_lang, result, use_terminology)
 
-        return result
+        return result, error
+
+    @staticmethod
+    def _check_languages(from_lang, to_lang):
+        """检查语言代码，不支持时抛出ValueError"""
+        if from_lang not in LANGUAGE_CODES.values():
+            raise ValueError(f"不支持的源语言代码: {from_lang}")
+        if to_lang not in LANGUAGE_CODES.values():
+            raise ValueError(f"不支持的目标语言代码: {to_lang}")
+
+    def translate_joined(self, texts, from_lang="cn", to_lang="en", use_terminology=True, separator="\n"):
+        """
+        把多条文本用分隔符合并成一次请求翻译，再按分隔符拆回每条的译文（供TranslationBatcher使用）
+
+        与translate一样检查语言代码、源语言与目标语言相同时直接返回原文，并逐条查询和更新缓存、
+        翻译记忆和指标，只有未命中的文本合并发送。
+
+        参数:
+            texts: 文本列表，文本中不能包含分隔符
+            from_lang: 源语言
+            to_lang: 目标语言
+            use_terminology: 是否使用术语资源
+            separator: 合并使用的分隔符，需能被翻译API原样保留
+
+        返回:
+            (results, requests): 与texts等长的译文列表，以及发送的API请求数；
+            请求失败时未命中的条目为None，合并结果无法按条拆分时results为None
+        """
+        if from_lang == to_lang:
+            return list(texts), 0
+        self._check_languages(from_lang, to_lang)
+
+        start_time = time.perf_counter()
+        results = [None] * len(texts)
+        missing = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = ""
+                continue
+            cached_result = self.cache.get(self.cache_key(text, from_lang, to_lang, use_terminology))
+            if cached_result is not None:
+                self.metrics.observe("hit", from_lang, to_lang, time.perf_counter() - start_time)
+                results[i] = cached_result
+                continue
+            if self.translation_memory is not None:
+                match = self.translation_memory.lookup(text, from_lang, to_lang, use_terminology)
+                if match is not None:
+                    self.metrics.observe("memory", from_lang, to_lang, time.perf_counter() - start_time)
+                    results[i] = match[0]
+                    continue
+            missing.append(i)
+        if not missing:
+            return results, 0
+
+        result, _ = self._do_translate(separator.join(texts[i] for i in missing), from_lang, to_lang,
+                                       use_terminology)
+        elapsed = time.perf_counter() - start_time
+        if not result:
+            # 请求本身失败（已经过重试或熔断），未命中的条目都为None
+            for _ in missing:
+                self.metrics.observe("miss", from_lang, to_lang, elapsed)
+            return results, 1
+        parts = result.split(separator)
+        if len(parts) != len(missing):
+            return None, 1
+
+        for i, part in zip(missing, parts):
+            part = part.strip()
+            self.metrics.observe("miss", from_lang, to_lang, elapsed)
+            if part:
+                self.cache.put(self.cache_key(texts[i], from_lang, to_lang, use_terminology), part)
+                if self.translation_memory is not None:
+                    self.translation_memory.add(texts[i], from_lang, to_lang, part, use_terminology)
+            results[i] = part
+        return results, 1
+
+    def translate_multi(self, text, from_lang="cn", to_langs=("en",), use_terminology=True, use_cache=True):
+        """
+        把同一段文本并发翻译成多种目标语言
+
+        所有请求共享同一个签名缓存和HTTP连接池，结果按语言分别缓存。
+
+        参数:
+            text: 待翻译文本
+            from_lang: 源语言
+            to_langs: 目标语言代码列表
+            use_terminology: 是否使用术语资源
+            use_cache: 是否使用缓存
+
+        返回:
+            {目标语言代码: 翻译结果}，出错的语言对应None
+        """
+        to_langs = list(dict.fromkeys(to_langs))
+        if len(to_langs) <= 1:
+            return {to_lang: self._translate_or_none(text, from_lang, to_lang, use_terminology, use_cache)
+                    for to_lang in to_langs}
+
+        if self._fanout_executor is None:
+            with self.lock:
+                if self._fanout_executor is None:
+                    self._fanout_executor = ThreadPoolExecutor(max_workers=len(LANGUAGE_CODES))
+
+        futures = {to_lang: self._fanout_executor.submit(
+                       self._translate_or_none, text, from_lang, to_lang, use_terminology, use_cache)
+                   for to_lang in to_langs}
+        return {to_lang: future.result() for to_lang, future in futures.items()}
+
+    def _translate_or_none(self, text, from_lang, to_lang, use_terminology, use_cache):
+        """translate_multi中翻译一种语言：不支持的语言代码等异常返回None，不影响其他语言"""
+        try:
+            return self.translate(text, from_lang, to_lang, use_terminology, use_cache)
+        except Exception:
+            return None
 
     def batch_translate(self, texts, from_lang="cn", to_lang="en", use_terminology=True):
         """
@@ -373,27 +1199,433 @@ class TranslationModule:
 
         return results
 
+    def capabilities(self):
+        """讯飞ITS接口的能力描述"""
+        return {
+            "name": "iflytek-its",
+            "offline": False,
+            "language_pairs": None,
+            "max_text_length": 5000,
+            "native_batch": False
+        }
+
     def clear_cache(self):
         """清空翻译缓存"""
         self.cache.clear()
+        if self.translation_memory is not None:
+            self.translation_memory.clear()
 
     def get_cache_stats(self):
         """获取缓存统计信息"""
-        return {
+        stats = {
             "capacity": self.cache_size,
             "current_size": len(self.cache)
         }
+        if self.translation_memory is not None:
+            stats["translation_memory"] = self.translation_memory.get_stats()
+        return stats
+
+    def get_metrics(self):
+        """
+        获取运行指标快照（延迟分位数、进行中的请求数、重试/限流/超时/错误计数），格式见TranslationMetrics.snapshot
+        """
+        return self.metrics.snapshot()
+
+    def close(self):
+        """停止保活线程并关闭HTTP客户端"""
+        if hasattr(self, '_warm_stop'):
+            self._warm_stop.set()
+        if hasattr(self, 'client') and self.client:
+            self.client.close()
 
     def __del__(self):
         """清理资源"""
         try:
-            # 如果使用httpx，关闭客户端
-            if use_httpx and hasattr(self, 'client') and self.client:
-                self.client.close()
+            # 停止保活线程，关闭HTTP客户端
+            self.close()
+            if hasattr(self, '_executor') and self._executor:
+                self._executor.shutdown(wait=False)
+            if hasattr(self, '_fanout_executor') and self._fanout_executor:
+                self._fanout_executor.shutdown(wait=False)
         except:
             pass
 
 
+class TranslationBatcher:
+    """
+    微批处理器：把短句合并成一个翻译请求，再按分隔符拆回每句的译文
+
+    流式ASR会产生大量很短的句子，逐句请求会浪费大量往返时间。批处理器在后台线程中
+    累积待翻译句子，达到字符预算或最早句子等待超过max_delay时合并发送一次请求。
+    """
+
+    def __init__(self, translator, max_chars=200, max_delay=0.2, separator="\n", workers=1):
+        """
+        参数:
+            translator: TranslationModule实例
+            max_chars: 单个合并请求的字符预算
+            max_delay: 句子在批处理器中的最长等待时间（秒）
+            separator: 合并句子使用的分隔符，需能被翻译API原样保留
+            workers: 同时发送的合并请求数，大于1时一个慢请求不会阻塞后面的批次（结果可能乱序完成）
+        """
+        self.translator = translator
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.separator = separator
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        self.pending = []  # [(text, from_lang, to_lang, use_terminology, future, submit_time)]
+        self.pending_chars = 0
+        self.condition = threading.Condition()
+        self.running = True
+
+        # 统计信息（调用方线程和发送线程都会更新）
+        self.sentence_count = 0
+        self.request_count = 0
+        self.stats_lock = threading.Lock()
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, text, from_lang="cn", to_lang="en", use_terminology=True):
+        """
+        提交一个待翻译句子
+
+        返回:
+            concurrent.futures.Future，结果为译文字符串（翻译失败时为None，参数错误等异常设置在Future上）
+
+        异常:
+            RuntimeError: 批处理器已关闭
+        """
+        if not self.running:
+            raise RuntimeError("翻译批处理器已关闭")
+        future = Future()
+        with self.stats_lock:
+            self.sentence_count += 1
+
+        # 命中缓存的句子直接返回
+        cached_result = self.translator.cache.get(
+            self.translator.cache_key(text, from_lang, to_lang, use_terminology))
+        if cached_result is not None:
+            future.set_result(cached_result)
+            return future
+
+        with self.condition:
+            # close()之后后台线程可能已经退出，不再接受新句子，避免Future永远不完成
+            if not self.running:
+                raise RuntimeError("翻译批处理器已关闭")
+            self.pending.append((text, from_lang, to_lang, use_terminology, future, time.time()))
+            self.pending_chars += len(text)
+            self.condition.notify()
+        return future
+
+    def _take_batch(self):
+        """取出一批语言对相同、总长度不超过预算的句子（调用时需持有锁）"""
+        first = self.pending[0]
+        batch = [first]
+        chars = len(first[0])
+        for item in self.pending[1:]:
+            if item[1:4] != first[1:4] or chars + len(self.separator) + len(item[0]) > self.max_chars:
+                break
+            batch.append(item)
+            chars += len(self.separator) + len(item[0])
+        del self.pending[:len(batch)]
+        self.pending_chars -= sum(len(item[0]) for item in batch)
+        return batch
+
+    def _run(self):
+        """后台线程：等待字符预算或截止时间，然后发送合并请求"""
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+
+                # 字符预算未满时，等待到最早句子的截止时间
+                while self.running and self.pending_chars < self.max_chars:
+                    remaining = self.pending[0][5] + self.max_delay - time.time()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                batch = self._take_batch()
+
+            if self._executor:
+                self._executor.submit(self._send_batch, batch)
+            else:
+                self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        """翻译一批句子，出错时把异常交给尚未完成的Future，后台线程继续处理后面的句子"""
+        try:
+            self._translate_batch(batch)
+        except Exception as e:
+            for item in batch:
+                if not item[4].done():
+                    item[4].set_exception(e)
+
+    def _translate_batch(self, batch):
+        """翻译一批句子，并把结果分发给各自的Future"""
+        from_lang, to_lang, use_terminology = batch[0][1:4]
+
+        if len(batch) == 1:
+            text, future = batch[0][0], batch[0][4]
+            self._count_requests(1)
+            future.set_result(self.translator.translate(text, from_lang, to_lang, use_terminology))
+            return
+
+        # 句子内部的分隔符替换为空格，保证可以按分隔符拆分
+        texts = [item[0].replace(self.separator, " ") for item in batch]
+        results, requests = self.translator.translate_joined(texts, from_lang, to_lang, use_terminology,
+                                                             self.separator)
+        self._count_requests(requests)
+
+        if results is None:
+            # 合并结果无法按句拆分，退回逐句翻译（请求失败时results中对应条目为None，不再逐句重发）
+            for text, _, _, _, future, _ in batch:
+                self._count_requests(1)
+                future.set_result(self.translator.translate(text, from_lang, to_lang, use_terminology))
+            return
+
+        for item, result in zip(batch, results):
+            item[4].set_result(result)
+
+    def _count_requests(self, count):
+        with self.stats_lock:
+            self.request_count += count
+
+    def get_stats(self):
+        """获取批处理统计信息"""
+        with self.stats_lock:
+            return {
+                "sentences": self.sentence_count,
+                "requests": self.request_count
+            }
+
+    def close(self):
+        """停止后台线程，已提交的句子会先处理完；之后再调用submit会抛出RuntimeError"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=self.translator.timeout * (self.translator.max_retries + 1))
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+
+class IncrementalTranslator:
+    """
+    增量翻译器：在句子结束前翻译ASR中间结果里已经稳定的前缀，尽早给出临时译文
+
+    最近stable_count次中间结果的公共前缀（去掉末尾holdback_chars个可能被修正的字）
+    视为稳定前缀。为了限制API开销，每句最多发送max_requests_per_sentence个请求，
+    两次请求至少间隔min_interval秒，且前缀至少新增min_new_chars个字才重新翻译。
+    命中缓存的前缀不计入请求预算。前缀的译文只保存在自己的缓存中，不写入翻译模块的
+    缓存和翻译记忆，以免挤掉完整句子或被完整句子复用。临时译文通过on_provisional回调输出，
+    句子结束后由调用方用最终译文替换。
+    """
+
+    def __init__(self, translator, on_provisional, min_interval=1.0, min_new_chars=4,
+                 holdback_chars=2, stable_count=2, max_requests_per_sentence=3, cache_size=200):
+        """
+        参数:
+            translator: TranslationModule实例
+            on_provisional: 回调函数 on_provisional(sentence_id, prefix, translation)
+            min_interval: 同一句两次临时翻译请求的最小间隔（秒）
+            min_new_chars: 稳定前缀至少新增多少字才重新翻译
+            holdback_chars: 稳定前缀末尾保留不翻译的字数
+            stable_count: 参与计算公共前缀的最近中间结果数量
+            max_requests_per_sentence: 每句临时翻译的最大API请求数
+            cache_size: 前缀译文缓存的容量
+        """
+        self.translator = translator
+        self.on_provisional = on_provisional
+        self.min_interval = min_interval
+        self.min_new_chars = min_new_chars
+        self.holdback_chars = holdback_chars
+        self.stable_count = stable_count
+        self.max_requests_per_sentence = max_requests_per_sentence
+        self.cache = LRUCache(cache_size)
+
+        # 当前句子的状态
+        self.sentence_id = None
+        self.history = deque(maxlen=stable_count)
+        self.last_prefix = ""
+        self.last_request_time = 0.0
+        self.request_count = 0
+
+        # 统计信息
+        self.total_requests = 0
+        self.total_cache_hits = 0
+
+        # 后台翻译线程只保留最新的一个任务，过时的前缀直接丢弃
+        self._job = None
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _stable_prefix(self):
+        """最近几次中间结果的公共前缀，去掉末尾可能被修正的部分"""
+        prefix = os.path.commonprefix(list(self.history))
+        return prefix[:max(0, len(prefix) - self.holdback_chars)]
+
+    def update(self, hypothesis, sentence_id, from_lang="cn", to_lang="en"):
+        """
+        输入一次ASR中间结果
+
+        参数:
+            hypothesis: 当前句子的完整中间识别文本
+            sentence_id: 句子序号，序号变化表示开始了新的句子
+            from_lang: 源语言
+            to_lang: 目标语言
+        """
+        with self._condition:
+            provisional = self._update_locked(hypothesis, sentence_id, from_lang, to_lang)
+        # 回调（通常会更新界面）在锁外调用，避免慢回调阻塞ASR线程和后台翻译线程
+        if provisional is not None:
+            self.on_provisional(*provisional)
+
+    def _update_locked(self, hypothesis, sentence_id, from_lang, to_lang):
+        """
+        update的加锁部分（调用时需持有锁）
+
+        返回:
+            前缀命中缓存时为需要输出的 (sentence_id, prefix, translation)，否则为None
+        """
+        if sentence_id != self.sentence_id:
+            self.sentence_id = sentence_id
+            self.history.clear()
+            self.last_prefix = ""
+            self.last_request_time = 0.0
+            self.request_count = 0
+
+        self.history.append(hypothesis)
+        if len(self.history) < self.stable_count:
+            return None
+
+        prefix = self._stable_prefix().strip()
+        if len(prefix) - len(self.last_prefix) < self.min_new_chars:
+            return None
+
+        # 已翻译过的前缀（或与之相同的完整句子）直接使用缓存，不占用请求预算
+        cache_key = self.translator.cache_key(prefix, from_lang, to_lang, True)
+        cached_result = self.cache.get(cache_key)
+        if cached_result is None:
+            cached_result = self.translator.cache.get(cache_key)
+        if cached_result is not None:
+            self.last_prefix = prefix
+            self.total_cache_hits += 1
+            return sentence_id, prefix, cached_result
+
+        if self.request_count >= self.max_requests_per_sentence:
+            return None
+        if time.time() - self.last_request_time < self.min_interval:
+            return None
+
+        # 请求数在后台线程真正发送时计数，被更新的前缀替换掉的任务不计入
+        self.last_prefix = prefix
+        self.last_request_time = time.time()
+        self._job = (sentence_id, prefix, from_lang, to_lang)
+        self._condition.notify()
+        return None
+
+    def _run(self):
+        """后台线程：翻译最新的稳定前缀"""
+        while True:
+            with self._condition:
+                while self._running and self._job is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                sentence_id, prefix, from_lang, to_lang = self._job
+                self._job = None
+                if sentence_id == self.sentence_id:
+                    self.request_count += 1
+                self.total_requests += 1
+
+            try:
+                translation = self.translator.translate(prefix, from_lang, to_lang, remember=False)
+            except Exception as e:
+                # 出错时只放弃这一次临时翻译，后台线程继续处理后面的前缀
+                print(f"临时翻译出错: {e}")
+                continue
+
+            if translation:
+                self.cache.put(self.translator.cache_key(prefix, from_lang, to_lang, True), translation)
+
+            # 句子已经结束或切换时，丢弃过时的临时译文
+            if translation and sentence_id == self.sentence_id:
+                self.on_provisional(sentence_id, prefix, translation)
+
+    def get_stats(self):
+        """获取增量翻译统计信息"""
+        return {
+            "requests": self.total_requests,
+            "cache_hits": self.total_cache_hits
+        }
+
+    def close(self):
+        """停止后台线程"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+
+# 语言检测使用的码位分类表：BMP内每个字符映射为一个分类标记，
+# 用str.translate在C层一次完成分类，再用str.count统计各类字符数
+_CLASS_CJK = "c"      # 汉字（中文/日文）
+_CLASS_LATIN = "l"    # 英文字母
+_CLASS_KANA = "k"     # 日文平假名和片假名
+_CLASS_THAI = "t"     # 泰文
+_CLASS_OTHER = "o"    # 其他字母
+_codepoint_classes = None
+
+
+def _get_codepoint_classes():
+    """首次使用时构建码位分类表"""
+    global _codepoint_classes
+    if _codepoint_classes is None:
+        table = [_CLASS_OTHER if chr(cp).isalpha() else "" for cp in range(0x10000)]
+        for cp in range(0x4e00, 0xa000):
+            table[cp] = _CLASS_CJK
+        for cp in range(0x3040, 0x3100):
+            table[cp] = _CLASS_KANA
+        for cp in range(0x0e00, 0x0e80):
+            table[cp] = _CLASS_THAI
+        for ch in "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'":
+            table[ord(ch)] = _CLASS_LATIN
+        _codepoint_classes = table
+    return _codepoint_classes
+
+
+_SPANISH_RE = re.compile(r"[ñÑ¿¡áéíóúüÁÉÍÓÚÜ]")            # 西班牙文特殊字符（重音字母越南文也会使用）
+_VIETNAMESE_RE = re.compile(r"[ăâđêôơưĂÂĐÊÔƠƯàèìòùỳãẽĩõũỹÀÈÌÒÙỲÃẼĨÕŨỸ\u1ea0-\u1ef9]")  # 越南文特有字母
+_WORD_RE = re.compile(r"[a-zñáéíóú]+")
+
+# 拉丁字母文本的常见功能词，用于区分英文、印尼文和不带重音的西班牙文
+_STOPWORDS = {
+    "en": "the and of to is in that it for with you this are was be on have not at we",
+    "id": "yang dan di ini itu dengan untuk tidak dari dalam akan pada juga saya kami anda adalah ke bisa ada",
+    "es": "el la de que y los las en es por para con una un no se del al como pero",
+}
+_STOPWORD_LANGS = {word: lang for lang, words in _STOPWORDS.items() for word in words.split()}
+
+# 功能词统计只看文本开头，足以判断长文档的语言
+_STOPWORD_SAMPLE_CHARS = 4000
+
+
+def _latin_language(text):
+    """根据功能词判断拉丁字母文本是英文、印尼文还是西班牙文"""
+    scores = {"en": 0, "id": 0, "es": 0}
+    for word in _WORD_RE.findall(text[:_STOPWORD_SAMPLE_CHARS].lower()):
+        lang = _STOPWORD_LANGS.get(word)
+        if lang:
+            scores[lang] += 1
+    best = max(("id", "es"), key=scores.get)
+    return best if scores[best] > scores["en"] else "en"
+
+
 def detect_language(text):
     """
     简单的语言检测函数，根据文本特征推测语言
@@ -404,42 +1636,27 @@ def detect_language(text):
     返回:
         检测到的语言代码
     """
-    # 计算不同字符集的字符出现频率
-    char_counts = {
-        'cn': 0,  # 中文
-        'en': 0,  # 英文
-        'ja': 0,  # 日文（假设日文包含汉字）
-        'es': 0,  # 西班牙文
-        'other': 0  # 其他语言
-    }
-
-    # 简单的语言检测逻辑
-    for char in text:
-        if '\u4e00' <= char <= '\u9fff':
-            # 汉字范围 (中文/日文)
-            char_counts['cn'] += 1
-        elif ('a' <= char.lower() <= 'z') or char in "''":
-            # 英文字母
-            char_counts['en'] += 1
-        elif '\u3040' <= char <= '\u30ff':
-            # 日文平假名和片假名
-            char_counts['ja'] += 1
-        elif char in 'áéíóúüñ¿¡':
-            # 西班牙文特殊字符
-            char_counts['es'] += 1
-        elif char.isalpha():
-            # 其他字母
-            char_counts['other'] += 1
-
-    # 确定主要语言
-    if char_counts['ja'] > 0:
-        return 'ja'  # 有日文假名，判断为日文
-    elif char_counts['cn'] > char_counts['en'] and char_counts['cn'] > char_counts['other']:
+    # 按码位分类后统计各类字符数
+    classes = text.translate(_get_codepoint_classes())
+
+    # 日文假名优先：有假名即判断为日文
+    if _CLASS_KANA in classes:
+        return 'ja'
+
+    cn = classes.count(_CLASS_CJK)
+    latin = classes.count(_CLASS_LATIN)
+    thai = classes.count(_CLASS_THAI)
+
+    if thai > cn and thai > latin:
+        return 'th'  # 泰文字符占多数
+    if cn > latin and cn > classes.count(_CLASS_OTHER):
         return 'cn'  # 中文字符占多数
-    elif char_counts['es'] > 0 and char_counts['en'] > 0:
-        return 'es'  # 有西班牙文特殊字符
-    elif char_counts['en'] > 0:
-        return 'en'  # 英文字符占多数
+    if latin > 0:
+        if _VIETNAMESE_RE.search(text):
+            return 'vi'  # 有越南文特有字母
+        if _SPANISH_RE.search(text):
+            return 'es'  # 有西班牙文特殊字符
+        return _latin_language(text)
 
     # 默认返回英文
     return 'en'
@@ -512,7 +1729,7 @@ def interactive_translation():
         # 3. 执行翻译
         print(f"\n正在将 {from_lang_name} 翻译为 {to_lang_name}...")
         start_time = time.time()
-        result = translator.translate(text, detected_lang, to_lang)
+        result, error = translator.translate_with_error(text, detected_lang, to_lang)
         elapsed = time.time() - start_time
 
         # 显示翻译结果
@@ -523,6 +1740,8 @@ def interactive_translation():
             print(f"翻译用时: {elapsed:.2f} 秒")
         else:
             print("\n翻译失败，请检查网络连接或API密钥。")
+            if error:
+                print(f"失败原因: {error['code']} {error['message']}")
 
         # 展示缓存状态
         cache_stats = translator.get_cache_stats()
@@ -0,0 +1,549 @@
+# tts_audio.py - 语音合成音频的流式解码与播放
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+
+from text_split import SENTENCE_RE
+
+# 可选依赖：PyAV用于增量解码MP3，sounddevice用于持久的PCM输出流
+try:
+    import av
+
+    av_available = True
+except ImportError:
+    av_available = False
+
+try:
+    import sounddevice
+
+    sounddevice_available = True
+except ImportError:
+    sounddevice_available = False
+
+# edge-tts默认输出格式 audio-24khz-48kbitrate-mono-mp3 对应的PCM参数
+SAMPLE_RATE = 24000
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # 16位有符号整数
+
+# 合成输出格式：名称 -> 语音服务的outputFormat。MP3解码时重采样到SAMPLE_RATE，原始PCM直接播放
+OUTPUT_FORMATS = {
+    "mp3": "audio-24khz-48kbitrate-mono-mp3",
+    "mp3-low": "audio-16khz-32kbitrate-mono-mp3",
+    "pcm": "raw-24khz-16bit-mono-pcm",
+}
+
+# 长文本分段合成时的切分位置：句末标点（SENTENCE_RE），其次是分句标点
+_CLAUSE_RE = re.compile(r'.*?(?:[，,、：:]+\s*|$)')
+
+
+def _split_units(text, max_chars):
+    """把文本切成不超过max_chars的句子，过长的句子按分句标点切分，仍然过长时按长度硬切分"""
+    units = []
+    for sentence in SENTENCE_RE.findall(text):
+        if len(sentence) <= max_chars:
+            units.append(sentence)
+            continue
+        for clause in _CLAUSE_RE.findall(sentence):
+            while len(clause) > max_chars:
+                units.append(clause[:max_chars])
+                clause = clause[max_chars:]
+            units.append(clause)
+    return [unit for unit in units if unit.strip()]
+
+
+def split_speech_text(text, first_chars=60, max_chars=200):
+    """
+    把长文本切成分段合成的片段
+
+    第一段不超过first_chars，尽快合成出第一段音频；之后每段不超过max_chars，减少请求数。
+    不超过first_chars的文本不切分。
+
+    返回:
+        片段列表，按顺序拼接等于原文（去掉空白片段）
+    """
+    if len(text) <= first_chars:
+        return [text]
+    pieces = []
+    current = ""
+    for unit in _split_units(text, max_chars):
+        if not pieces and not current and len(unit) > first_chars:
+            # 第一句过长时按分句切出较短的第一段
+            head = _split_units(unit, first_chars)
+            pieces.append(head[0])
+            unit = "".join(head[1:])
+        limit = first_chars if not pieces else max_chars
+        if current and len(current) + len(unit) > limit:
+            pieces.append(current)
+            current = ""
+        current += unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class Mp3StreamDecoder:
+    """增量MP3解码器：每收到一段MP3数据就解出其中完整的帧，输出16位PCM，不完整的帧留到下次"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        if not av_available:
+            raise ImportError("流式解码需要安装 av (PyAV)")
+        self.codec = av.CodecContext.create("mp3", "r")
+        self.resampler = av.AudioResampler(format="s16", layout="mono" if channels == 1 else "stereo",
+                                           rate=sample_rate)
+        self.frame_bytes = channels * SAMPLE_WIDTH
+
+    def _convert(self, frames):
+        pcm = []
+        for frame in frames:
+            for resampled in self.resampler.resample(frame):
+                # 平面缓冲区可能带有对齐填充，只取有效样本
+                pcm.append(bytes(resampled.planes[0])[:resampled.samples * self.frame_bytes])
+        return pcm
+
+    def decode(self, data):
+        """解码一段MP3数据，返回已解出的PCM"""
+        pcm = []
+        for packet in self.codec.parse(data):
+            pcm.extend(self._convert(self.codec.decode(packet)))
+        return b"".join(pcm)
+
+    def flush(self):
+        """数据结束后取出解析器和解码器中剩余的PCM"""
+        pcm = []
+        for packet in self.codec.parse():
+            pcm.extend(self._convert(self.codec.decode(packet)))
+        pcm.extend(self._convert(self.codec.decode(None)))
+        return b"".join(pcm)
+
+
+class PcmStreamDecoder:
+    """原始PCM输出格式使用的解码器：数据直接交给播放引擎，只需按整帧切分，不完整的帧留到下次"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        self.frame_bytes = channels * SAMPLE_WIDTH
+        self.pending = b""
+
+    def decode(self, data):
+        if self.pending:
+            data = self.pending + data
+        cut = len(data) - len(data) % self.frame_bytes
+        self.pending = data[cut:]
+        return data[:cut]
+
+    def flush(self):
+        self.pending = b""
+        return b""
+
+
+def create_decoder(output_format, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """按输出格式名称（OUTPUT_FORMATS的键）创建增量解码器"""
+    if output_format == "pcm":
+        return PcmStreamDecoder(sample_rate, channels)
+    return Mp3StreamDecoder(sample_rate, channels)
+
+
+class AudioClip:
+    """
+    播放队列中的一段语音
+
+    PCM数据可以分多次写入（边合成边播放），end()表示数据已写完。播放完毕（或被丢弃）时
+    设置done事件并调用完成回调，调用方不需要轮询播放状态。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.buffer = bytearray()
+        self.ended = False
+        self.started = False
+        self.done = threading.Event()
+        self.first_sound_time = None  # 开始出声的时刻（perf_counter）
+        self.done_time = None         # 播放完毕的时刻（perf_counter）
+        self.start_position = None    # 第一个样本在输出流中的位置（字节）
+        self.end_position = None      # 最后一个样本之后在输出流中的位置（字节）
+        self.underruns = 0
+        self.total_bytes = 0
+        self._callbacks = []
+
+    def write(self, pcm):
+        """追加PCM数据"""
+        with self.engine.lock:
+            self.buffer += pcm
+            self.total_bytes += len(pcm)
+
+    def end(self):
+        """数据已全部写入，不足缓冲量时也立即开始播放"""
+        with self.engine.lock:
+            self.ended = True
+
+    def duration(self):
+        """已写入数据的时长（秒）"""
+        return self.total_bytes / (self.engine.sample_rate * self.engine.frame_bytes)
+
+    def add_done_callback(self, callback):
+        """播放完毕后调用callback()（在音频线程中调用，回调应尽快返回）；已完成时立即调用"""
+        with self.engine.lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout=None):
+        """阻塞等待播放完毕，返回是否已完成"""
+        return self.done.wait(timeout)
+
+    async def wait_async(self):
+        """在事件循环中等待播放完毕"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_done():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        self.add_done_callback(on_done)
+        await future
+
+    def _finish(self):
+        """标记播放完毕（调用方持有engine.lock），返回需要调用的回调"""
+        self.done_time = time.perf_counter()
+        self.done.set()
+        callbacks, self._callbacks = self._callbacks, []
+        return callbacks
+
+
+class AudioEngine:
+    """
+    持久的音频输出引擎：整个会话只打开一次音频设备
+
+    内部维护一个AudioClip播放队列，音频回调按顺序从队首取PCM，一段播完在同一个数据块内
+    接着播下一段，因此预先排队的语音之间没有间隙。每段语音缓冲到prebuffer秒（或该段已写完）
+    才开始出声，中途断流时补静音并重新缓冲（抖动缓冲）。
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, prebuffer=0.2, block_duration=0.02,
+                 device=None, null_sink=False):
+        """
+        参数:
+            sample_rate: 采样率
+            channels: 声道数
+            prebuffer: 抖动缓冲时长（秒）
+            block_duration: 每次向设备提交的数据时长（秒）
+            device: sounddevice输出设备，None为系统默认设备
+            null_sink: 不打开音频设备，由后台线程按实时速度消费数据（用于无声卡环境和基准测试）
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_bytes = channels * SAMPLE_WIDTH
+        self.block_frames = max(1, int(sample_rate * block_duration))
+        self.prebuffer_bytes = int(sample_rate * prebuffer) * self.frame_bytes
+
+        self.clips = deque()
+        self.lock = threading.Lock()
+        self.position = 0  # 已输出的字节数（含静音），用于计算句间间隔
+
+        self.stream = None
+        self._stop = threading.Event()
+        if null_sink:
+            threading.Thread(target=self._null_sink_loop, daemon=True).start()
+        else:
+            if not sounddevice_available:
+                raise ImportError("音频输出需要安装 sounddevice")
+            self.stream = sounddevice.RawOutputStream(
+                samplerate=sample_rate, channels=channels, dtype="int16",
+                blocksize=self.block_frames, device=device, callback=self._callback)
+            self.stream.start()
+
+    def open_clip(self):
+        """在播放队列末尾加入一段新的语音，返回AudioClip，之后写入数据"""
+        clip = AudioClip(self)
+        with self.lock:
+            self.clips.append(clip)
+        return clip
+
+    def play(self, pcm):
+        """把一段完整的PCM加入播放队列，返回AudioClip"""
+        clip = self.open_clip()
+        clip.write(pcm)
+        clip.end()
+        return clip
+
+    def gap_between(self, previous, clip):
+        """两段相邻语音之间实际插入的静音时长（秒），按输出流中的样本位置计算"""
+        return (clip.start_position - previous.end_position) / (self.sample_rate * self.frame_bytes)
+
+    def queued_duration(self):
+        """播放队列中尚未播放的数据时长（秒）"""
+        with self.lock:
+            return sum(len(clip.buffer) for clip in self.clips) / (self.sample_rate * self.frame_bytes)
+
+    def _fill(self, nbytes):
+        """从播放队列取出nbytes字节的PCM，数据不足时补静音（在音频线程中调用）"""
+        out = bytearray()
+        callbacks = []
+        with self.lock:
+            while len(out) < nbytes and self.clips:
+                clip = self.clips[0]
+                if not clip.started:
+                    if len(clip.buffer) < self.prebuffer_bytes and not clip.ended:
+                        break
+                    clip.started = True
+                    if clip.first_sound_time is None:
+                        clip.first_sound_time = time.perf_counter()
+                        clip.start_position = self.position + len(out)
+                take = nbytes - len(out)
+                out += clip.buffer[:take]
+                del clip.buffer[:take]
+                if not clip.buffer:
+                    if clip.ended:
+                        self.clips.popleft()
+                        clip.end_position = self.position + len(out)
+                        callbacks.extend(clip._finish())
+                        continue
+                    # 断流：补静音并重新缓冲
+                    clip.underruns += 1
+                    clip.started = False
+                    break
+            self.position += nbytes
+        for callback in callbacks:
+            callback()
+        if len(out) < nbytes:
+            out += bytes(nbytes - len(out))
+        return out
+
+    def _callback(self, outdata, frames, time_info, status):
+        outdata[:] = bytes(self._fill(frames * self.frame_bytes))
+
+    def _null_sink_loop(self):
+        """空输出：按实时速度消费数据"""
+        block_seconds = self.block_frames / self.sample_rate
+        block_bytes = self.block_frames * self.frame_bytes
+        next_time = time.perf_counter()
+        while not self._stop.is_set():
+            self._fill(block_bytes)
+            next_time += block_seconds
+            delay = next_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_time = time.perf_counter()
+
+    def clear(self):
+        """丢弃播放队列中的所有语音，被丢弃的语音视为已完成"""
+        callbacks = []
+        with self.lock:
+            while self.clips:
+                callbacks.extend(self.clips.popleft()._finish())
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        """关闭音频输出"""
+        self._stop.set()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+        self.clear()
+
+
+async def audio_from_bytes(audio_data):
+    """把完整的音频数据包装成与Communicate.stream()相同格式的数据块"""
+    yield {"type": "audio", "data": audio_data}
+
+
+class PrefetchedAudio:
+    """
+    在后台接收一段语音的音频数据块并缓冲
+
+    合成可以先于播放开始（提前合成下一句），播放端通过stream()读取，已缓冲的数据立即返回，
+    合成尚未结束时等待新的数据块，因此合成完成前也可以开始播放。必须在事件循环中创建。
+    """
+
+    def __init__(self, chunks, on_complete=None, output_format="mp3"):
+        """
+        参数:
+            chunks: Communicate.stream() 产生的异步迭代器
+            on_complete: 合成成功结束后的回调 on_complete(完整音频数据)，例如写入缓存
+            output_format: 音频数据的格式（OUTPUT_FORMATS的键）
+        """
+        self.output_format = output_format
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.on_complete = on_complete
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._receive(chunks))
+
+    async def _receive(self, chunks):
+        try:
+            async for chunk in chunks:
+                if chunk["type"] == "audio":
+                    self.chunks.append(chunk["data"])
+                    self._changed.set()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._changed.set()
+        if self.error is None and self.chunks and self.on_complete:
+            self.on_complete(b"".join(self.chunks))
+
+    async def stream(self):
+        """按顺序产生音频数据块，合成出错时在读完已有数据后抛出异常"""
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield {"type": "audio", "data": self.chunks[index]}
+                index += 1
+            if self.done:
+                break
+            self._changed.clear()
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+    async def read_all(self):
+        """等待合成结束，返回完整音频数据"""
+        await asyncio.shield(self.task)
+        if self.error is not None:
+            raise self.error
+        return b"".join(self.chunks)
+
+    def cancel(self):
+        """取消尚未完成的合成"""
+        self.task.cancel()
+
+
+class SegmentedAudio:
+    """
+    分段并行合成的一段语音，接口与PrefetchedAudio相同
+
+    各片段按顺序启动合成，同时进行的合成不超过parallel个；stream()按片段顺序产生音频数据块，
+    第一段合成出数据即可开始播放，后面的片段在播放前面的片段时并行合成。必须在事件循环中创建。
+    """
+
+    def __init__(self, sources, parallel=3, on_complete=None, output_format="mp3"):
+        """
+        参数:
+            sources: 每个片段一个无参函数，调用后返回该片段的音频数据块异步迭代器
+            parallel: 同时合成的片段数上限
+            on_complete: 所有片段合成成功后的回调 on_complete(完整音频数据)
+            output_format: 音频数据的格式（OUTPUT_FORMATS的键）
+        """
+        self.output_format = output_format
+        self.segments = []
+        self.on_complete = on_complete
+        self._slots = asyncio.Semaphore(parallel)
+        self._changed = asyncio.Event()
+        self._launch_error = None
+        self.task = asyncio.ensure_future(self._launch(sources))
+
+    async def _launch(self, sources):
+        try:
+            for source in sources:
+                await self._slots.acquire()
+                try:
+                    chunks = source()
+                except Exception as e:
+                    # 同步抛出的错误（如语音或语速参数无效）：不再启动后面的片段
+                    self._slots.release()
+                    self._launch_error = e
+                    break
+                segment = PrefetchedAudio(chunks)
+                segment.task.add_done_callback(lambda _: self._slots.release())
+                self.segments.append(segment)
+                self._changed.set()
+            await asyncio.gather(*(segment.task for segment in self.segments))
+        finally:
+            self._changed.set()
+        if self.on_complete and self.error is None:
+            audio_data = b"".join(b"".join(segment.chunks) for segment in self.segments)
+            if audio_data:
+                self.on_complete(audio_data)
+
+    @property
+    def done(self):
+        return self.task.done()
+
+    @property
+    def error(self):
+        for segment in self.segments:
+            if segment.error is not None:
+                return segment.error
+        return self._launch_error
+
+    async def stream(self):
+        """按片段顺序产生音频数据块，某个片段合成出错或启动失败时在读完之前的数据后抛出异常"""
+        index = 0
+        while True:
+            while index < len(self.segments):
+                async for chunk in self.segments[index].stream():
+                    yield chunk
+                index += 1
+            if self.task.done():
+                if self._launch_error is not None:
+                    raise self._launch_error
+                break
+            self._changed.clear()
+            await self._changed.wait()
+
+    async def read_all(self):
+        """等待所有片段合成结束，返回完整音频数据"""
+        chunks = []
+        async for chunk in self.stream():
+            chunks.append(chunk["data"])
+        return b"".join(chunks)
+
+    def cancel(self):
+        """取消尚未完成的合成"""
+        self.task.cancel()
+        for segment in self.segments:
+            segment.cancel()
+
+
+async def play_stream(chunks, engine, decoder=None, wait=True):
+    """
+    把edge-tts的音频数据块边接收边解码写入播放队列
+
+    播放队列中的位置在调用时立即确定（第一次await之前），因此按顺序启动的多个play_stream
+    会按顺序、无间隙地播放，后一段的解码可以与前一段的播放重叠。
+
+    参数:
+        chunks: Communicate.stream() 产生的异步迭代器
+        engine: AudioEngine实例
+        decoder: 解码器（提供decode/flush方法，见create_decoder），默认为Mp3StreamDecoder
+        wait: 是否等待播放完毕
+
+    返回:
+        统计信息 {"first_chunk": 首个音频块到达耗时, "first_sound": 开始出声耗时, "bytes": 收到的字节数,
+                  "pcm_bytes": 解码出的PCM字节数, "clip": AudioClip}，耗时单位为秒，从调用时刻算起；
+        wait为False时first_sound为None
+    """
+    clip = engine.open_clip()
+    start = time.perf_counter()
+    stats = {"first_chunk": None, "first_sound": None, "bytes": 0, "pcm_bytes": 0, "clip": clip}
+    try:
+        decoder = decoder or Mp3StreamDecoder(engine.sample_rate, engine.channels)
+        async for chunk in chunks:
+            if chunk["type"] != "audio":
+                continue
+            if stats["first_chunk"] is None:
+                stats["first_chunk"] = time.perf_counter() - start
+            stats["bytes"] += len(chunk["data"])
+            pcm = decoder.decode(chunk["data"])
+            if pcm:
+                clip.write(pcm)
+                stats["pcm_bytes"] += len(pcm)
+        pcm = decoder.flush()
+        if pcm:
+            clip.write(pcm)
+            stats["pcm_bytes"] += len(pcm)
+    finally:
+        clip.end()
+
+    if wait:
+        await clip.wait_async()
+        if clip.first_sound_time is not None:
+            stats["first_sound"] = clip.first_sound_time - start
+    return stats
@@ -0,0 +1,134 @@
+# tts_backlog.py - 语音播放积压控制（说话人语速快于译文语音时，限制听众落后的时间）
+import re
+import threading
+
+# 估算朗读时长：CJK字符（含假名、韩文）每字约0.22秒，其他语言每词约0.37秒（约160词/分钟）
+_CJK_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+_WORD_RE = re.compile(r"[^\W\d_]+|\d+")
+CJK_CHAR_SECONDS = 0.22
+WORD_SECONDS = 0.37
+
+
+def estimate_speech_duration(text):
+    """按文本长度估算正常语速下的朗读时长（秒）"""
+    cjk = len(_CJK_RE.findall(text))
+    words = len(_WORD_RE.findall(_CJK_RE.sub(" ", text)))
+    return cjk * CJK_CHAR_SECONDS + words * WORD_SECONDS
+
+
+def format_rate(rate):
+    """把语速倍数转换为edge-tts的rate参数，例如1.25 -> "+25%"（服务端变速，不改变音调）"""
+    return f"{round((rate - 1.0) * 100):+d}%"
+
+
+class BacklogItem:
+    """等待合成的一句译文"""
+
+    __slots__ = ("text", "created")
+
+    def __init__(self, text, created):
+        self.text = text
+        self.created = created  # 译文产生的时刻（perf_counter）
+
+
+class Utterance:
+    """一次合成请求：一句或合并后的多句译文，以及播放语速"""
+
+    __slots__ = ("items", "text", "rate", "duration")
+
+    def __init__(self, items, text, rate, duration):
+        self.items = items
+        self.text = text
+        self.rate = rate
+        self.duration = duration  # 按语速换算后的预计播放时长（秒）
+
+
+class BacklogPolicy:
+    """
+    语音播放的延迟预算
+
+    积压 = 已交给播放阶段但尚未播完的语音 + 等待合成的译文，按正常语速估算为秒数。
+    积压不超过target_lag时逐句正常播放；超过后依次采取：
+      1. 加快语速（edge-tts的rate参数，服务端变速不变调），倍数不超过max_rate；
+      2. 把等待中的多句合并为一次合成，省去每句的首包等待和句间停顿；
+      3. 按max_rate加速后仍会超过max_lag时，丢弃最旧的句子（至少保留最新的一句）。
+    submitted/played维护播放阶段中的积压，线程安全。
+    """
+
+    def __init__(self, target_lag=3.0, max_lag=8.0, max_rate=1.5, merge=True, max_merge_chars=300,
+                 estimate=estimate_speech_duration):
+        """
+        参数:
+            target_lag: 开始加速的积压时长（秒），None表示从不加速也不合并（merge不起作用）
+            max_lag: 允许的最大积压（秒），超过时丢弃最旧的句子，None表示从不丢弃
+            max_rate: 最大语速倍数，1.0表示不加速
+            merge: 积压超过target_lag时是否合并等待中的句子
+            max_merge_chars: 合并后单次合成的最大字符数
+            estimate: 估算朗读时长的函数
+        """
+        self.target_lag = target_lag
+        self.max_lag = max_lag
+        self.max_rate = max_rate
+        self.merge = merge
+        self.max_merge_chars = max_merge_chars
+        self.estimate = estimate
+        self.lock = threading.Lock()
+        self.ahead = 0.0  # 播放阶段中尚未播完的预计时长（秒）
+
+    def submitted(self, utterance):
+        """一次合成交给播放阶段"""
+        with self.lock:
+            self.ahead += utterance.duration
+
+    def played(self, utterance):
+        """一次合成播放完毕（或被丢弃）"""
+        with self.lock:
+            self.ahead = max(0.0, self.ahead - utterance.duration)
+
+    def reset(self):
+        with self.lock:
+            self.ahead = 0.0
+
+    def plan(self, pending):
+        """
+        为等待合成的译文制定播放计划
+
+        参数:
+            pending: 按顺序排列的BacklogItem列表
+
+        返回:
+            (utterances, dropped, backlog): 依次合成播放的Utterance列表、被丢弃的BacklogItem列表、
+            制定计划时的积压时长（秒）
+        """
+        with self.lock:
+            ahead = self.ahead
+        durations = [self.estimate(item.text) for item in pending]
+        backlog = ahead + sum(durations)
+
+        kept = list(zip(pending, durations))
+        dropped = []
+        if self.max_lag is not None:
+            while len(kept) > 1 and (ahead + sum(d for _, d in kept)) / self.max_rate > self.max_lag:
+                dropped.append(kept.pop(0)[0])
+
+        remaining = ahead + sum(d for _, d in kept)
+        rate = min(self.max_rate, max(1.0, remaining / self.target_lag)) if self.target_lag else 1.0
+
+        utterances = []
+        if self.merge and self.target_lag is not None and remaining > self.target_lag and len(kept) > 1:
+            group, length = [], 0
+            for item, duration in kept:
+                if group and length + len(item.text) > self.max_merge_chars:
+                    utterances.append(self._utterance(group, rate))
+                    group, length = [], 0
+                group.append((item, duration))
+                length += len(item.text)
+            utterances.append(self._utterance(group, rate))
+        else:
+            utterances = [self._utterance([entry], rate) for entry in kept]
+        return utterances, dropped, backlog
+
+    def _utterance(self, group, rate):
+        items = [item for item, _ in group]
+        return Utterance(items, " ".join(item.text for item in items), rate,
+                         sum(duration for _, duration in group) / rate)
@@ -0,0 +1,173 @@
+# tts_cache.py - 合成语音缓存（按文本和音色寻址，内存 + 磁盘两级LRU）
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# 默认的磁盘缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rs_funasr", "tts_audio")
+
+
+class SpeechCache:
+    """
+    合成语音缓存
+
+    以(文本, 音色, 输出格式)的SHA-256作为键，内存层和磁盘层分别有字节预算，超出时按LRU淘汰。
+    内存未命中时查磁盘，磁盘命中的音频会提升到内存层。线程安全。
+    """
+
+    def __init__(self, memory_bytes=32 * 1024 * 1024, disk_dir=DEFAULT_CACHE_DIR, disk_bytes=512 * 1024 * 1024):
+        """
+        参数:
+            memory_bytes: 内存层字节预算
+            disk_dir: 磁盘层目录，为None时只使用内存
+            disk_bytes: 磁盘层字节预算
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.lock = threading.Lock()
+
+        self.memory = OrderedDict()  # 键 -> 音频数据
+        self.memory_used = 0
+        self.disk = OrderedDict()    # 键 -> 文件大小，按最近使用时间排序
+        self.disk_used = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            self._scan_disk()
+
+    @staticmethod
+    def cache_key(text, voice, variant=""):
+        """生成缓存键，variant用于区分输出格式等合成参数"""
+        return hashlib.sha256(f"{voice}\0{variant}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _scan_disk(self):
+        """启动时扫描磁盘缓存，按修改时间恢复LRU顺序"""
+        entries = []
+        if os.path.isdir(self.disk_dir):
+            for sub in os.scandir(self.disk_dir):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_used += size
+        self._evict_disk()
+
+    def _put_memory(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        old = self.memory.pop(key, None)
+        if old is not None:
+            self.memory_used -= len(old)
+        self.memory[key] = data
+        self.memory_used += len(data)
+        while self.memory_used > self.memory_bytes:
+            _, evicted = self.memory.popitem(last=False)
+            self.memory_used -= len(evicted)
+
+    def _evict_disk(self):
+        while self.disk_used > self.disk_bytes and self.disk:
+            key, size = self.disk.popitem(last=False)
+            self.disk_used -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, text, voice, variant=""):
+        """
+        查找缓存的音频
+
+        返回:
+            音频数据bytes，未命中返回None
+        """
+        key = self.cache_key(text, voice, variant)
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            if key not in self.disk:
+                self.misses += 1
+                return None
+
+        # 磁盘读取不持有锁
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                size = self.disk.pop(key, None)
+                if size is not None:
+                    self.disk_used -= size
+                self.misses += 1
+            return None
+
+        with self.lock:
+            if key in self.disk:
+                self.disk.move_to_end(key)
+            self.disk_hits += 1
+            self._put_memory(key, data)
+        return data
+
+    def put(self, text, voice, data, variant=""):
+        """保存合成的音频"""
+        if not data:
+            return
+        key = self.cache_key(text, voice, variant)
+        with self.lock:
+            self._put_memory(key, data)
+            if not self.disk_dir or key in self.disk or len(data) > self.disk_bytes:
+                return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"写入语音缓存失败: {str(e)}")
+            return
+
+        with self.lock:
+            if key not in self.disk:
+                self.disk[key] = len(data)
+                self.disk_used += len(data)
+                self._evict_disk()
+
+    def clear(self):
+        """清空内存层（磁盘文件保留）"""
+        with self.lock:
+            self.memory.clear()
+            self.memory_used = 0
+
+    def get_stats(self):
+        """获取缓存统计信息"""
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_items": len(self.memory),
+                "memory_bytes": self.memory_used,
+                "disk_items": len(self.disk),
+                "disk_bytes": self.disk_used,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,129 @@
+# tts_voices.py - edge-tts音色目录缓存（内存 + 磁盘，带过期时间和后台刷新）
+import asyncio
+import json
+import os
+import time
+
+# 默认的磁盘缓存位置
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "rs_funasr", "edge_tts_voices.json")
+
+# 翻译语言代码 -> edge-tts音色的Locale
+TTS_LOCALES = {
+    "cn": "zh-CN", "en": "en-US", "ja": "ja-JP", "es": "es-ES",
+    "fr": "fr-FR", "de": "de-DE", "ko": "ko-KR", "ru": "ru-RU",
+    "id": "id-ID", "vi": "vi-VN", "th": "th-TH",
+}
+
+
+class VoiceCatalog:
+    """
+    音色目录缓存
+
+    音色列表按Locale建立索引，查询不访问网络。首次使用时先读磁盘缓存，没有缓存才同步拉取；
+    缓存超过ttl后继续返回旧数据，同时在后台刷新。刷新失败（例如离线）时保留旧数据。
+    """
+
+    def __init__(self, fetch, cache_path=DEFAULT_CACHE_PATH, ttl=24 * 3600):
+        """
+        参数:
+            fetch: 拉取完整音色列表的协程函数，返回音色字典列表（需包含"Locale"和"ShortName"）
+            cache_path: 磁盘缓存文件路径，为None时只缓存在内存中
+            ttl: 缓存有效期（秒）
+        """
+        self.fetch = fetch
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.voices = []
+        self.by_locale = {}
+        self.locales = []
+        self.fetched_at = 0.0
+        self._disk_loaded = False
+        self._refresh_task = None
+        self._lock = None
+
+    def _index(self, voices, fetched_at):
+        by_locale = {}
+        for voice in voices:
+            by_locale.setdefault(voice["Locale"], []).append(voice)
+        self.voices = voices
+        self.by_locale = by_locale
+        self.locales = sorted(by_locale)
+        self.fetched_at = fetched_at
+
+    def load_disk(self):
+        """读取磁盘缓存，返回是否读取成功（只在第一次调用时读取）"""
+        if self._disk_loaded:
+            return bool(self.voices)
+        self._disk_loaded = True
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if not self.voices:
+                self._index(data["voices"], data["fetched_at"])
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print(f"读取音色缓存失败: {str(e)}")
+            return False
+
+    def _save_disk(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = self.cache_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": self.fetched_at, "voices": self.voices}, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"保存音色缓存失败: {str(e)}")
+
+    def is_stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    async def refresh(self):
+        """从网络拉取音色列表并更新缓存，返回是否成功"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                voices = await self.fetch()
+            except Exception as e:
+                print(f"获取音色列表失败: {str(e)}")
+                return False
+            if not voices:
+                return False
+            self._index(list(voices), time.time())
+            self._save_disk()
+            return True
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self.refresh())
+
+    async def get_voices(self):
+        """获取全部音色：有缓存立即返回（过期时后台刷新），没有缓存时等待拉取"""
+        if not self.voices:
+            self.load_disk()
+        if not self.voices:
+            await self.refresh()
+        elif self.is_stale():
+            self._schedule_refresh()
+        return self.voices
+
+    async def get_locales(self):
+        """获取所有可用的Locale（已排序）"""
+        await self.get_voices()
+        return list(self.locales)
+
+    async def list_locale(self, locale):
+        """获取指定Locale的音色列表"""
+        await self.get_voices()
+        return self.by_locale.get(locale, [])
+
+    def cached_voices(self, locale):
+        """只查内存和磁盘缓存，不访问网络，用于界面立即填充"""
+        if not self.voices:
+            self.load_disk()
+        return self.by_locale.get(locale, [])